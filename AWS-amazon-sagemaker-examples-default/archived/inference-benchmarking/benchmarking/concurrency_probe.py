@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Dict, NamedTuple, Optional
 
 from sagemaker.predictor import Predictor
 from benchmarking.custom_predictor import CustomPredictor
@@ -58,5 +58,143 @@ class ConcurrentProbeExponentialScalingIterator(ConcurrentProbeIteratorBase):
         return self.concurrent_requests
 
 
+class ConcurrentProbeObservation(NamedTuple):
+    """Throughput and tail latency observed for a single concurrency setting during a concurrency probe."""
+
+    throughput: float
+    latency: float
+    feasible: bool
+
+
+class ConcurrentProbeSaturationSearchIterator(ConcurrentProbeIteratorBase):
+    """An iterator used during a concurrency probe to search for the concurrency that saturates throughput.
+
+    Concurrent requests are scaled exponentially until throughput plateaus, the latency SLO is violated, or a load test
+    fails. The gaps around the last probes are then bisected to resolve the knee: the smallest concurrency whose
+    throughput is within `plateau_tolerance` of the best throughput observed while meeting the latency SLO. The knee is
+    reported in `knee_concurrent_requests` and in the stop reason.
+
+    Benchmarker constructs iterators from the model ID and payload name only, so use `functools.partial` to set the
+    remaining arguments, e.g., `partial(ConcurrentProbeSaturationSearchIterator, latency_slo_ms=2000.0)`.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        payload_name: str,
+        start: int = 1,
+        scale_factor: float = 2.0,
+        latency_slo_ms: Optional[float] = None,
+        plateau_tolerance: float = 0.05,
+        max_concurrent_requests: Optional[int] = None,
+        throughput_metric: str = "RequestThroughput",
+        latency_metric: str = "Latency",
+        latency_quantile: str = "p99",
+    ) -> None:
+        self.concurrent_requests = start
+        self.scale_factor = scale_factor
+        self.latency_slo_ms = latency_slo_ms
+        self.plateau_tolerance = plateau_tolerance
+        self.max_concurrent_requests = max_concurrent_requests
+        self.throughput_metric = throughput_metric
+        self.latency_metric = latency_metric
+        self.latency_quantile = latency_quantile
+        self.observations: Dict[int, ConcurrentProbeObservation] = {}
+        self.knee_concurrent_requests: Optional[int] = None
+        self._searching = False
+        super().__init__(model_id, payload_name)
+
+    def send(self, result: Dict[str, Any], predictor: CustomPredictor) -> bool:
+        throughput = result[self.throughput_metric]
+        latency = result[self.latency_metric][self.latency_quantile]
+        feasible = self.latency_slo_ms is None or latency <= self.latency_slo_ms
+        self.observations[self.concurrent_requests] = ConcurrentProbeObservation(throughput, latency, feasible)
+        return super().send(result, predictor)
+
+    def __next__(self) -> int:
+        if self.exception is not None:
+            e = self.exception
+            self.exception = None
+            self.observations[self.concurrent_requests] = ConcurrentProbeObservation(0.0, float("inf"), False)
+            if not self._feasible_throughputs():
+                self.stop_reason = "".join([type(e).__name__, f": {e}" if str(e) else ""])
+                raise StopIteration
+
+        if not self.observations:
+            return self.concurrent_requests
+
+        if not self._searching:
+            scaled_concurrent_requests = int(self.concurrent_requests * self.scale_factor)
+            next_concurrent_requests = max(self.concurrent_requests + 1, scaled_concurrent_requests)
+            if self._is_scaling(next_concurrent_requests):
+                self.concurrent_requests = next_concurrent_requests
+                return self.concurrent_requests
+            self._searching = True
+
+        if not self._feasible_throughputs():
+            self.stop_reason = (
+                f"No concurrency met the latency SLO: {self.latency_metric} {self.latency_quantile} "
+                f"{self.observations[min(self.observations)].latency:.0f} ms at {min(self.observations)} "
+                f"concurrent requests exceeds {self.latency_slo_ms:.0f} ms."
+            )
+            raise StopIteration
+
+        next_concurrent_requests = self._next_bisection()
+        if next_concurrent_requests is None:
+            self._set_knee()
+            raise StopIteration
+        self.concurrent_requests = next_concurrent_requests
+        return self.concurrent_requests
+
+    def _feasible_throughputs(self) -> Dict[int, float]:
+        return {c: x.throughput for c, x in self.observations.items() if x.feasible}
+
+    def _is_scaling(self, next_concurrent_requests: int) -> bool:
+        """Whether the exponential scaling phase should continue with the next concurrency setting."""
+        if self.max_concurrent_requests is not None and next_concurrent_requests > self.max_concurrent_requests:
+            return False
+        latest = self.observations[self.concurrent_requests]
+        if not latest.feasible:
+            return False
+        previous = [x.throughput for c, x in self.observations.items() if x.feasible and c < self.concurrent_requests]
+        return not previous or latest.throughput > (1.0 + self.plateau_tolerance) * max(previous)
+
+    def _next_bisection(self) -> Optional[int]:
+        """The midpoint of the next unresolved interval, or None once the knee is resolved to a single request."""
+        feasible_throughputs = self._feasible_throughputs()
+        largest_feasible = max(feasible_throughputs)
+        infeasible_above = [c for c, x in self.observations.items() if not x.feasible and c > largest_feasible]
+        if infeasible_above:
+            # Throughput may still increase between the largest feasible and the smallest infeasible setting.
+            smaller = [t for c, t in feasible_throughputs.items() if c < largest_feasible]
+            still_increasing = not smaller or (
+                feasible_throughputs[largest_feasible] > (1.0 + self.plateau_tolerance) * max(smaller)
+            )
+            upper = min(infeasible_above)
+            if still_increasing and upper - largest_feasible > 1:
+                return (largest_feasible + upper) // 2
+
+        knee = self._knee()
+        below_knee = [c for c in self.observations if c < knee]
+        lower = max(below_knee) if below_knee else 0
+        if knee - lower > 1:
+            return (lower + knee) // 2
+        return None
+
+    def _knee(self) -> int:
+        """The smallest feasible concurrency with throughput within the plateau tolerance of the best throughput."""
+        feasible_throughputs = self._feasible_throughputs()
+        threshold = (1.0 - self.plateau_tolerance) * max(feasible_throughputs.values())
+        return min(c for c, t in feasible_throughputs.items() if t >= threshold)
+
+    def _set_knee(self) -> None:
+        self.knee_concurrent_requests = self._knee()
+        observation = self.observations[self.knee_concurrent_requests]
+        self.stop_reason = (
+            f"Knee at {self.knee_concurrent_requests} concurrent requests: {self.throughput_metric} "
+            f"{observation.throughput:.2f}, {self.latency_metric} {self.latency_quantile} {observation.latency:.0f} ms."
+        )
+
+
 def num_invocation_scaler(concurrent_requests: int, num_invocation_factor: int = 3) -> int:
     return concurrent_requests * num_invocation_factor
@@ -5,13 +5,24 @@ from pathlib import Path
 
 
 SAVE_METRICS_FILE_PATH = Path.cwd() / "latency_benchmarking.json"
+METRICS_STORE_PATH = Path.cwd() / "latency_benchmarking_store"
 CLOUDWATCH_PERIOD_SECONDS = 60.0
 MAX_CONCURRENT_INVOCATIONS_PER_MODEL = 30
+# At most MAX_CONCURRENT_ENDPOINTS endpoints exist at once and at most MAX_CONCURRENT_BENCHMARKS of them are load
+# tested at a time. To deploy the next models while earlier models are being load tested, pass a lower
+# `max_concurrent_benchmarks` (e.g., 10) to `Benchmarker` so the remaining endpoint slots are free for deployment.
 MAX_CONCURRENT_BENCHMARKS = 20
+MAX_CONCURRENT_ENDPOINTS = 20
 RETRY_WAIT_TIME_SECONDS = 30.0
 MAX_TOTAL_RETRY_TIME_SECONDS = 120.0
 NUM_INVOCATIONS = 10
 SM_INVOCATION_TIMEOUT_SECONDS = 60.0
+OPEN_LOOP_TARGET_REQUESTS_PER_SECOND = 10.0
+OPEN_LOOP_MAX_IN_FLIGHT_REQUESTS = 1024
+OPEN_LOOP_ARRIVAL_LAG_WARNING_SECONDS = 0.5
+HISTOGRAM_RELATIVE_ACCURACY = 0.01
+TOKENIZER_BATCH_SIZE = 256
+TOKEN_COUNT_CACHE_SIZE = 4096
 SM_SESSION = Session(
     sagemaker_runtime_client=boto3.client(
         "sagemaker-runtime",
@@ -1,5 +1,6 @@
 import requests
-from typing import Optional
+import contextlib
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 from urllib.parse import urlparse
 import json
 import sagemaker
@@ -27,6 +28,8 @@ class CustomPredictor:
             self.endpoint_name = self.predictor.endpoint_name
         else:
             self.endpoint_name = self.endpoint_url
+        self._async_runtime_client = None
+        self._async_http_session = None
 
     def predict(self, payload):
         if self.predictor is None:
@@ -35,6 +38,90 @@ class CustomPredictor:
         else:
             return self.predictor.predict(payload, custom_attributes="accept_eula=True")
 
+    def predict_stream(self, payload: Dict[str, Any]) -> Iterator[bytes]:
+        """Invoke the endpoint with response streaming and yield response body chunks as they arrive."""
+        payload = {**payload, "stream": True}
+        if self.predictor is None:
+            with requests.post(self.endpoint_url, json=payload, stream=True) as response:
+                response.raise_for_status()
+                yield from response.iter_content(chunk_size=None)
+        else:
+            runtime_client = self.predictor.sagemaker_session.sagemaker_runtime_client
+            response = runtime_client.invoke_endpoint_with_response_stream(
+                EndpointName=self.endpoint_name,
+                Body=json.dumps(payload),
+                ContentType="application/json",
+                CustomAttributes="accept_eula=True",
+            )
+            for event in response["Body"]:
+                if "PayloadPart" in event:
+                    yield event["PayloadPart"]["Bytes"]
+
+    @contextlib.asynccontextmanager
+    async def open_async(self, max_connections: int) -> AsyncIterator["CustomPredictor"]:
+        """Open the non-blocking client used by `predict_async` and `predict_stream_async` within this context.
+
+        SageMaker endpoints are invoked with an aiobotocore client in the region of the predictor's session, and
+        endpoint URLs with an aiohttp session, each pooling up to `max_connections` connections. Requires aiobotocore,
+        which also installs aiohttp.
+        """
+        if self.predictor is None:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(limit=max_connections)
+            async with aiohttp.ClientSession(connector=connector) as self._async_http_session:
+                try:
+                    yield self
+                finally:
+                    self._async_http_session = None
+        else:
+            from aiobotocore.config import AioConfig
+            from aiobotocore.session import get_session
+
+            region_name = self.predictor.sagemaker_session.boto_region_name
+            config = AioConfig(max_pool_connections=max_connections, retries={"mode": "standard"})
+            client = get_session().create_client("sagemaker-runtime", region_name=region_name, config=config)
+            async with client as self._async_runtime_client:
+                try:
+                    yield self
+                finally:
+                    self._async_runtime_client = None
+
+    async def predict_async(self, payload: Dict[str, Any]) -> Any:
+        """Invoke the endpoint like `predict` without blocking the event loop. Requires `open_async`."""
+        if self.predictor is None:
+            async with self._async_http_session.post(self.endpoint_url, json=payload) as response:
+                return await response.text()
+        else:
+            response = await self._async_runtime_client.invoke_endpoint(
+                EndpointName=self.endpoint_name,
+                Body=json.dumps(payload),
+                ContentType="application/json",
+                Accept="application/json",
+                CustomAttributes="accept_eula=True",
+            )
+            async with response["Body"] as body:
+                return json.loads(await body.read())
+
+    async def predict_stream_async(self, payload: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """Invoke the endpoint like `predict_stream` without blocking the event loop. Requires `open_async`."""
+        payload = {**payload, "stream": True}
+        if self.predictor is None:
+            async with self._async_http_session.post(self.endpoint_url, json=payload) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_any():
+                    yield chunk
+        else:
+            response = await self._async_runtime_client.invoke_endpoint_with_response_stream(
+                EndpointName=self.endpoint_name,
+                Body=json.dumps(payload),
+                ContentType="application/json",
+                CustomAttributes="accept_eula=True",
+            )
+            async for event in response["Body"]:
+                if "PayloadPart" in event:
+                    yield event["PayloadPart"]["Bytes"]
+
     def delete_model(self):
         if self.predictor is not None:
             self.predictor.delete_model()
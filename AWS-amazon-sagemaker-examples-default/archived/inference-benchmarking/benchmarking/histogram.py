@@ -0,0 +1,89 @@
+import math
+from typing import Any, Dict, Optional, Union
+
+from benchmarking.constants import HISTOGRAM_RELATIVE_ACCURACY
+
+
+HISTOGRAM_MIN_TRACKABLE_VALUE = 1e-9
+STATISTICS_QUANTILES = {"p50": 0.50, "p90": 0.90, "p95": 0.95, "p99": 0.99}
+
+
+class LogHistogram:
+    """A mergeable histogram with logarithmically sized buckets.
+
+    Values are assigned to buckets whose width grows geometrically, so any quantile estimate lies within
+    `relative_accuracy` of the true value while memory is bounded by the dynamic range of the data rather than by the
+    number of recorded values. Count, sum, minimum and maximum are tracked exactly. Values smaller than
+    `HISTOGRAM_MIN_TRACKABLE_VALUE` (including zero and negative values) share a single zero bucket.
+    """
+
+    def __init__(self, relative_accuracy: float = HISTOGRAM_RELATIVE_ACCURACY) -> None:
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError(f"Relative accuracy must be in (0, 1), got {relative_accuracy}.")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def record(self, value: Union[float, int], count: int = 1) -> None:
+        """Add a value to the histogram `count` times."""
+        if value < HISTOGRAM_MIN_TRACKABLE_VALUE:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        """Merge the counts of another histogram with the same relative accuracy into this histogram."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge histograms with different relative accuracy.")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-th quantile from the bucket holding the value of rank `q * (count - 1)`."""
+        if self.count == 0:
+            return None
+        if not 0.0 <= q <= 1.0:
+            raise ValueError(f"Quantile must be in [0, 1], got {q}.")
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(self.minimum, 0.0)
+        cumulative = self.zero_count
+        for index in sorted(self.buckets):
+            cumulative += self.buckets[index]
+            if rank < cumulative:
+                value = 2.0 * self._gamma**index / (self._gamma + 1.0)
+                return min(max(value, self.minimum), self.maximum)
+        return self.maximum
+
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_statistics(self) -> Dict[str, Any]:
+        """Summarize the histogram as reported by `InvocationStatisticsAggregator.get_statistics` for each metric."""
+        if self.count == 0:
+            return {}
+        statistics: Dict[str, Any] = {
+            "Median": self.quantile(0.50),
+            "Average": self.mean(),
+            "Minimum": self.minimum,
+            "Maximum": self.maximum,
+        }
+        statistics.update({name: self.quantile(q) for name, q in STATISTICS_QUANTILES.items()})
+        return statistics
@@ -1,13 +1,17 @@
+import asyncio
+from collections import OrderedDict
+from collections import defaultdict
 from concurrent import futures
 import datetime
-from copy import deepcopy
 import logging
-from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Type, Union
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Type
 import math
+import queue
+import random
+import threading
 import time
 
 import boto3
-import numpy as np
 from sagemaker.predictor import Predictor
 from transformers import AutoTokenizer
 from transformers import PreTrainedTokenizerBase
@@ -17,10 +21,19 @@ from benchmarking.constants import (
     CLOUDWATCH_PERIOD_SECONDS,
     SM_INVOCATION_TIMEOUT_SECONDS,
 )
+from benchmarking.constants import OPEN_LOOP_ARRIVAL_LAG_WARNING_SECONDS
+from benchmarking.constants import OPEN_LOOP_MAX_IN_FLIGHT_REQUESTS
+from benchmarking.constants import OPEN_LOOP_TARGET_REQUESTS_PER_SECOND
 from benchmarking.constants import MAX_TOTAL_RETRY_TIME_SECONDS
 from benchmarking.constants import RETRY_WAIT_TIME_SECONDS
+from benchmarking.constants import TOKEN_COUNT_CACHE_SIZE
+from benchmarking.constants import TOKENIZER_BATCH_SIZE
+from benchmarking.histogram import LogHistogram
 from benchmarking.logging import logging_prefix
 from benchmarking.custom_predictor import CustomPredictor
+from benchmarking.mock_endpoint import MockPredictor
+from benchmarking.streaming import aiter_stream_text
+from benchmarking.streaming import iter_stream_text
 
 
 class PredictionResult(NamedTuple):
@@ -30,11 +43,63 @@ class PredictionResult(NamedTuple):
     time_utc_end: datetime.datetime
     payload: Dict[str, Any]
     result: Any
+    time_utc_scheduled: Optional[datetime.datetime] = None
+    time_utc_chunks: Optional[List[datetime.datetime]] = None
+    num_output_tokens: Optional[int] = None
+    num_chunk_tokens: Optional[List[int]] = None
 
     def client_latency(self) -> float:
         """The client latency for this single prediction."""
         return (self.time_utc_end - self.time_utc_start).total_seconds() * 1e3
 
+    def queueing_delay(self) -> float:
+        """The delay between the intended and the actual send time of an open-loop prediction."""
+        return (self.time_utc_start - self.time_utc_scheduled).total_seconds() * 1e3
+
+    def intended_latency(self) -> float:
+        """The latency measured from the intended send time, free of coordinated omission."""
+        return (self.time_utc_end - self.time_utc_scheduled).total_seconds() * 1e3
+
+    def time_to_first_token(self) -> float:
+        """The latency until the first text chunk, which holds the first generated token, of a streaming prediction."""
+        return (self.time_utc_chunks[0] - self.time_utc_start).total_seconds() * 1e3
+
+    def inter_chunk_latencies(self) -> List[float]:
+        """The gaps between consecutive text chunks of a streaming prediction.
+
+        A chunk holds one or more tokens, depending on how the server batches its stream, so these are not inter-token
+        latencies, see `inter_token_latencies`.
+        """
+        return [
+            (time_end - time_start).total_seconds() * 1e3
+            for time_start, time_end in zip(self.time_utc_chunks[:-1], self.time_utc_chunks[1:])
+        ]
+
+    def chunks_per_second(self) -> float:
+        """The rate at which text chunks were received after the first chunk of a streaming prediction."""
+        decode_seconds = (self.time_utc_chunks[-1] - self.time_utc_chunks[0]).total_seconds()
+        return (len(self.time_utc_chunks) - 1) / decode_seconds
+
+    def inter_token_latencies(self) -> List[float]:
+        """The gaps between consecutive generated tokens of a streaming prediction, one per token after the first chunk.
+
+        The gap before a chunk is spread evenly over the `num_chunk_tokens` of that chunk. Chunks without tokens are
+        merged into the next chunk.
+        """
+        latencies: List[float] = []
+        time_previous = self.time_utc_chunks[0]
+        for time_chunk, num_tokens in zip(self.time_utc_chunks[1:], self.num_chunk_tokens[1:]):
+            if num_tokens > 0:
+                latency = (time_chunk - time_previous).total_seconds() * 1e3 / num_tokens
+                latencies.extend([latency] * num_tokens)
+                time_previous = time_chunk
+        return latencies
+
+    def tokens_per_second(self) -> float:
+        """The rate at which tokens were received after the first chunk of a streaming prediction."""
+        decode_seconds = (self.time_utc_chunks[-1] - self.time_utc_chunks[0]).total_seconds()
+        return sum(self.num_chunk_tokens[1:]) / decode_seconds
+
     def input_sequence_num_words(self) -> int:
         """The word count of the input sequence."""
         return self._num_words(self._text_inputs())
@@ -44,7 +109,7 @@ class PredictionResult(NamedTuple):
 
         Text generation models, by default, include the input sequence in the model response.
         """
-        data = deepcopy(self.result)
+        data = self.result
         while not isinstance(data, str):
             if isinstance(data, list):
                 data = data[0]
@@ -69,7 +134,9 @@ class PredictionResult(NamedTuple):
         return self._num_words(self.output_sequence())
 
     def num_tokens(self, tokenizer: PreTrainedTokenizerBase) -> int:
-        """The token count of the output sequence."""
+        """The token count of the output sequence, using the stored count if one is available."""
+        if self.num_output_tokens is not None:
+            return self.num_output_tokens
         return len(tokenizer.encode(self.output_sequence()))
 
     def _text_inputs(self) -> str:
@@ -85,88 +152,274 @@ class PredictionResult(NamedTuple):
         return len(text.split())
 
 
-class BatchInvocationStatistics(NamedTuple):
-    """A NamedTuple holding start and stop times for a batch of endpoint predictions."""
-
-    time_utc_start: datetime.datetime
-    time_utc_end: datetime.datetime
-    num_invocations: int
-    results: List[PredictionResult]
-
-    def _duration_seconds(self) -> float:
-        """Computes the time in seconds of the batch load test."""
-        return (self.time_utc_end - self.time_utc_start).total_seconds()
+class TokenCounter:
+    """Count tokens of many texts with the tokenizer batch-encode API and cache counts of repeated texts."""
 
-    def _throughput(self, values: List[int]) -> float:
-        """Computes the number of invocation responses per second."""
-        return sum(values) / self._duration_seconds()
+    def __init__(
+        self,
+        tokenizer: PreTrainedTokenizerBase,
+        cache_size: int = TOKEN_COUNT_CACHE_SIZE,
+        add_special_tokens: bool = True,
+    ) -> None:
+        self.tokenizer = tokenizer
+        self.cache_size = cache_size
+        self.add_special_tokens = add_special_tokens
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+
+    def count(self, texts: List[str]) -> List[int]:
+        """The token count of each text, encoding every distinct uncached text once in a single batch."""
+        uncached = list({text: None for text in texts if text not in self._cache})
+        if uncached:
+            input_ids = self.tokenizer(
+                uncached, return_attention_mask=False, add_special_tokens=self.add_special_tokens
+            )["input_ids"]
+            for text, ids in zip(uncached, input_ids):
+                self._cache[text] = len(ids)
+        counts = []
+        for text in texts:
+            self._cache.move_to_end(text)
+            counts.append(self._cache[text])
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return counts
+
+
+class _PendingTokenCount(NamedTuple):
+    """A recorded result awaiting batched tokenization of its output sequence."""
+
+    output_sequence: str
+    num_tokens: Optional[int]
+    latency: float
+    elapsed_seconds: float
+
+
+class InvocationStatisticsAggregator:
+    """Incrementally aggregate PredictionResults into log-bucketed histograms and throughput counters.
+
+    Each result is processed once when it is recorded, so statistics are computed in a single pass and memory does not
+    grow with the number of invocations. Results that already carry a token count, such as those of a LoadTester with a
+    tokenizer, are not tokenized again. Other output sequences are queued and tokenized in batches of
+    `tokenizer_batch_size` on a background thread. Recording is thread-safe, and aggregators of load tests that ran
+    concurrently with the same start time can be merged.
+    """
 
-    def _throughput_robust(self, values: List[int]) -> float:
-        """Computes the median throughput of result values in units values per second to eliminate outliers."""
-        throughput_values = [
-            sum(values[: (i + 1)]) / (result.time_utc_end - self.time_utc_start).total_seconds()
-            for i, result in enumerate(self.results)
-        ]
-        return self._collect_statistics(throughput_values)["Maximum"]
+    def __init__(
+        self,
+        time_utc_start: datetime.datetime,
+        tokenizer: Optional[PreTrainedTokenizerBase] = None,
+        tokenizer_batch_size: int = TOKENIZER_BATCH_SIZE,
+    ) -> None:
+        self.time_utc_start = time_utc_start
+        self.tokenizer = tokenizer
+        self.tokenizer_batch_size = tokenizer_batch_size
+        self.histograms: Dict[str, LogHistogram] = defaultdict(LogHistogram)
+        self.totals: Dict[str, float] = defaultdict(float)
+        self.throughput_robust: Dict[str, float] = defaultdict(float)
+        self._token_counter = TokenCounter(tokenizer) if tokenizer is not None else None
+        # Each tokenizer thread consumes its own queue until `flush` puts the `None` sentinel
+        self._pending_token_counts: Optional["queue.Queue[Optional[_PendingTokenCount]]"] = None
+        self._token_thread: Optional[threading.Thread] = None
+        self._token_exception: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._token_counter_lock = threading.Lock()
+
+    def record(self, result: PredictionResult) -> None:
+        """Add a single prediction result to the aggregate statistics."""
+        output_sequence = result.output_sequence()
+        num_words = result._num_words(output_sequence)
+        latency = result.client_latency()
+        values = {
+            "InputSequenceWords": result.input_sequence_num_words(),
+            "OutputSequenceWords": num_words,
+            "Latency": latency,
+        }
+        if num_words > 0:
+            values["LatencyPerWord"] = latency / num_words
+        if result.time_utc_scheduled is not None:
+            values["QueueingDelay"] = result.queueing_delay()
+            values["IntendedLatency"] = result.intended_latency()
+        inter_chunk_latencies: List[float] = []
+        inter_token_latencies: List[float] = []
+        if result.time_utc_chunks:
+            values["TimeToFirstToken"] = result.time_to_first_token()
+            inter_chunk_latencies = result.inter_chunk_latencies()
+            if result.num_chunk_tokens is not None:
+                inter_token_latencies = result.inter_token_latencies()
+            if result.time_utc_chunks[-1] > result.time_utc_chunks[0]:
+                values["ChunksPerSecond"] = result.chunks_per_second()
+                if result.num_chunk_tokens is not None:
+                    values["TokensPerSecond"] = result.tokens_per_second()
+        elapsed_seconds = (result.time_utc_end - self.time_utc_start).total_seconds()
+
+        with self._lock:
+            for name, value in values.items():
+                self.histograms[name].record(value)
+            for inter_chunk_latency in inter_chunk_latencies:
+                self.histograms["InterChunkLatency"].record(inter_chunk_latency)
+            for inter_token_latency in inter_token_latencies:
+                self.histograms["InterTokenLatency"].record(inter_token_latency)
+            self._add_total("Request", 1, elapsed_seconds)
+            self._add_total("Word", num_words, elapsed_seconds)
+            if self.tokenizer is not None:
+                if self._token_thread is None:
+                    self._pending_token_counts = queue.Queue()
+                    self._token_thread = threading.Thread(
+                        target=self._count_tokens, args=(self._pending_token_counts,), daemon=True
+                    )
+                    self._token_thread.start()
+                pending = _PendingTokenCount(output_sequence, result.num_output_tokens, latency, elapsed_seconds)
+                self._pending_token_counts.put(pending)
+
+    def flush(self) -> None:
+        """Wait until all queued output sequences are tokenized and their token statistics are recorded."""
+        with self._flush_lock:
+            with self._lock:
+                token_thread, self._token_thread = self._token_thread, None
+                if token_thread is not None:
+                    self._pending_token_counts.put(None)
+            if token_thread is not None:
+                token_thread.join()
+            if self._token_exception is not None:
+                exception, self._token_exception = self._token_exception, None
+                raise exception
+
+    def _count_tokens(self, pending_token_counts: "queue.Queue[Optional[_PendingTokenCount]]") -> None:
+        """Tokenize queued output sequences in batches until the `None` sentinel put by `flush` is received."""
+        done = False
+        while not done:
+            pending: List[_PendingTokenCount] = []
+            while len(pending) < self.tokenizer_batch_size:
+                item = pending_token_counts.get()
+                if item is None:
+                    done = True
+                    break
+                pending.append(item)
+            if not pending or self._token_exception is not None:
+                continue
+            try:
+                self._record_token_counts(pending)
+            except Exception as e:
+                self._token_exception = e
+
+    def _record_token_counts(self, pending: List[_PendingTokenCount]) -> None:
+        uncounted = [x.output_sequence for x in pending if x.num_tokens is None]
+        with self._token_counter_lock:
+            counts = iter(self._token_counter.count(uncounted))
+        with self._lock:
+            for x in pending:
+                num_tokens = x.num_tokens if x.num_tokens is not None else next(counts)
+                self.histograms["OutputSequenceTokens"].record(num_tokens)
+                if num_tokens > 0:
+                    self.histograms["LatencyPerToken"].record(x.latency / num_tokens)
+                self._add_total("Token", num_tokens, x.elapsed_seconds)
+
+    def _add_total(self, name: str, count: int, elapsed_seconds: float) -> None:
+        self.totals[name] += count
+        if elapsed_seconds > 0:
+            throughput = self.totals[name] / elapsed_seconds
+            self.throughput_robust[name] = max(self.throughput_robust[name], throughput)
+
+    def merge(self, other: "InvocationStatisticsAggregator") -> "InvocationStatisticsAggregator":
+        """Merge another aggregator into this one.
+
+        Robust throughputs are summed, which assumes both aggregators observed concurrent load against the same
+        endpoint starting at the same time.
+        """
+        self.flush()
+        other.flush()
+        with self._lock:
+            for name, histogram in other.histograms.items():
+                self.histograms[name].merge(histogram)
+            for name, total in other.totals.items():
+                self.totals[name] += total
+            for name, throughput in other.throughput_robust.items():
+                self.throughput_robust[name] += throughput
+        return self
 
     def get_statistics(
         self,
-        tokenizer: Optional[PreTrainedTokenizerBase] = None,
+        time_utc_end: datetime.datetime,
         price_per_endpoint: Optional[float] = None,
     ) -> Dict[str, Any]:
         """Collect statistics on the number of input/output sequence words, the latency, and the latency per word."""
-        latency_per_word = self._collect_statistics(
-            [x.client_latency() / x.num_words() for x in self.results if x.num_words() > 0]
-        )
-        word_throughput_robust = self._throughput_robust([x.num_words() for x in self.results])
-        time_to_generate_1m_words = 1e6 / word_throughput_robust / 3600
+        self.flush()
+        duration_seconds = (time_utc_end - self.time_utc_start).total_seconds()
+        word_throughput_robust = self.throughput_robust["Word"]
+        time_to_generate_1m_words = self._time_to_generate_1m(word_throughput_robust)
         statistics: Dict[str, Any] = {
-            "InputSequenceWords": self._collect_statistics([x.input_sequence_num_words() for x in self.results]),
-            "OutputSequenceWords": self._collect_statistics([x.num_words() for x in self.results]),
-            "Latency": self._collect_statistics([x.client_latency() for x in self.results]),
-            "LatencyPerWord": latency_per_word,
-            "TestDuration": self._duration_seconds(),
-            "RequestThroughputRobust": self._throughput_robust([1 for _ in self.results]),
-            "RequestThroughput": self._throughput([1 for _ in self.results]),
-            "WordThroughputRobust": word_throughput_robust,
-            "WordThroughput": self._throughput([x.num_words() for x in self.results]),
-            "TimeToGenerate1MWords": time_to_generate_1m_words,
+            name: self.histograms[name].to_statistics()
+            for name in ["InputSequenceWords", "OutputSequenceWords", "Latency", "LatencyPerWord"]
         }
-        if tokenizer is not None:
-            output_sequence_tokens = [x.num_tokens(tokenizer) for x in self.results]
-            latency_per_token = self._collect_statistics(
-                [x.client_latency() / x.num_tokens(tokenizer) for x in self.results if x.num_tokens(tokenizer) > 0]
-            )
-            token_throughput = self._throughput(output_sequence_tokens)
-            token_throughput_robust = self._throughput_robust(output_sequence_tokens)
-            time_to_generate_1m_tokens = 1e6 / token_throughput / 3600
+        statistics.update(
+            {
+                "TestDuration": duration_seconds,
+                "RequestThroughputRobust": self.throughput_robust["Request"],
+                "RequestThroughput": self.totals["Request"] / duration_seconds,
+                "WordThroughputRobust": word_throughput_robust,
+                "WordThroughput": self.totals["Word"] / duration_seconds,
+                "TimeToGenerate1MWords": time_to_generate_1m_words,
+            }
+        )
+        for name in [
+            "QueueingDelay",
+            "IntendedLatency",
+            "TimeToFirstToken",
+            "InterTokenLatency",
+            "TokensPerSecond",
+            "InterChunkLatency",
+            "ChunksPerSecond",
+        ]:
+            if name in self.histograms:
+                statistics[name] = self.histograms[name].to_statistics()
+        if price_per_endpoint is not None:
+            statistics["CostToGenerate1MWords"] = time_to_generate_1m_words * price_per_endpoint
+        if self.tokenizer is not None:
+            token_throughput = self.totals["Token"] / duration_seconds
+            time_to_generate_1m_tokens = self._time_to_generate_1m(token_throughput)
             statistics.update(
                 {
-                    "OutputSequenceTokens": self._collect_statistics([output_sequence_tokens for x in self.results]),
-                    "LatencyPerToken": latency_per_token,
-                    "TokenThroughputRobust": token_throughput_robust,
+                    "OutputSequenceTokens": self.histograms["OutputSequenceTokens"].to_statistics(),
+                    "LatencyPerToken": self.histograms["LatencyPerToken"].to_statistics(),
+                    "TokenThroughputRobust": self.throughput_robust["Token"],
                     "TokenThroughput": token_throughput,
                     "TimeToGenerate1MTokens": time_to_generate_1m_tokens,
                 }
             )
-        if price_per_endpoint is not None:
-            statistics.update({"CostToGenerate1MTokens": time_to_generate_1m_tokens * price_per_endpoint})
-            if tokenizer is not None:
-                statistics.update({"CostToGenerate1MTokens": time_to_generate_1m_tokens * price_per_endpoint})
+            if price_per_endpoint is not None:
+                statistics["CostToGenerate1MTokens"] = time_to_generate_1m_tokens * price_per_endpoint
         return statistics
 
     @staticmethod
-    def _collect_statistics(data: List[Union[float, int]]) -> Dict[str, Any]:
-        return {
-            "Median": np.median(data).item(),
-            "Average": np.average(data).item(),
-            "Minimum": np.amin(data).item(),
-            "Maximum": np.amax(data).item(),
-            "p50": np.quantile(data, 0.50).item(),
-            "p90": np.quantile(data, 0.90).item(),
-            "p95": np.quantile(data, 0.95).item(),
-            "p99": np.quantile(data, 0.99).item(),
-        }
+    def _time_to_generate_1m(throughput: float) -> float:
+        """The time in hours to generate one million units at the given throughput in units per second."""
+        return 1e6 / throughput / 3600 if throughput > 0 else math.inf
+
+
+class BatchInvocationStatistics(NamedTuple):
+    """A NamedTuple holding start and stop times for a batch of endpoint predictions.
+
+    If an aggregator was populated while the load test ran, statistics are read from it and `results` may be empty.
+    """
+
+    time_utc_start: datetime.datetime
+    time_utc_end: datetime.datetime
+    num_invocations: int
+    results: List[PredictionResult]
+    aggregator: Optional[InvocationStatisticsAggregator] = None
+
+    def get_statistics(
+        self,
+        tokenizer: Optional[PreTrainedTokenizerBase] = None,
+        price_per_endpoint: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Collect statistics on the number of input/output sequence words, the latency, and the latency per word."""
+        aggregator = self.aggregator
+        if aggregator is None:
+            aggregator = InvocationStatisticsAggregator(self.time_utc_start, tokenizer)
+            for result in self.results:
+                aggregator.record(result)
+        return aggregator.get_statistics(self.time_utc_end, price_per_endpoint)
 
 
 class LoadTester:
@@ -179,6 +432,8 @@ class LoadTester:
         tokenizer_model_id: Optional[str] = None,
         huggingface_hub_token: Optional[str] = None,
         price_per_endpoint: Optional[float] = None,
+        retain_results: bool = True,
+        stream: bool = False,
     ) -> None:
         self.predictor = predictor
         self.payload = payload
@@ -187,16 +442,125 @@ class LoadTester:
         self._logging_prefix = logging_prefix(self.model_id, self.payload_name)
         if tokenizer_model_id is not None:
             self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_model_id, token=huggingface_hub_token)
+            self._token_counter: Optional[TokenCounter] = TokenCounter(self.tokenizer)
+            # Chunks are pieces of one sequence, so special tokens such as a beginning-of-sequence token are not counted
+            self._chunk_token_counter: Optional[TokenCounter] = TokenCounter(self.tokenizer, add_special_tokens=False)
         else:
             self.tokenizer = None
+            self._token_counter = None
+            self._chunk_token_counter = None
+        self._token_counter_lock = threading.Lock()
         self.price_per_endpoint = price_per_endpoint
+        self.retain_results = retain_results
+        self.stream = stream
 
-    def predict_once_and_collect_client_results(self) -> PredictionResult:
+    def predict_once_and_collect_client_results(
+        self, time_utc_scheduled: Optional[datetime.datetime] = None
+    ) -> PredictionResult:
         """Perform a single endpoint prediction and produce a PredictionResult."""
         time_utc_start = datetime.datetime.utcnow()
         result = self.predictor.predict(self.payload)
         time_utc_end = datetime.datetime.utcnow()
-        return PredictionResult(time_utc_start, time_utc_end, self.payload, result)
+        return self._count_tokens(
+            PredictionResult(time_utc_start, time_utc_end, self.payload, result, time_utc_scheduled)
+        )
+
+    def predict_stream_once_and_collect_client_results(
+        self, time_utc_scheduled: Optional[datetime.datetime] = None
+    ) -> PredictionResult:
+        """Perform a single streaming endpoint prediction and produce a PredictionResult with chunk arrival times.
+
+        If a tokenizer is configured, the token count of each chunk is recorded for inter-token latency statistics.
+        """
+        text_pieces: List[str] = []
+        time_utc_chunks: List[datetime.datetime] = []
+        time_utc_start = datetime.datetime.utcnow()
+        for text in iter_stream_text(self.predictor.predict_stream(self.payload)):
+            time_utc_chunks.append(datetime.datetime.utcnow())
+            text_pieces.append(text)
+        time_utc_end = datetime.datetime.utcnow()
+        result = "".join(text_pieces)
+        return self._count_tokens(
+            PredictionResult(time_utc_start, time_utc_end, self.payload, result, time_utc_scheduled, time_utc_chunks),
+            text_pieces,
+        )
+
+    async def predict_once_and_collect_client_results_async(
+        self, time_utc_scheduled: Optional[datetime.datetime] = None
+    ) -> PredictionResult:
+        """Like `predict_once_and_collect_client_results`, but without blocking the event loop on the request."""
+        time_utc_start = datetime.datetime.utcnow()
+        result = await self.predictor.predict_async(self.payload)
+        time_utc_end = datetime.datetime.utcnow()
+        result = PredictionResult(time_utc_start, time_utc_end, self.payload, result, time_utc_scheduled)
+        return await self._count_tokens_async(result)
+
+    async def predict_stream_once_and_collect_client_results_async(
+        self, time_utc_scheduled: Optional[datetime.datetime] = None
+    ) -> PredictionResult:
+        """Like `predict_stream_once_and_collect_client_results`, but without blocking the event loop on the request."""
+        text_pieces: List[str] = []
+        time_utc_chunks: List[datetime.datetime] = []
+        time_utc_start = datetime.datetime.utcnow()
+        async for text in aiter_stream_text(self.predictor.predict_stream_async(self.payload)):
+            time_utc_chunks.append(datetime.datetime.utcnow())
+            text_pieces.append(text)
+        time_utc_end = datetime.datetime.utcnow()
+        result = "".join(text_pieces)
+        result = PredictionResult(
+            time_utc_start, time_utc_end, self.payload, result, time_utc_scheduled, time_utc_chunks
+        )
+        return await self._count_tokens_async(result, text_pieces)
+
+    def _count_tokens(self, result: PredictionResult, text_pieces: Optional[List[str]] = None) -> PredictionResult:
+        """Set the output token count of a prediction, and of each streamed text piece, if a tokenizer is configured.
+
+        Tokens are counted after the end time of the prediction was taken, so they do not add to its latency.
+        """
+        if self._token_counter is None:
+            return result
+        with self._token_counter_lock:
+            (num_output_tokens,) = self._token_counter.count([result.output_sequence()])
+            num_chunk_tokens = None
+            if text_pieces is not None:
+                num_chunk_tokens = self._chunk_token_counter.count(text_pieces)
+        return result._replace(num_output_tokens=num_output_tokens, num_chunk_tokens=num_chunk_tokens)
+
+    async def _count_tokens_async(
+        self, result: PredictionResult, text_pieces: Optional[List[str]] = None
+    ) -> PredictionResult:
+        """Like `_count_tokens`, but tokenizing on the default executor so the event loop keeps dispatching."""
+        if self._token_counter is None:
+            return result
+        return await asyncio.get_running_loop().run_in_executor(None, self._count_tokens, result, text_pieces)
+
+    def _predict_and_record(
+        self,
+        aggregator: InvocationStatisticsAggregator,
+        time_utc_scheduled: Optional[datetime.datetime] = None,
+    ) -> Optional[PredictionResult]:
+        """Perform a single endpoint prediction, record it in the aggregator, and return it if results are retained."""
+        if self.stream:
+            result = self.predict_stream_once_and_collect_client_results(time_utc_scheduled)
+        else:
+            result = self.predict_once_and_collect_client_results(time_utc_scheduled)
+        aggregator.record(result)
+        return result if self.retain_results else None
+
+    async def _predict_and_record_async(
+        self,
+        aggregator: InvocationStatisticsAggregator,
+        time_utc_scheduled: datetime.datetime,
+        request_slots: asyncio.Semaphore,
+    ) -> Optional[PredictionResult]:
+        """Like `_predict_and_record`, but sending the request once one of the `request_slots` is free."""
+        async with request_slots:
+            if self.stream:
+                result = await self.predict_stream_once_and_collect_client_results_async(time_utc_scheduled)
+            else:
+                result = await self.predict_once_and_collect_client_results_async(time_utc_scheduled)
+        aggregator.record(result)
+        return result if self.retain_results else None
 
     def run_load_test(self, num_invocations: int, max_workers: int) -> Optional[BatchInvocationStatistics]:
         """Concurrently invoke an endpoint prediction multiple times and gather results in BatchInvocationStatistics."""
@@ -205,11 +569,10 @@ class LoadTester:
         _logging_prefix = logging_prefix(self.model_id, self.payload_name, max_workers)
 
         logging.info(f"{_logging_prefix} Begin throughput load test ...")
+        aggregator = InvocationStatisticsAggregator(time_utc_start, self.tokenizer)
 
         with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures_list = [
-                executor.submit(self.predict_once_and_collect_client_results) for _ in range(num_invocations)
-            ]
+            futures_list = [executor.submit(self._predict_and_record, aggregator) for _ in range(num_invocations)]
             done, not_done = futures.wait(
                 futures_list,
                 timeout=timeout_seconds,
@@ -230,7 +593,162 @@ class LoadTester:
             results = [future.result(timeout=0.0) for future in futures_list]
 
         time_utc_end = datetime.datetime.utcnow()
-        return BatchInvocationStatistics(time_utc_start, time_utc_end, num_invocations, results)
+        results = [result for result in results if result is not None]
+        return BatchInvocationStatistics(time_utc_start, time_utc_end, num_invocations, results, aggregator)
+
+    def run_open_loop_load_test(
+        self,
+        num_invocations: int,
+        target_requests_per_second: float = OPEN_LOOP_TARGET_REQUESTS_PER_SECOND,
+        arrival_process: str = "poisson",
+        max_in_flight_requests: int = OPEN_LOOP_MAX_IN_FLIGHT_REQUESTS,
+        seed: Optional[int] = None,
+    ) -> BatchInvocationStatistics:
+        """Invoke an endpoint on a fixed arrival schedule and gather results in BatchInvocationStatistics.
+
+        Unlike `run_load_test`, requests are sent at their scheduled time regardless of whether earlier requests have
+        completed, which avoids coordinated omission. Each PredictionResult records its intended send time so that
+        client-side queueing delay is reported alongside latency.
+
+        Arguments:
+            num_invocations (int): The total number of requests to send.
+            target_requests_per_second (float): The mean request arrival rate.
+            arrival_process (str): Either "poisson" (exponential inter-arrival times) or "constant".
+            max_in_flight_requests (int): Upper bound on outstanding requests, which is also the connection pool size.
+                Requests are sent with the non-blocking `predict_async` or `predict_stream_async` of the predictor
+                from a single event loop, so outstanding requests do not occupy threads. Requests scheduled while this
+                bound is reached are delayed, the delay is reported as queueing delay, and a warning is logged because
+                the schedule is no longer followed.
+            seed (Optional[int]): Seed for the arrival schedule to make runs reproducible.
+        """
+        _logging_prefix = logging_prefix(self.model_id, self.payload_name)
+        logging.info(
+            f"{_logging_prefix} Begin open-loop load test at {target_requests_per_second} requests/s "
+            f"({arrival_process}) ..."
+        )
+        offsets = self._arrival_offsets(num_invocations, target_requests_per_second, arrival_process, seed)
+        timeout_seconds = offsets[-1] + SM_INVOCATION_TIMEOUT_SECONDS if offsets else SM_INVOCATION_TIMEOUT_SECONDS
+        return self._run_coroutine(self._run_open_loop(offsets, max_in_flight_requests, timeout_seconds))
+
+    def run_open_loop_throughput_load_test(
+        self,
+        num_invocations: int,
+        target_requests_per_second: float = OPEN_LOOP_TARGET_REQUESTS_PER_SECOND,
+        arrival_process: str = "poisson",
+        max_in_flight_requests: int = OPEN_LOOP_MAX_IN_FLIGHT_REQUESTS,
+    ) -> Dict[str, Any]:
+        self._reset_server_statistics()
+        statistics_open_loop = self.run_open_loop_load_test(
+            num_invocations, target_requests_per_second, arrival_process, max_in_flight_requests
+        )
+        metrics = statistics_open_loop.get_statistics(self.tokenizer, self.price_per_endpoint)
+        metrics.update(self._server_metrics(metrics))
+        metrics.update(
+            {
+                "ModelID": self.model_id,
+                "PayloadName": self.payload_name,
+                "Invocations": num_invocations,
+                "TargetRequestThroughput": target_requests_per_second,
+                "ArrivalProcess": arrival_process,
+            }
+        )
+        return metrics
+
+    async def _run_open_loop(
+        self, offsets: List[float], max_in_flight_requests: int, timeout_seconds: float
+    ) -> BatchInvocationStatistics:
+        """Dispatch one prediction task per schedule offset on the event loop and await all of them."""
+        loop = asyncio.get_running_loop()
+        time_utc_start = datetime.datetime.utcnow()
+        time_loop_start = loop.time()
+        aggregator = InvocationStatisticsAggregator(time_utc_start, self.tokenizer)
+        request_slots = asyncio.Semaphore(max_in_flight_requests)
+        tasks: List[asyncio.Task] = []
+        exceptions: List[BaseException] = []
+        saturation_warned = False
+        lag_warning_seconds = OPEN_LOOP_ARRIVAL_LAG_WARNING_SECONDS
+
+        def _on_done(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                exceptions.append(task.exception())
+
+        async with self.predictor.open_async(max_connections=max_in_flight_requests):
+            try:
+                for offset in offsets:
+                    delay = time_loop_start + offset - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    if exceptions:
+                        raise exceptions[0]
+                    lag = -delay
+                    if lag > lag_warning_seconds:
+                        logging.warning(
+                            f"{self._logging_prefix} Open-loop dispatch is {lag:.2f} s behind the arrival schedule."
+                        )
+                        lag_warning_seconds = 2 * lag
+                    if request_slots.locked() and not saturation_warned:
+                        logging.warning(
+                            f"{self._logging_prefix} All {max_in_flight_requests} request slots are busy, further "
+                            "requests are sent late. Their lateness is reported as QueueingDelay."
+                        )
+                        saturation_warned = True
+                    time_utc_scheduled = time_utc_start + datetime.timedelta(seconds=offset)
+                    task = asyncio.create_task(
+                        self._predict_and_record_async(aggregator, time_utc_scheduled, request_slots)
+                    )
+                    task.add_done_callback(_on_done)
+                    tasks.append(task)
+
+                remaining = max(time_loop_start + timeout_seconds - loop.time(), 0.0)
+                done, not_done = await asyncio.wait(tasks, timeout=remaining, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    if task.exception() is not None:
+                        raise task.exception()
+                if not_done:
+                    raise TimeoutError("Load test timeout.")
+            except BaseException as e:
+                logging.info(f"{self._logging_prefix} Cancelling and awaiting future completion: {e}")
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+        results = [task.result() for task in tasks if task.result() is not None]
+        time_utc_end = datetime.datetime.utcnow()
+        return BatchInvocationStatistics(time_utc_start, time_utc_end, len(tasks), results, aggregator)
+
+    @staticmethod
+    def _arrival_offsets(
+        num_invocations: int,
+        target_requests_per_second: float,
+        arrival_process: str,
+        seed: Optional[int] = None,
+    ) -> List[float]:
+        """Compute the send time of each request in seconds relative to the start of the load test."""
+        if target_requests_per_second <= 0:
+            raise ValueError(f"Target request rate must be positive, got {target_requests_per_second}.")
+        if arrival_process == "constant":
+            return [i / target_requests_per_second for i in range(num_invocations)]
+        elif arrival_process == "poisson":
+            rng = random.Random(seed)
+            offsets = []
+            offset = 0.0
+            for _ in range(num_invocations):
+                offsets.append(offset)
+                offset += rng.expovariate(target_requests_per_second)
+            return offsets
+        else:
+            raise ValueError(f"Unsupported arrival process '{arrival_process}'. Expected 'poisson' or 'constant'.")
+
+    @staticmethod
+    def _run_coroutine(coroutine: Any) -> Any:
+        """Run a coroutine to completion, also when called from a thread with a running event loop (e.g., Jupyter)."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        with futures.ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
 
     @staticmethod
     def _cancel_futures_and_wait(
@@ -260,8 +778,10 @@ class LoadTester:
         return metrics
 
     def run_throughput_load_test(self, num_invocations: int, max_workers: int) -> Dict[str, Any]:
+        self._reset_server_statistics()
         statistics_throughput = self.run_load_test(num_invocations, max_workers)
         metrics = statistics_throughput.get_statistics(self.tokenizer, self.price_per_endpoint)
+        metrics.update(self._server_metrics(metrics))
         metrics.update(
             {
                 "ModelID": self.model_id,
@@ -272,6 +792,25 @@ class LoadTester:
         )
         return metrics
 
+    def _reset_server_statistics(self) -> None:
+        if isinstance(self.predictor, MockPredictor):
+            self.predictor.reset_statistics()
+
+    def _server_metrics(self, client_metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Server-side statistics and the latency added by the client harness, available for mock endpoints only."""
+        if not isinstance(self.predictor, MockPredictor):
+            return {}
+        server_metrics = self.predictor.get_statistics()
+        client_latency = client_metrics.get("Latency") or {}
+        server_latency = server_metrics["ServerLatency"]
+        if not client_latency or not server_latency:
+            # No request completed on the client or the server, e.g., all of them were throttled
+            return {"Server": server_metrics, "HarnessOverhead": {}}
+        harness_overhead = {
+            name: client_latency[name] - server_latency[name] for name in ["Average", "p50", "p90", "p99"]
+        }
+        return {"Server": server_metrics, "HarnessOverhead": harness_overhead}
+
     def run_concurrency_probe(
         self,
         iterator_cls: Type[ConcurrentProbeIteratorBase],
@@ -0,0 +1,144 @@
+import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from benchmarking.constants import METRICS_STORE_PATH
+
+
+PARTITION_COLUMNS = ["ModelID", "PayloadName", "InstanceType", "RunDate"]
+INTEGER_COLUMNS = ["ConcurrentRequests", "Invocations", "metrics.ProductionVariant.InitialInstanceCount"]
+STRING_COLUMNS = ["CreationTime", "LastModifiedTime"]
+UNKNOWN_PARTITION_VALUE = "unknown"
+
+
+class MetricsStore:
+    """An append-only, Hive-partitioned Parquet store of benchmarking results.
+
+    Each load test result (concurrency probe step, throughput test or open-loop test) is stored as one row, with the
+    same column names as `Benchmarker.load_metrics_pandas` so loaded frames can be passed to
+    `Benchmarker.create_concurrency_probe_pivot_table`. Rows are partitioned by model ID, payload name, instance type
+    and run date, so filtered loads only open the files of matching partitions.
+    """
+
+    def __init__(self, root_path: Path = METRICS_STORE_PATH) -> None:
+        self.root_path = Path(root_path)
+        self._partitioning = ds.partitioning(
+            pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS]), flavor="hive"
+        )
+
+    def append(self, metrics: List[Dict[str, Any]], run_timestamp: Optional[datetime.datetime] = None) -> int:
+        """Append the `metrics` list of a benchmarking output to the store and return the number of rows written."""
+        df = self.flatten_metrics(metrics, run_timestamp or datetime.datetime.utcnow())
+        if df.empty:
+            return 0
+        pq.write_to_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            self.root_path,
+            partitioning=self._partitioning,
+            basename_template=f"{uuid.uuid4().hex}-{{i}}.parquet",
+        )
+        return len(df)
+
+    def load(
+        self,
+        model_ids: Optional[List[str]] = None,
+        payload_names: Optional[List[str]] = None,
+        instance_types: Optional[List[str]] = None,
+        test_types: Optional[List[str]] = None,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """Load rows matching all given filters, reading only the requested columns of matching partitions."""
+        if not self.root_path.exists():
+            return pd.DataFrame()
+
+        conditions = []
+        for column, values in [("ModelID", model_ids), ("PayloadName", payload_names), ("InstanceType", instance_types)]:
+            if values is not None:
+                conditions.append(ds.field(column).isin(values))
+        if test_types is not None:
+            conditions.append(ds.field("TestType").isin(test_types))
+        if since is not None:
+            conditions.append(ds.field("RunDate") >= since.date().isoformat())
+            conditions.append(ds.field("RunTimestamp") >= pa.scalar(since, type=pa.timestamp("us")))
+        if until is not None:
+            conditions.append(ds.field("RunDate") <= until.date().isoformat())
+            conditions.append(ds.field("RunTimestamp") <= pa.scalar(until, type=pa.timestamp("us")))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        dataset = ds.dataset(self.root_path, format="parquet", partitioning=self._partitioning)
+        fragments = list(dataset.get_fragments(filter=expression))
+        if not fragments:
+            return pd.DataFrame()
+
+        # Runs may add columns (e.g., streaming metrics), so unify the schemas of all matching files.
+        schema = pa.unify_schemas([dataset.schema] + [fragment.physical_schema for fragment in fragments])
+        dataset = ds.dataset(
+            [fragment.path for fragment in fragments],
+            schema=schema,
+            format="parquet",
+            partitioning=self._partitioning,
+            partition_base_dir=str(self.root_path),
+        )
+        df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+        for column in INTEGER_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].astype("Int64")
+        if "InstanceType" in df.columns:
+            df["metrics.ProductionVariant.InstanceType"] = df["InstanceType"]
+        return df
+
+    @staticmethod
+    def flatten_metrics(metrics: List[Dict[str, Any]], run_timestamp: datetime.datetime) -> pd.DataFrame:
+        """Flatten benchmarking metrics into one row per load test result with partition and run columns."""
+        records = []
+        for entry in metrics:
+            production_variant = entry.get("ProductionVariant", {})
+            meta = {
+                "ModelID": entry.get("ModelID"),
+                "PayloadName": entry.get("PayloadName"),
+                "InstanceType": production_variant.get("InstanceType") or UNKNOWN_PARTITION_VALUE,
+                "metrics.ProductionVariant.InitialInstanceCount": production_variant.get("InitialInstanceCount"),
+                "metrics.PricePerEndpoint": entry.get("PricePerEndpoint"),
+                "metrics.PricePerInstance": entry.get("PricePerInstance"),
+                "metrics.DeploymentTime": entry.get("DeploymentTime"),
+                "RunTimestamp": run_timestamp,
+                "RunDate": run_timestamp.date().isoformat(),
+            }
+            tests = [("ConcurrencyProbe", result) for result in entry.get("ConcurrencyProbe", [])]
+            if "OpenLoop" in entry:
+                tests.append(("OpenLoop", entry["OpenLoop"]))
+            if "RequestThroughput" in entry:
+                throughput = {k: v for k, v in entry.items() if k not in ("ConcurrencyProbe", "OpenLoop")}
+                tests.append(("Throughput", throughput))
+            for test_type, result in tests:
+                record = {**result, "TestType": test_type}
+                for key, value in meta.items():
+                    if value is not None or key not in record:
+                        record[key] = value
+                records.append(record)
+
+        df = pd.json_normalize(records)
+        for column in PARTITION_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].fillna(UNKNOWN_PARTITION_VALUE).astype(str)
+        # Cast values to stable types so files written by different runs have compatible schemas.
+        for column in df.columns:
+            if column in PARTITION_COLUMNS or column == "RunTimestamp":
+                continue
+            if pd.api.types.is_bool_dtype(df[column]):
+                continue
+            if pd.api.types.is_numeric_dtype(df[column]) and column not in STRING_COLUMNS:
+                df[column] = df[column].astype("float64")
+            else:
+                df[column] = df[column].astype("string")
+        return df
@@ -0,0 +1,227 @@
+import asyncio
+from collections import deque
+import contextlib
+import json
+import math
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from benchmarking.custom_predictor import CustomPredictor
+from benchmarking.histogram import LogHistogram
+
+
+MOCK_ENDPOINT_NAME = "mock-endpoint"
+MOCK_GENERATED_TOKEN = " token"
+MOCK_DEFAULT_MAX_NEW_TOKENS = 32
+
+
+class MockEndpointThrottlingError(Exception):
+    """Raised when a request arrives while the mock endpoint queue is full."""
+
+
+class MockPredictor(CustomPredictor):
+    """A local simulated text generation endpoint with the CustomPredictor interface.
+
+    Each request waits for one of `max_concurrency` slots, then spends a sampled time to first token followed by
+    `max_new_tokens` tokens generated at `tokens_per_second`. Requests beyond the concurrency limit queue in arrival
+    order, and requests beyond `max_queue_size` are rejected with MockEndpointThrottlingError. The endpoint records its
+    own queue, service and total latency so the latency added by the client harness can be measured offline.
+    Asynchronous requests (`predict_async` and `predict_stream_async`) are simulated on the event loop without threads
+    and queue separately from blocking requests, so one load test should use either kind.
+
+    Supported time to first token distributions are "constant", "exponential" and "lognormal" (mean-preserving, with
+    shape `time_to_first_token_sigma`).
+    """
+
+    def __init__(
+        self,
+        endpoint_name: str = MOCK_ENDPOINT_NAME,
+        max_concurrency: int = 1,
+        max_queue_size: Optional[int] = None,
+        time_to_first_token_seconds: float = 0.05,
+        time_to_first_token_distribution: str = "constant",
+        time_to_first_token_sigma: float = 0.5,
+        tokens_per_second: float = 100.0,
+        instance_type: Optional[str] = None,
+        price_per_instance: Optional[float] = 0.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        if time_to_first_token_distribution not in ("constant", "exponential", "lognormal"):
+            raise ValueError(f"Unsupported time to first token distribution '{time_to_first_token_distribution}'.")
+        self.endpoint_url = None
+        self.predictor = None
+        self.endpoint_name = endpoint_name
+        self.instance_type = instance_type
+        self.price_per_instance = price_per_instance
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.time_to_first_token_seconds = time_to_first_token_seconds
+        self.time_to_first_token_distribution = time_to_first_token_distribution
+        self.time_to_first_token_sigma = time_to_first_token_sigma
+        self.tokens_per_second = tokens_per_second
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._queue_condition = threading.Condition()
+        self._queue: deque = deque()
+        self._num_in_service = 0
+        self._async_waiters: deque = deque()
+        self._num_in_service_async = 0
+        self.reset_statistics()
+
+    def predict(self, payload: Dict[str, Any]) -> Any:
+        return [{"generated_text": "".join(self._generate(payload))}]
+
+    def predict_stream(self, payload: Dict[str, Any]) -> Iterator[bytes]:
+        for token in self._generate(payload):
+            yield ("data:" + json.dumps({"token": {"text": token, "special": False}}) + "\n").encode("utf-8")
+
+    @contextlib.asynccontextmanager
+    async def open_async(self, max_connections: int) -> AsyncIterator["MockPredictor"]:
+        yield self
+
+    async def predict_async(self, payload: Dict[str, Any]) -> Any:
+        return [{"generated_text": "".join([token async for token in self._generate_async(payload)])}]
+
+    async def predict_stream_async(self, payload: Dict[str, Any]) -> AsyncIterator[bytes]:
+        async for token in self._generate_async(payload):
+            yield ("data:" + json.dumps({"token": {"text": token, "special": False}}) + "\n").encode("utf-8")
+
+    def delete_model(self) -> None:
+        pass
+
+    def delete_endpoint(self) -> None:
+        pass
+
+    def reset_statistics(self) -> None:
+        """Discard the server-side latencies recorded so far."""
+        with self._lock:
+            self.histograms: Dict[str, LogHistogram] = {
+                "QueueTime": LogHistogram(),
+                "ServiceTime": LogHistogram(),
+                "ServerLatency": LogHistogram(),
+            }
+            self.num_throttled = 0
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Server-side queue, service and total latency statistics in milliseconds."""
+        with self._lock:
+            statistics: Dict[str, Any] = {name: hist.to_statistics() for name, hist in self.histograms.items()}
+            statistics["ThrottledRequests"] = self.num_throttled
+        return statistics
+
+    def _generate(self, payload: Dict[str, Any]) -> Iterator[str]:
+        """Simulate queueing and token generation for a single request, yielding each token when it is generated."""
+        max_new_tokens = payload.get("parameters", {}).get("max_new_tokens", MOCK_DEFAULT_MAX_NEW_TOKENS)
+        time_arrival = time.perf_counter()
+        with self._lock:
+            time_to_first_token = self._sample_time_to_first_token()
+        self._enter_service()
+        try:
+            time_service_start = time.perf_counter()
+            time.sleep(time_to_first_token)
+            for i in range(max_new_tokens):
+                if i > 0:
+                    self._sleep_until(time_service_start + time_to_first_token + i / self.tokens_per_second)
+                yield MOCK_GENERATED_TOKEN
+            time_end = time.perf_counter()
+        finally:
+            self._exit_service()
+        self._record_latencies(time_arrival, time_service_start, time_end)
+
+    async def _generate_async(self, payload: Dict[str, Any]) -> AsyncIterator[str]:
+        """Like `_generate`, but waiting on the event loop."""
+        max_new_tokens = payload.get("parameters", {}).get("max_new_tokens", MOCK_DEFAULT_MAX_NEW_TOKENS)
+        time_arrival = time.perf_counter()
+        with self._lock:
+            time_to_first_token = self._sample_time_to_first_token()
+        await self._enter_service_async()
+        try:
+            time_service_start = time.perf_counter()
+            await asyncio.sleep(time_to_first_token)
+            for i in range(max_new_tokens):
+                if i > 0:
+                    await self._sleep_until_async(time_service_start + time_to_first_token + i / self.tokens_per_second)
+                yield MOCK_GENERATED_TOKEN
+            time_end = time.perf_counter()
+        finally:
+            self._exit_service_async()
+        self._record_latencies(time_arrival, time_service_start, time_end)
+
+    def _record_latencies(self, time_arrival: float, time_service_start: float, time_end: float) -> None:
+        with self._lock:
+            self.histograms["QueueTime"].record((time_service_start - time_arrival) * 1e3)
+            self.histograms["ServiceTime"].record((time_end - time_service_start) * 1e3)
+            self.histograms["ServerLatency"].record((time_end - time_arrival) * 1e3)
+
+    def _enter_service(self) -> None:
+        """Wait in first-in, first-out order until a concurrency slot is free."""
+        ticket = object()
+        with self._queue_condition:
+            if self.max_queue_size is not None and len(self._queue) >= self.max_queue_size:
+                with self._lock:
+                    self.num_throttled += 1
+                raise MockEndpointThrottlingError(f"Mock endpoint queue is full ({self.max_queue_size} requests).")
+            self._queue.append(ticket)
+            while self._queue[0] is not ticket or self._num_in_service >= self.max_concurrency:
+                self._queue_condition.wait()
+            self._queue.popleft()
+            self._num_in_service += 1
+            self._queue_condition.notify_all()
+
+    def _exit_service(self) -> None:
+        with self._queue_condition:
+            self._num_in_service -= 1
+            self._queue_condition.notify_all()
+
+    async def _enter_service_async(self) -> None:
+        """Wait in first-in, first-out order until a concurrency slot is free, without blocking the event loop."""
+        if self.max_queue_size is not None and len(self._async_waiters) >= self.max_queue_size:
+            with self._lock:
+                self.num_throttled += 1
+            raise MockEndpointThrottlingError(f"Mock endpoint queue is full ({self.max_queue_size} requests).")
+        if not self._async_waiters and self._num_in_service_async < self.max_concurrency:
+            self._num_in_service_async += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._async_waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation, pass it on
+                self._exit_service_async()
+            elif waiter in self._async_waiters:
+                self._async_waiters.remove(waiter)
+            raise
+
+    def _exit_service_async(self) -> None:
+        """Hand the concurrency slot over to the longest waiting request, or free it."""
+        while self._async_waiters:
+            waiter = self._async_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._num_in_service_async -= 1
+
+    def _sample_time_to_first_token(self) -> float:
+        mean = self.time_to_first_token_seconds
+        if self.time_to_first_token_distribution == "exponential":
+            return self._rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        elif self.time_to_first_token_distribution == "lognormal":
+            sigma = self.time_to_first_token_sigma
+            return self._rng.lognormvariate(math.log(mean) - sigma**2 / 2, sigma) if mean > 0 else 0.0
+        return mean
+
+    @staticmethod
+    def _sleep_until(deadline: float) -> None:
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    @staticmethod
+    async def _sleep_until_async(deadline: float) -> None:
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
@@ -2,7 +2,9 @@ from concurrent import futures
 from datetime import datetime
 import json
 import logging
+import os
 from pathlib import Path
+import threading
 from typing import Any, Callable, Optional, Tuple, Type
 from typing import Dict
 from typing import List
@@ -24,12 +26,17 @@ from benchmarking.concurrency_probe import num_invocation_scaler
 from benchmarking.concurrency_probe import ConcurrentProbeIteratorBase
 from benchmarking.concurrency_probe import ConcurrentProbeExponentialScalingIterator
 from benchmarking.constants import MAX_CONCURRENT_BENCHMARKS, SAVE_METRICS_FILE_PATH
+from benchmarking.constants import MAX_CONCURRENT_ENDPOINTS
+from benchmarking.constants import METRICS_STORE_PATH
 from benchmarking.constants import MAX_CONCURRENT_INVOCATIONS_PER_MODEL
 from benchmarking.constants import MAX_TOTAL_RETRY_TIME_SECONDS
 from benchmarking.constants import NUM_INVOCATIONS
+from benchmarking.constants import OPEN_LOOP_MAX_IN_FLIGHT_REQUESTS
+from benchmarking.constants import OPEN_LOOP_TARGET_REQUESTS_PER_SECOND
 from benchmarking.constants import RETRY_WAIT_TIME_SECONDS
 from benchmarking.constants import SM_SESSION
 from benchmarking.load_test import LoadTester
+from benchmarking.mock_endpoint import MockPredictor
 from benchmarking.logging import logging_prefix
 from benchmarking.custom_predictor import CustomPredictor
 
@@ -39,6 +46,7 @@ class Benchmarker:
         self,
         payloads: Dict[str, Dict[str, Any]],
         max_concurrent_benchmarks: int = MAX_CONCURRENT_BENCHMARKS,
+        max_concurrent_endpoints: int = MAX_CONCURRENT_ENDPOINTS,
         sagemaker_session: Session = SM_SESSION,
         num_invocations: int = NUM_INVOCATIONS,
         max_workers: int = MAX_CONCURRENT_INVOCATIONS_PER_MODEL,
@@ -47,6 +55,11 @@ class Benchmarker:
         run_latency_load_test: bool = False,
         run_throughput_load_test: bool = False,
         run_concurrency_probe: bool = False,
+        run_open_loop_load_test: bool = False,
+        stream_response: bool = False,
+        open_loop_target_requests_per_second: float = OPEN_LOOP_TARGET_REQUESTS_PER_SECOND,
+        open_loop_arrival_process: str = "poisson",
+        open_loop_max_in_flight_requests: int = OPEN_LOOP_MAX_IN_FLIGHT_REQUESTS,
         concurrency_probe_num_invocation_hook: Optional[Callable[[int], int]] = None,
         concurrency_probe_concurrent_request_iterator_cls: Optional[Type[ConcurrentProbeIteratorBase]] = None,
         clean_up: bool = False,
@@ -55,6 +68,7 @@ class Benchmarker:
     ):
         self.payloads = payloads
         self.max_concurrent_benchmarks = max_concurrent_benchmarks
+        self.max_concurrent_endpoints = max_concurrent_endpoints
         self.sagemaker_session = sagemaker_session
         self.num_invocations = num_invocations
         self.max_workers = max_workers
@@ -63,6 +77,11 @@ class Benchmarker:
         self.run_latency_load_test = run_latency_load_test
         self.run_throughput_load_test = run_throughput_load_test
         self.run_concurrency_probe = run_concurrency_probe
+        self.run_open_loop_load_test = run_open_loop_load_test
+        self.stream_response = stream_response
+        self.open_loop_target_requests_per_second = open_loop_target_requests_per_second
+        self.open_loop_arrival_process = open_loop_arrival_process
+        self.open_loop_max_in_flight_requests = open_loop_max_in_flight_requests
 
         if concurrency_probe_num_invocation_hook is None:
             self.concurrency_probe_num_invocation_hook = num_invocation_scaler
@@ -93,6 +112,7 @@ class Benchmarker:
         metrics_latency: Dict[str, Any] = {}
         metrics_throughput: Dict[str, Any] = {}
         metrics_concurrency: Dict[str, Any] = {}
+        metrics_open_loop: Dict[str, Any] = {}
 
         if predictor.predictor is not None:
             endpoint_description = self._sagemaker_client.describe_endpoint(predictor.endpoint_name)
@@ -130,7 +150,10 @@ class Benchmarker:
                     f"{logging_prefix(model_id)} No initial_instance_count provided. Using the default count 1."
                 )
                 initial_instance_count = 1
-            price_per_instance = self._pricing_client.get_price_per_unit(instance_type, SM_SESSION._region_name)
+            if getattr(predictor, "price_per_instance", None) is not None:
+                price_per_instance = predictor.price_per_instance
+            else:
+                price_per_instance = self._pricing_client.get_price_per_unit(instance_type, SM_SESSION._region_name)
             price_per_endpoint = initial_instance_count * price_per_instance
             metrics_pricing = {
                 "PricePerInstance": price_per_instance,
@@ -159,6 +182,8 @@ class Benchmarker:
             tokenizer_model_id,
             huggingface_hub_token,
             price_per_endpoint,
+            retain_results=False,
+            stream=self.stream_response,
         )
 
         if self.run_latency_load_test:
@@ -171,13 +196,24 @@ class Benchmarker:
                 num_invocation_hook=self.concurrency_probe_num_invocation_hook,
             )
             metrics_concurrency = {"ConcurrencyProbe": concurrency_probe_results}
+        if self.run_open_loop_load_test:
+            open_loop_results = tester.run_open_loop_throughput_load_test(
+                self.num_invocations,
+                self.open_loop_target_requests_per_second,
+                self.open_loop_arrival_process,
+                self.open_loop_max_in_flight_requests,
+            )
+            metrics_open_loop = {"OpenLoop": open_loop_results}
 
         return {
             **metrics_latency,
             **metrics_throughput,
             **metrics_concurrency,
+            **metrics_open_loop,
             **metrics_pricing,
             **metrics_time,
+            "ModelID": model_id,
+            "PayloadName": payload_name,
             "ProductionVariant": production_variant,
         }
 
@@ -216,12 +252,27 @@ class Benchmarker:
 
         If an `endpoint_name` is provided either as a key in `model_args` or saved in benchmarking metrics file from
         a previous invocation of this benchmarker, then a predictor is attempted to be attached to this endpoint. If
-        an `endpoint_name` is not provided, then the model is deployed prior to benchmarking run.
+        an `endpoint_name` is not provided, then the model is deployed prior to benchmarking run. If
+        `mock_endpoint_args` is provided, a local MockPredictor is constructed from it instead and nothing is deployed.
         """
+        predictor = self.create_predictor(model_id, model_args)
+        metrics = self.run_single_predictor(
+            model_id,
+            predictor,
+            model_args.get("huggingface_model_id"),
+            model_args.get("huggingface_hub_token"),
+        )
+        return metrics, predictor
+
+    def create_predictor(self, model_id: str, model_args: Dict[str, Any]) -> CustomPredictor:
+        """Attach to, deploy, or simulate the endpoint for a single model as described in `run_single_model`."""
         endpoint_name = model_args.get("endpoint_name") or self.model_id_to_endpoint_name.get(model_id)
         endpoint_url = model_args.get("endpoint_url")
         instance_type = model_args.get("instance_type")
-        if endpoint_url is not None:
+        mock_endpoint_args = model_args.get("mock_endpoint_args")
+        if mock_endpoint_args is not None:
+            predictor = MockPredictor(instance_type=instance_type, **mock_endpoint_args)
+        elif endpoint_url is not None:
             predictor = CustomPredictor(endpoint_url=endpoint_url, instance_type=instance_type)
         elif endpoint_name is not None:
             try:
@@ -237,13 +288,7 @@ class Benchmarker:
             predictor = CustomPredictor(predictor=predictor)
 
         self.model_id_to_endpoint_name[model_id] = predictor.endpoint_name
-        metrics = self.run_single_predictor(
-            model_id,
-            predictor,
-            model_args["huggingface_model_id"],
-            model_args.get("huggingface_hub_token"),
-        )
-        return metrics, predictor
+        return predictor
 
     def retrieve_predictor_from_endpoint(
         self, endpoint_name: str, model_args: Optional[Dict[str, Any]] = None
@@ -311,37 +356,91 @@ class Benchmarker:
         self,
         models: Dict[str, Dict[str, Any]],
         save_file_path: Path = SAVE_METRICS_FILE_PATH,
+        resume: bool = False,
+        metrics_store_path: Optional[Path] = None,
     ) -> Dict[str, Any]:
-        """Concurrently call run_single_model for all models and aggregate benchmarking output."""
-        metrics = []
+        """Concurrently deploy and benchmark all models and aggregate benchmarking output.
+
+        Deployment and load testing are pipelined: up to `max_concurrent_endpoints` models hold an endpoint (being
+        deployed, load tested, or cleaned up) at once, of which up to `max_concurrent_benchmarks` run load tests, so the
+        next model deploys while earlier models are load tested. The metrics file is rewritten after every deployment
+        and every finished model. With `resume=True`, models listed as completed in an existing metrics file are
+        skipped and their metrics are carried over. If `metrics_store_path` is given, the metrics of each finished
+        model are also appended to the partitioned Parquet MetricsStore at that path.
+        """
+        checkpoint = self.load_metrics_json(save_file_path) if resume else {}
+        completed_models = set(checkpoint.get("completed_models", [])) & set(models)
+        metrics = [x for x in checkpoint.get("metrics", []) if x.get("ModelID") in completed_models]
+        endpoints: Dict[str, str] = {k: v for k, v in checkpoint.get("endpoints", {}).items() if k in models}
+        # Re-attach unfinished models to the endpoints they deployed before the interruption
+        self.model_id_to_endpoint_name.update(endpoints)
         errors = {}
-        endpoints: Dict[str, str] = {}
-
-        with futures.ThreadPoolExecutor(max_workers=self.max_concurrent_benchmarks) as executor:
+        pending_models = {k: v for k, v in models.items() if k not in completed_models}
+        if completed_models:
+            logging.info(f"Resuming benchmark, skipping {len(completed_models)} completed models ...")
+
+        metrics_store = None
+        if metrics_store_path is not None:
+            from benchmarking.metrics_store import MetricsStore  # requires pyarrow
+
+            metrics_store = MetricsStore(metrics_store_path)
+        run_timestamp = datetime.utcnow()
+        checkpoint_lock = threading.Lock()
+        load_test_slots = threading.BoundedSemaphore(self.max_concurrent_benchmarks)
+
+        def save_checkpoint() -> Dict[str, Any]:
+            output = {
+                "models": models,
+                "payloads": self.payloads,
+                "endpoints": endpoints,
+                "metrics": metrics,
+                "completed_models": sorted(completed_models),
+            }
+            self._write_metrics_json(output, save_file_path)
+            return output
+
+        def deploy_and_benchmark(model_id: str, model_args: Dict[str, Any]) -> None:
+            predictor = self.create_predictor(model_id, model_args)
+            with checkpoint_lock:
+                endpoints[model_id] = predictor.endpoint_name
+                save_checkpoint()
+            with load_test_slots:
+                metrics_model_id = self.run_single_predictor(
+                    model_id,
+                    predictor,
+                    model_args.get("huggingface_model_id"),
+                    model_args.get("huggingface_hub_token"),
+                )
+            with checkpoint_lock:
+                if metrics_store is not None:
+                    metrics_store.append(metrics_model_id, run_timestamp)
+                metrics.extend(metrics_model_id)
+                completed_models.add(model_id)
+                save_checkpoint()
+
+        with futures.ThreadPoolExecutor(max_workers=self.max_concurrent_endpoints) as executor:
             future_to_model_id = {
-                executor.submit(self.run_single_model, model_id, args): model_id for model_id, args in models.items()
+                executor.submit(deploy_and_benchmark, model_id, args): model_id
+                for model_id, args in pending_models.items()
             }
             for future in futures.as_completed(future_to_model_id):
                 model_id = future_to_model_id[future]
                 try:
-                    metrics_model_id, predictor = future.result()
-                    endpoints[model_id] = predictor.endpoint_name
-                    metrics.extend(metrics_model_id)
+                    future.result()
                 except Exception as e:
                     errors[model_id] = e
                     logging.error(f"{logging_prefix(model_id)} Benchmarking failed: {e}")
 
-        output = {
-            "models": models,
-            "payloads": self.payloads,
-            "endpoints": endpoints,
-            "metrics": metrics,
-        }
+        with checkpoint_lock:
+            return save_checkpoint()
 
-        with open(save_file_path, "w") as file:
+    @staticmethod
+    def _write_metrics_json(output: Dict[str, Any], save_file_path: Path) -> None:
+        """Write metrics through a temporary file so an interrupted write never corrupts the previous checkpoint."""
+        tmp_file_path = f"{save_file_path}.tmp"
+        with open(tmp_file_path, "w") as file:
             json.dump(output, file, indent=4, ensure_ascii=False)
-
-        return output
+        os.replace(tmp_file_path, save_file_path)
 
     @classmethod
     def load_metrics_pandas(cls, save_file_path: Path = SAVE_METRICS_FILE_PATH) -> pd.DataFrame:
@@ -361,6 +460,16 @@ class Benchmarker:
             errors="ignore",
         )
 
+    @staticmethod
+    def load_metrics_store(metrics_store_path: Path = METRICS_STORE_PATH, **filters: Any) -> pd.DataFrame:
+        """Load concurrency probe results from a MetricsStore, e.g., `load_metrics_store(model_ids=["my-model"])`.
+
+        See `MetricsStore.load` for the supported filters.
+        """
+        from benchmarking.metrics_store import MetricsStore  # requires pyarrow
+
+        return MetricsStore(metrics_store_path).load(test_types=["ConcurrencyProbe"], **filters)
+
     @staticmethod
     def create_concurrency_probe_pivot_table(
         df: pd.DataFrame,
@@ -369,18 +478,32 @@ class Benchmarker:
         fillna_str: str = "--",
     ) -> pd.DataFrame:
         """Pivot concurrency probe pandas DataFrame to show specified values across models and concurrent requests."""
+        # Inter-token latency requires a tokenizer, otherwise fall back to the inter-chunk latency
+        inter_latency_col = "InterTokenLatency.p90" if "InterTokenLatency.p90" in df.columns else "InterChunkLatency.p90"
+        streaming_value_cols = ["TimeToFirstToken.p90", inter_latency_col]
+        include_streaming_values = all(col in df.columns for col in streaming_value_cols)
         if value_format_dict is None:
             value_format_dict = {
                 "TokenThroughput": "{:.2f}".format,
                 "LatencyPerToken.p90": int,
                 "CostToGenerate1MTokens": "${:,.2f}".format,
             }
+            if include_streaming_values:
+                value_format_dict.update({col: int for col in streaming_value_cols})
         if value_name_dict is None:
             value_name_dict = {
                 "LatencyPerToken.p90": "p90 latency (ms/token)",
                 "TokenThroughput": "throughput (tokens/s)",
                 "CostToGenerate1MTokens": "cost to generate 1M tokens ($)",
             }
+            if include_streaming_values:
+                value_name_dict.update(
+                    {
+                        "TimeToFirstToken.p90": "p90 time to first token (ms)",
+                        "InterTokenLatency.p90": "p90 inter-token latency (ms)",
+                        "InterChunkLatency.p90": "p90 inter-chunk latency (ms)",
+                    }
+                )
 
         df_copy = df.copy()
 
@@ -0,0 +1,74 @@
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
+
+
+SERVER_SENT_EVENT_DATA_PREFIX = "data:"
+SERVER_SENT_EVENT_DONE = "[DONE]"
+
+
+def iter_stream_text(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Yield generated text pieces from a stream of newline-delimited response chunks.
+
+    Response stream chunks do not necessarily align with message boundaries, so bytes are buffered until a full line
+    is received. Each non-empty text piece is yielded as soon as the line that contains it is complete.
+    """
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            text = _parse_stream_line(line)
+            if text:
+                yield text
+    text = _parse_stream_line(buffer)
+    if text:
+        yield text
+
+
+async def aiter_stream_text(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Yield generated text pieces from an asynchronous stream of newline-delimited response chunks.
+
+    See `iter_stream_text`.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            text = _parse_stream_line(line)
+            if text:
+                yield text
+    text = _parse_stream_line(buffer)
+    if text:
+        yield text
+
+
+def _parse_stream_line(line: bytes) -> Optional[str]:
+    """Extract generated text from a single line of a streaming response.
+
+    Supported formats are server-sent events or JSON lines with a Text Generation Inference `token` object, a Large
+    Model Inference `outputs` list, or a `generated_text` field. Lines that are not JSON are returned as plain text.
+    """
+    decoded = line.decode("utf-8").strip()
+    if decoded.startswith(SERVER_SENT_EVENT_DATA_PREFIX):
+        decoded = decoded[len(SERVER_SENT_EVENT_DATA_PREFIX) :].strip()
+    if not decoded or decoded == SERVER_SENT_EVENT_DONE:
+        return None
+
+    try:
+        data: Any = json.loads(decoded)
+    except json.JSONDecodeError:
+        return decoded
+
+    if isinstance(data, list) and len(data) > 0:
+        data = data[0]
+    if not isinstance(data, dict):
+        return str(data)
+    if "token" in data:
+        token = data["token"]
+        return None if token.get("special", False) else token.get("text")
+    if "outputs" in data:
+        return "".join(data["outputs"])
+    if "generated_text" in data:
+        return data["generated_text"]
+    return None
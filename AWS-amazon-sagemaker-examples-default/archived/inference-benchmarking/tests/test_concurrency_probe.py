@@ -0,0 +1,55 @@
+"""Tests of the concurrency probe iterators, run with `python -m pytest tests` from inference-benchmarking."""
+
+from typing import Dict, List, Tuple
+
+import pytest
+
+from benchmarking.concurrency_probe import ConcurrentProbeSaturationSearchIterator
+
+
+def run_probe(iterator: ConcurrentProbeSaturationSearchIterator, model: Dict[int, Tuple[float, float]]) -> List[int]:
+    """Drive the iterator like `LoadTester.run_concurrency_probe`, with (throughput, p99 latency) per concurrency."""
+    probed = []
+    for concurrent_requests in iterator:
+        probed.append(concurrent_requests)
+        throughput, latency = model[concurrent_requests]
+        iterator.send({"RequestThroughput": throughput, "Latency": {"p99": latency}}, None)
+    return probed
+
+
+def saturating_model(knee: int, max_concurrency: int = 256) -> Dict[int, Tuple[float, float]]:
+    """Throughput grows linearly up to the knee and is flat after it, latency grows with queueing after it."""
+    return {c: (10.0 * min(c, knee), 100.0 * max(1.0, c / knee)) for c in range(1, max_concurrency + 1)}
+
+
+def test_search_resolves_the_knee():
+    iterator = ConcurrentProbeSaturationSearchIterator("model", "payload")
+    probed = run_probe(iterator, saturating_model(knee=12))
+    assert iterator.knee_concurrent_requests == 12
+    assert probed[:6] == [1, 2, 4, 8, 16, 32]
+    assert iterator.stop_reason.startswith("Knee at 12 concurrent requests")
+
+
+def test_search_bisects_below_the_latency_slo():
+    iterator = ConcurrentProbeSaturationSearchIterator("model", "payload", latency_slo_ms=150.0)
+    run_probe(iterator, saturating_model(knee=12))
+    # Latency is 100 ms up to the knee, so the knee itself meets the SLO
+    assert iterator.knee_concurrent_requests == 12
+
+
+@pytest.mark.parametrize("start", [1, 4])
+def test_search_stops_when_no_concurrency_meets_the_latency_slo(start):
+    iterator = ConcurrentProbeSaturationSearchIterator("model", "payload", start=start, latency_slo_ms=50.0)
+    probed = run_probe(iterator, saturating_model(knee=12))
+    assert probed == [start]
+    assert iterator.knee_concurrent_requests is None
+    assert iterator.stop_reason.startswith("No concurrency met the latency SLO")
+
+
+def test_search_stops_when_the_first_load_test_fails():
+    iterator = ConcurrentProbeSaturationSearchIterator("model", "payload")
+    assert next(iterator) == 1
+    iterator.exception = RuntimeError("endpoint unavailable")
+    with pytest.raises(StopIteration):
+        next(iterator)
+    assert iterator.stop_reason == "RuntimeError: endpoint unavailable"
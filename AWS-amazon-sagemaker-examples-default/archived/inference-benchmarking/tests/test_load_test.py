@@ -0,0 +1,105 @@
+"""Tests of the load tester token statistics, run with `python -m pytest tests` from inference-benchmarking."""
+
+import datetime
+from typing import Any, Dict, List
+
+import pytest
+
+from benchmarking.load_test import InvocationStatisticsAggregator, LoadTester, PredictionResult, TokenCounter
+from benchmarking.mock_endpoint import MockPredictor
+
+PAYLOAD = {"inputs": "Hello", "parameters": {"max_new_tokens": 8}}
+
+
+class WhitespaceTokenizer:
+    """A tokenizer with one token per whitespace-separated word that counts how many texts it encoded."""
+
+    def __init__(self) -> None:
+        self.num_encoded = 0
+
+    def __call__(self, texts: List[str], add_special_tokens: bool = True, **kwargs: Any) -> Dict[str, List[List[str]]]:
+        self.num_encoded += len(texts)
+        prefix = ["<s>"] if add_special_tokens else []
+        return {"input_ids": [prefix + text.split() for text in texts]}
+
+    def encode(self, text: str) -> List[str]:
+        raise AssertionError("Output tokens should be counted by the load tester.")
+
+
+def make_load_tester(stream: bool = False) -> LoadTester:
+    predictor = MockPredictor(time_to_first_token_seconds=0.0, tokens_per_second=1000.0)
+    load_tester = LoadTester(predictor, PAYLOAD, "model", "payload", stream=stream)
+    load_tester.tokenizer = WhitespaceTokenizer()
+    load_tester._token_counter = TokenCounter(load_tester.tokenizer)
+    load_tester._chunk_token_counter = TokenCounter(load_tester.tokenizer, add_special_tokens=False)
+    return load_tester
+
+
+def chunked_result() -> PredictionResult:
+    """A streamed result whose chunks arrive 10, 30 and 40 ms after the first one and hold 2, 0 and 1 tokens."""
+    time_start = datetime.datetime(2024, 1, 1)
+    time_utc_chunks = [time_start + datetime.timedelta(milliseconds=ms) for ms in [20, 30, 50, 60]]
+    return PredictionResult(
+        time_start,
+        time_utc_chunks[-1],
+        PAYLOAD,
+        "a b c d",
+        time_utc_chunks=time_utc_chunks,
+        num_output_tokens=4,
+        num_chunk_tokens=[1, 2, 0, 1],
+    )
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_predictions_carry_output_token_count(stream):
+    load_tester = make_load_tester(stream)
+    if stream:
+        result = load_tester.predict_stream_once_and_collect_client_results()
+    else:
+        result = load_tester.predict_once_and_collect_client_results()
+    assert result.num_output_tokens == 9
+
+
+def test_predictions_without_tokenizer_have_no_token_count():
+    load_tester = LoadTester(MockPredictor(time_to_first_token_seconds=0.0), PAYLOAD, "model", "payload")
+    assert load_tester.predict_once_and_collect_client_results().num_output_tokens is None
+
+
+def test_token_statistics_use_the_counted_tokens():
+    load_tester = make_load_tester()
+    metrics = load_tester.run_throughput_load_test(num_invocations=4, max_workers=2)
+    assert metrics["OutputSequenceTokens"]["Average"] == pytest.approx(9, rel=0.01)
+    assert load_tester.tokenizer.num_encoded == 1
+
+
+def test_streaming_predictions_carry_chunk_token_counts():
+    result = make_load_tester(stream=True).predict_stream_once_and_collect_client_results()
+    assert result.num_chunk_tokens == [1] * 8
+
+
+def test_inter_token_latencies_spread_chunk_gaps_over_their_tokens():
+    result = chunked_result()
+    assert result.inter_token_latencies() == pytest.approx([5.0, 5.0, 30.0])
+    assert result.tokens_per_second() == pytest.approx(75.0)
+    assert result.inter_chunk_latencies() == pytest.approx([10.0, 20.0, 10.0])
+
+
+def test_aggregator_reports_token_and_chunk_streaming_statistics():
+    result = chunked_result()
+    aggregator = InvocationStatisticsAggregator(result.time_utc_start)
+    aggregator.record(result)
+    statistics = aggregator.get_statistics(result.time_utc_end)
+    assert statistics["InterTokenLatency"]["Maximum"] == pytest.approx(30.0)
+    assert statistics["TokensPerSecond"]["Average"] == pytest.approx(75.0, rel=0.01)
+    assert statistics["InterChunkLatency"]["Maximum"] == pytest.approx(20.0)
+    assert statistics["ChunksPerSecond"]["Average"] == pytest.approx(75.0, rel=0.01)
+
+
+def test_aggregator_without_chunk_token_counts_reports_chunk_statistics_only():
+    result = chunked_result()._replace(num_chunk_tokens=None)
+    aggregator = InvocationStatisticsAggregator(result.time_utc_start)
+    aggregator.record(result)
+    statistics = aggregator.get_statistics(result.time_utc_end)
+    assert "InterTokenLatency" not in statistics
+    assert "TokensPerSecond" not in statistics
+    assert "InterChunkLatency" in statistics
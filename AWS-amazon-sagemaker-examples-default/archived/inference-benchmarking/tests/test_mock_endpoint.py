@@ -0,0 +1,38 @@
+"""Tests of the mock endpoint server metrics, run with `python -m pytest tests` from inference-benchmarking."""
+
+import pytest
+
+from benchmarking.load_test import LoadTester
+from benchmarking.mock_endpoint import MockEndpointThrottlingError, MockPredictor
+
+PAYLOAD = {"inputs": "Hello", "parameters": {"max_new_tokens": 2}}
+
+
+def make_load_tester(predictor: MockPredictor) -> LoadTester:
+    return LoadTester(predictor, PAYLOAD, "model", "payload")
+
+
+def test_server_metrics_without_requests():
+    predictor = MockPredictor(time_to_first_token_seconds=0.0)
+    metrics = make_load_tester(predictor)._server_metrics({"Latency": {}})
+    assert metrics["Server"]["ServerLatency"] == {}
+    assert metrics["Server"]["ThrottledRequests"] == 0
+    assert metrics["HarnessOverhead"] == {}
+
+
+def test_server_metrics_when_every_request_was_throttled():
+    predictor = MockPredictor(time_to_first_token_seconds=0.0, max_queue_size=0)
+    with pytest.raises(MockEndpointThrottlingError):
+        predictor.predict(PAYLOAD)
+    metrics = make_load_tester(predictor)._server_metrics({})
+    assert metrics["Server"]["ThrottledRequests"] == 1
+    assert metrics["HarnessOverhead"] == {}
+
+
+def test_server_metrics_report_harness_overhead():
+    predictor = MockPredictor(time_to_first_token_seconds=0.0, tokens_per_second=1000.0)
+    predictor.predict(PAYLOAD)
+    server_latency = predictor.get_statistics()["ServerLatency"]
+    client_latency = {name: server_latency[name] + 1.0 for name in ["Average", "p50", "p90", "p99"]}
+    metrics = make_load_tester(predictor)._server_metrics({"Latency": client_latency})
+    assert metrics["HarnessOverhead"] == pytest.approx({"Average": 1.0, "p50": 1.0, "p90": 1.0, "p99": 1.0})
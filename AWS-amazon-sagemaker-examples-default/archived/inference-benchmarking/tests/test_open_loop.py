@@ -0,0 +1,66 @@
+"""Tests of the open-loop load test, run with `python -m pytest tests` from inference-benchmarking."""
+
+import threading
+
+import pytest
+
+from benchmarking.load_test import LoadTester
+from benchmarking.mock_endpoint import MockEndpointThrottlingError, MockPredictor
+
+PAYLOAD = {"inputs": "Hello", "parameters": {"max_new_tokens": 4}}
+
+
+class ThreadCountingMockPredictor(MockPredictor):
+    """A mock endpoint that records the largest number of live threads seen when a request arrives."""
+
+    max_active_threads = 0
+
+    def _sample_time_to_first_token(self) -> float:
+        self.max_active_threads = max(self.max_active_threads, threading.active_count())
+        return super()._sample_time_to_first_token()
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_open_loop_keeps_many_requests_in_flight_without_threads(stream):
+    predictor = ThreadCountingMockPredictor(max_concurrency=1000, time_to_first_token_seconds=0.5)
+    load_tester = LoadTester(predictor, PAYLOAD, "model", "payload", stream=stream)
+    num_threads = threading.active_count()
+    statistics = load_tester.run_open_loop_load_test(
+        num_invocations=500, target_requests_per_second=5000.0, arrival_process="constant"
+    )
+    assert statistics.num_invocations == 500
+    assert len(statistics.results) == 500
+    # All 500 requests overlap, yet no thread is started per outstanding request
+    assert predictor.get_statistics()["ServerLatency"]["Maximum"] < 2000.0
+    assert predictor.max_active_threads <= num_threads + 2
+
+
+def test_open_loop_delays_requests_beyond_the_in_flight_bound():
+    predictor = MockPredictor(max_concurrency=100, time_to_first_token_seconds=0.2)
+    load_tester = LoadTester(predictor, PAYLOAD, "model", "payload")
+    statistics = load_tester.run_open_loop_load_test(
+        num_invocations=4, target_requests_per_second=1000.0, arrival_process="constant", max_in_flight_requests=2
+    )
+    metrics = statistics.get_statistics()
+    assert metrics["QueueingDelay"]["Maximum"] >= 150.0
+    assert predictor.get_statistics()["QueueTime"]["Maximum"] < 50.0
+
+
+def test_open_loop_raises_the_first_request_error():
+    predictor = MockPredictor(max_concurrency=1, max_queue_size=0, time_to_first_token_seconds=0.0)
+    load_tester = LoadTester(predictor, PAYLOAD, "model", "payload")
+    with pytest.raises(MockEndpointThrottlingError):
+        load_tester.run_open_loop_load_test(num_invocations=10, target_requests_per_second=100.0)
+
+
+def test_mock_endpoint_queues_asynchronous_requests_in_arrival_order():
+    predictor = MockPredictor(max_concurrency=1, time_to_first_token_seconds=0.02, tokens_per_second=1e6)
+    load_tester = LoadTester(predictor, PAYLOAD, "model", "payload")
+    statistics = load_tester.run_open_loop_load_test(
+        num_invocations=5, target_requests_per_second=1000.0, arrival_process="constant"
+    )
+    results = sorted(statistics.results, key=lambda result: result.time_utc_scheduled)
+    ends = [result.time_utc_end for result in results]
+    assert ends == sorted(ends)
+    # Requests are served one at a time, so the last one waits for the four before it
+    assert predictor.get_statistics()["QueueTime"]["Maximum"] >= 70.0
@@ -117,6 +117,30 @@ def parse_args():  # pylint: disable=too-many-statements
         help="to log training loss after reducing across all data parallel ranks with logging_freq frequency",  # pylint: disable=line-too-long
     )
     logging_grp.add_argument("--tensorboard_dir", type=str, nargs="+", default=None)
+    logging_grp.add_argument(
+        "--step_profile_freq",
+        type=int,
+        default=0,
+        help="time the data wait, forward, backward, optimizer and checkpoint phases of every N-th step, 0 to disable",  # pylint: disable=line-too-long
+    )
+    logging_grp.add_argument(
+        "--step_profile_dir",
+        type=str,
+        default=None,
+        help="write step profiles of each rank to JSON lines files in this dir, they also go to tensorboard_dir",  # pylint: disable=line-too-long
+    )
+    logging_grp.add_argument(
+        "--dataloader_starvation_threshold",
+        type=float,
+        default=0.1,
+        help="warn when profiled steps wait for data more than this fraction of the time",
+    )
+    logging_grp.add_argument(
+        "--host_memory_growth_alert_gb",
+        type=float,
+        default=2.0,
+        help="warn when host memory of a rank grows by more than this since the last warning",
+    )
 
     ### CHECKPOINTS
     ckpt_grp = parser.add_argument_group(title="checkpoints", description="checkpointing arguments")
@@ -141,6 +165,19 @@ def parse_args():  # pylint: disable=too-many-statements
         default=["/opt/ml/checkpoints"],
         help="Saves partial checkpoints (model, optimizer) to this dir, and loads latest checkpoint from this if load_partial is specified.",  # pylint: disable=line-too-long
     )
+    ckpt_grp.add_argument(
+        "--checkpoint_local_dir",
+        type=str,
+        default=None,
+        help="Fast local dir, such as instance NVMe, to write checkpoints to before copying them to checkpoint_dir in the background. "  # pylint: disable=line-too-long
+        "Only supported with sharded and local checkpoint types.",
+    )
+    ckpt_grp.add_argument(
+        "--num_kept_local_checkpoints",
+        type=int,
+        default=1,
+        help="how many checkpoints to keep in checkpoint_local_dir after they are copied to checkpoint_dir",
+    )
     ckpt_grp.add_argument(
         "--resume_from_checkpoint",
         type=str,
@@ -162,7 +199,7 @@ def parse_args():  # pylint: disable=too-many-statements
     input_grp = parser.add_argument_group(title="inputs", description="location for data")
 
     input_grp.add_argument(
-        "--dataset_type", type=str, default="gpt_jsonl", choices=["gpt_jsonl", "hf"]
+        "--dataset_type", type=str, default="gpt_jsonl", choices=["gpt_jsonl", "gpt_bin", "hf"]
     )
     input_grp.add_argument("--data_num_workers", type=int, default=0)
 
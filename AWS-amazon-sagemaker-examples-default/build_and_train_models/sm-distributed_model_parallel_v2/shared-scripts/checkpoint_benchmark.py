@@ -0,0 +1,316 @@
+"""Checkpoint save benchmark.
+
+Compares checkpointing methods on a storage target without GPUs. It runs on CPU with the gloo backend and
+uses synthetic sharded state dicts of model weights and AdamW moments. Each method follows the I/O pattern
+of its counterpart in checkpoints.py:
+
+* sharded: `torch.distributed.checkpoint` save of DTensor shards, as `_save_sharded`.
+* local: one `torch.save` file per rank, as `_save_local`.
+* full: model weights gathered to rank 0 and written by `torch.save`, as `_save_full`.
+* async_sharded: `torch.distributed.checkpoint.async_save`, standing in for `_save_async_sharded`.
+* async_local: each rank stages a copy of its state, and a background thread writes it, as `_save_async_local`.
+
+With --local_dir, checkpoints are written there first. `checkpoint_storage.CheckpointDrainer` then copies
+them to --save_dir, as training does with --checkpoint_local_dir. Only sharded and local support this.
+
+Rank 0 logs, for each method:
+* stall: how long training would be blocked.
+* total: time until the checkpoint is complete in --save_dir.
+* throughput: checkpoint bytes divided by total.
+* peak memory: the increase in host RSS during the save.
+Times and memory are the max over ranks, and the median (for peak memory, the max) over iterations.
+
+Like their counterparts, local and full do not fsync. With spare host memory they partly measure the page cache.
+
+Example command
+----
+torchrun --nproc_per_node 8 checkpoint_benchmark.py --save_dir /fsx/checkpoint-benchmark \
+    --num_params 1000000000 --methods sharded local async_sharded \
+    --local_dir /opt/dlami/nvme/checkpoint-benchmark
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import threading
+import time
+
+import psutil
+import torch
+import torch.distributed as dist
+from checkpoint_storage import CheckpointDrainer, limit_num_checkpoints
+from data.utils import is_s3_source
+from logging_utils import get_logger
+from torch.distributed import checkpoint
+from torch.distributed._tensor import DTensor, Shard
+from torch.distributed.device_mesh import init_device_mesh
+
+logger = get_logger()
+
+_METHODS = ("sharded", "local", "full", "async_sharded", "async_local")
+_TIERED_METHODS = ("sharded", "local")
+
+
+class PeakRssSampler:
+    """Track the peak resident memory of this process above its level on entry, by sampling on a thread."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak_increase = 0
+        self._process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, self._process.memory_info().rss)
+
+    def __enter__(self):
+        self._baseline = self._peak = self._process.memory_info().rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self._peak = max(self._peak, self._process.memory_info().rss)
+        self.peak_increase = self._peak - self._baseline
+
+
+def create_state(num_params, num_layers, mesh):
+    """Rank-local tensors of an evenly sharded model with AdamW state, and the same state as DTensors."""
+    layer_numel = math.ceil(num_params / num_layers / mesh.size())
+    local = {"model": {}, "optimizer": {"state": {}}, "scheduler": {"last_epoch": 1}, "total_steps": 1}
+    for layer in range(num_layers):
+        name = f"layers.{layer}.weight"
+        local["model"][name] = torch.randn(layer_numel)
+        local["optimizer"]["state"][name] = {
+            "step": torch.tensor(1.0),
+            "exp_avg": torch.randn(layer_numel),
+            "exp_avg_sq": torch.rand(layer_numel),
+        }
+
+    def to_dtensor(tensor):
+        if tensor.dim() == 0:
+            return tensor
+        return DTensor.from_local(tensor, mesh, [Shard(0)], run_check=False)
+
+    sharded = {
+        "model": {name: to_dtensor(tensor) for name, tensor in local["model"].items()},
+        "optimizer": {
+            "state": {
+                name: {key: to_dtensor(tensor) for key, tensor in state.items()}
+                for name, state in local["optimizer"]["state"].items()
+            }
+        },
+        "scheduler": local["scheduler"],
+        "total_steps": local["total_steps"],
+    }
+    return local, sharded
+
+
+def _copy_state_dict(state_dict):
+    if isinstance(state_dict, dict):
+        return {key: _copy_state_dict(value) for key, value in state_dict.items()}
+    if isinstance(state_dict, torch.Tensor):
+        return state_dict.clone()
+    return state_dict
+
+
+# Each save function returns a callable that waits for the write to finish, or None when it already has.
+def _save_sharded(local, sharded, save_dir):
+    checkpoint.save(sharded, storage_writer=checkpoint.FileSystemWriter(save_dir))
+    return None
+
+
+def _save_local(local, sharded, save_dir):
+    os.makedirs(save_dir, exist_ok=True)
+    torch.save(local, os.path.join(save_dir, f"{dist.get_rank()}.pt"))
+    return None
+
+
+def _save_full(local, sharded, save_dir):
+    rank = dist.get_rank()
+    full_model = {}
+    for name, tensor in local["model"].items():
+        gathered = [torch.empty_like(tensor) for _ in range(dist.get_world_size())] if rank == 0 else None
+        dist.gather(tensor, gathered, dst=0)
+        if rank == 0:
+            full_model[name] = torch.cat(gathered)
+    if rank == 0:
+        os.makedirs(save_dir, exist_ok=True)
+        torch.save(full_model, os.path.join(save_dir, "pytorch_model.bin"))
+    dist.barrier()
+    return None
+
+
+def _save_async_sharded(local, sharded, save_dir):
+    future = checkpoint.async_save(sharded, storage_writer=checkpoint.FileSystemWriter(save_dir))
+    return future.result
+
+
+def _save_async_local(local, sharded, save_dir):
+    staged = _copy_state_dict(local)
+    os.makedirs(save_dir, exist_ok=True)
+    thread = threading.Thread(target=torch.save, args=(staged, os.path.join(save_dir, f"{dist.get_rank()}.pt")))
+    thread.start()
+    return thread.join
+
+
+_SAVE_FNS = {
+    "sharded": _save_sharded,
+    "local": _save_local,
+    "full": _save_full,
+    "async_sharded": _save_async_sharded,
+    "async_local": _save_async_local,
+}
+
+
+def _dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(dirpath, filename))
+        for dirpath, _, filenames in os.walk(path)
+        for filename in filenames
+    )
+
+
+def benchmark_method(method, local, sharded, root_dir, drainer, iterations, num_kept_checkpoints):
+    """Save `iterations` checkpoints with one method, and return per-iteration measurements reduced over ranks."""
+    save_fn = _SAVE_FNS[method]
+    results = []
+    for step in range(1, iterations + 1):
+        subdir = f"{method}-{step}steps"
+        save_dir = drainer.local_dir(subdir) if drainer else os.path.join(root_dir, subdir)
+        dist.barrier()
+        with PeakRssSampler() as rss:
+            start = time.perf_counter()
+            wait_fn = save_fn(local, sharded, save_dir)
+            if drainer:
+                drainer.submit(subdir)
+            stall = time.perf_counter() - start
+            if wait_fn:
+                wait_fn()
+            if drainer:
+                drainer.wait()
+            total = time.perf_counter() - start
+        dist.barrier()
+
+        # With a drainer each rank staged its own files, otherwise ranks wrote to one shared dir
+        if drainer:
+            num_bytes = _dir_size(save_dir)
+        else:
+            num_bytes = _dir_size(save_dir) if dist.get_rank() == 0 else 0
+        max_stats = torch.tensor([stall, total, rss.peak_increase], dtype=torch.float64)
+        dist.all_reduce(max_stats, op=dist.ReduceOp.MAX)
+        total_bytes = torch.tensor([num_bytes], dtype=torch.float64)
+        dist.all_reduce(total_bytes)
+        results.append(
+            {
+                "stall_sec": max_stats[0].item(),
+                "total_sec": max_stats[1].item(),
+                "peak_memory_bytes": max_stats[2].item(),
+                "bytes": total_bytes[0].item(),
+            }
+        )
+        # Every rank's drain finished before the barrier above
+        if drainer and dist.get_rank() == 0:
+            drainer.limit_durable_checkpoints()
+        elif dist.get_rank() == 0:
+            limit_num_checkpoints(root_dir, num_kept_checkpoints)
+    return results
+
+
+def summarize(method, results):
+    total_sec = statistics.median(result["total_sec"] for result in results)
+    num_bytes = statistics.median(result["bytes"] for result in results)
+    return {
+        "method": method,
+        "stall_sec": statistics.median(result["stall_sec"] for result in results),
+        "total_sec": total_sec,
+        "checkpoint_mb": num_bytes / 1e6,
+        "throughput_mb_per_sec": num_bytes / 1e6 / total_sec,
+        "peak_memory_mb": max(result["peak_memory_bytes"] for result in results) / 1e6,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark checkpoint saving on CPU with synthetic state dicts")
+    parser.add_argument("--save_dir", type=str, required=True, help="Durable checkpoint location to benchmark")
+    parser.add_argument(
+        "--local_dir",
+        type=str,
+        default=None,
+        help="Write checkpoints here first and drain them to save_dir in the background",
+    )
+    parser.add_argument("--methods", type=str, nargs="+", default=list(_TIERED_METHODS), choices=_METHODS)
+    parser.add_argument("--num_params", type=int, default=100_000_000, help="Model parameters across all ranks")
+    parser.add_argument("--num_layers", type=int, default=24)
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--num_kept_checkpoints", type=int, default=1)
+    parser.add_argument("--num_kept_local_checkpoints", type=int, default=1)
+    parser.add_argument("--output_json", type=str, default=None, help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    if args.local_dir:
+        unsupported = [method for method in args.methods if method not in _TIERED_METHODS]
+        if unsupported:
+            parser.error(f"--local_dir only supports {_TIERED_METHODS}, got {unsupported}")
+    elif is_s3_source(args.save_dir):
+        parser.error("S3 save_dir needs --local_dir, checkpoints are uploaded by the drainer")
+    return args
+
+
+def main():
+    args = parse_args()
+    dist.init_process_group("gloo")
+    rank = dist.get_rank()
+    mesh = init_device_mesh("cpu", (dist.get_world_size(),))
+    local, sharded = create_state(args.num_params, args.num_layers, mesh)
+    if rank == 0:
+        logger.info(
+            "Benchmarking %s on %d ranks, %d parameters with AdamW state.",
+            args.methods,
+            dist.get_world_size(),
+            args.num_params,
+        )
+
+    summaries = []
+    for method in args.methods:
+        root_dir = os.path.join(args.save_dir, method)
+        drainer = None
+        if args.local_dir:
+            drainer = CheckpointDrainer(
+                os.path.join(args.local_dir, method, f"checkpoint_{rank}"),
+                root_dir,
+                num_kept_local_checkpoints=args.num_kept_local_checkpoints,
+                num_kept_checkpoints=args.num_kept_checkpoints,
+            )
+        results = benchmark_method(
+            method, local, sharded, root_dir, drainer, args.iterations, args.num_kept_checkpoints
+        )
+        if drainer:
+            drainer.close()
+        summary = summarize(method, results)
+        summaries.append(summary)
+        if rank == 0:
+            logger.info(
+                "%s%s: stall %.2f sec, total %.2f sec, %.1f MB at %.1f MB/s, peak memory +%.1f MB.",
+                method,
+                " (two-tier)" if drainer else "",
+                summary["stall_sec"],
+                summary["total_sec"],
+                summary["checkpoint_mb"],
+                summary["throughput_mb_per_sec"],
+                summary["peak_memory_mb"],
+            )
+
+    if rank == 0 and args.output_json:
+        with open(args.output_json, "w") as f:
+            json.dump({"args": vars(args), "results": summaries}, f, indent=2)
+    dist.barrier()
+
+
+if __name__ == "__main__":
+    main()
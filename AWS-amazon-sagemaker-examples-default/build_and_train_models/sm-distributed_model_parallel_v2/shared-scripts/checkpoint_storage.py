@@ -0,0 +1,199 @@
+"""Checkpoint retention and two-tier checkpoint storage.
+
+In two-tier mode checkpoints are written to a fast local tier, usually instance NVMe, so training only stalls
+for the local write. A background thread then copies them to the durable tier (S3 or a shared filesystem
+such as FSx). Retention applies to both tiers.
+"""
+
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from data.utils import is_s3_source, parse_s3_address
+from logging_utils import get_logger
+
+logger = get_logger()
+
+# Checkpoint subdirs end with their step count, e.g. `gpt_neox-1000steps`.
+CHECKPOINT_DIR_REGEX = r"^.*\d+steps$"
+
+_S3_DELETE_BATCH_SIZE = 1000
+
+
+def _s3_client():
+    import boto3
+
+    return boto3.client("s3")
+
+
+def _s3_prefix(path):
+    return parse_s3_address(path.rstrip("/") + "/")
+
+
+def checkpoint_step(name):
+    """Step count of a checkpoint subdir, the last integer in its name."""
+    return int(re.findall(r"\d+", name)[-1])
+
+
+def list_checkpoints(root_dir, regex=CHECKPOINT_DIR_REGEX):
+    """Names of the checkpoint subdirs of a local or S3 root, oldest first."""
+    if is_s3_source(root_dir):
+        bucket, prefix = _s3_prefix(root_dir)
+        paginator = _s3_client().get_paginator("list_objects_v2")
+        names = [
+            common_prefix["Prefix"][len(prefix) :].rstrip("/")
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter="/")
+            for common_prefix in page.get("CommonPrefixes", [])
+        ]
+    elif os.path.isdir(root_dir):
+        names = [name for name in os.listdir(root_dir) if os.path.isdir(os.path.join(root_dir, name))]
+    else:
+        names = []
+    return sorted((name for name in names if re.match(regex, name)), key=checkpoint_step)
+
+
+def delete_checkpoint(root_dir, name):
+    """Delete a checkpoint subdir of a local or S3 root."""
+    if not is_s3_source(root_dir):
+        shutil.rmtree(os.path.join(root_dir, name), ignore_errors=True)
+        return
+
+    bucket, prefix = _s3_prefix(os.path.join(root_dir, name))
+    s3_client = _s3_client()
+    paginator = s3_client.get_paginator("list_objects_v2")
+    keys = [obj["Key"] for page in paginator.paginate(Bucket=bucket, Prefix=prefix) for obj in page.get("Contents", [])]
+    for start in range(0, len(keys), _S3_DELETE_BATCH_SIZE):
+        objects = [{"Key": key} for key in keys[start : start + _S3_DELETE_BATCH_SIZE]]
+        s3_client.delete_objects(Bucket=bucket, Delete={"Objects": objects, "Quiet": True})
+
+
+def limit_num_checkpoints(root_dir, num_kept_checkpoints, regex=CHECKPOINT_DIR_REGEX):
+    """Delete all but the newest `num_kept_checkpoints` checkpoint subdirs of a local or S3 root."""
+    names = list_checkpoints(root_dir, regex)
+    for name in names[: max(len(names) - num_kept_checkpoints, 0)]:
+        logger.info("Deleting old checkpoint %s.", os.path.join(root_dir, name))
+        delete_checkpoint(root_dir, name)
+
+
+def copy_checkpoint(src_dir, dst_dir):
+    """Copy the files of a local checkpoint dir to a local or S3 dir and return the number of bytes copied.
+
+    Files are merged into `dst_dir`, so ranks that each staged their own files of a checkpoint can all copy
+    to the same destination.
+    """
+    s3_client = _s3_client() if is_s3_source(dst_dir) else None
+    num_bytes = 0
+    for dirpath, _, filenames in os.walk(src_dir):
+        for filename in filenames:
+            src_path = os.path.join(dirpath, filename)
+            dst_path = os.path.join(dst_dir, os.path.relpath(src_path, src_dir))
+            if s3_client is not None:
+                bucket, key = parse_s3_address(dst_path)
+                s3_client.upload_file(src_path, bucket, key)
+            else:
+                os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+                # Readers never see a partially copied file
+                shutil.copyfile(src_path, dst_path + ".tmp")
+                os.replace(dst_path + ".tmp", dst_path)
+            num_bytes += os.path.getsize(src_path)
+    return num_bytes
+
+
+class CheckpointDrainer:
+    """Copy checkpoints from a local tier to a durable tier on a background thread.
+
+    `local_root` belongs to one rank, and `durable_root` is shared by all ranks. Only one drain runs at a
+    time, and `submit` waits for the previous one. After a drain, the local tier keeps the newest
+    `num_kept_local_checkpoints` drained checkpoints, and checkpoints that are not drained yet.
+    Retention of the durable tier is applied by one rank through `limit_durable_checkpoints`, once every
+    rank has drained, since a checkpoint is only complete there when all ranks copied their files.
+    Drain errors are raised by the next `submit` or `wait`.
+    """
+
+    def __init__(
+        self,
+        local_root: str,
+        durable_root: str,
+        num_kept_local_checkpoints: int,
+        num_kept_checkpoints: int,
+        regex: str = CHECKPOINT_DIR_REGEX,
+    ):
+        if is_s3_source(local_root):
+            raise ValueError(f"The local checkpoint tier must be a local path, got {local_root}.")
+        if num_kept_local_checkpoints < 1:
+            raise ValueError("At least one checkpoint must be kept on the local tier.")
+        self.local_root = local_root
+        self.durable_root = durable_root
+        self.num_kept_local_checkpoints = num_kept_local_checkpoints
+        self.num_kept_checkpoints = num_kept_checkpoints
+        self.regex = regex
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint-drain")
+        self._pending = None
+
+    def local_dir(self, subdir):
+        return os.path.join(self.local_root, subdir)
+
+    def submit(self, subdir, limit_durable_checkpoints=False):
+        """Start draining the checkpoint at `local_dir(subdir)` and return the seconds spent waiting for the previous drain.
+
+        With `limit_durable_checkpoints`, the drain first applies durable retention to the older checkpoints.
+        Only pass it on one rank, and only when all ranks finished their previous drain.
+        """
+        waited = self.wait()
+        self._pending = self._executor.submit(self._drain, subdir, limit_durable_checkpoints)
+        return waited
+
+    def wait(self):
+        """Block until the running drain finishes, and return the seconds waited."""
+        start = time.time()
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+        return time.time() - start
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
+
+    def limit_durable_checkpoints(self, before_step=None):
+        """Delete all but the newest `num_kept_checkpoints` checkpoints of the durable tier.
+
+        Call it on one rank, after every rank's drain of these checkpoints finished. Checkpoints from
+        `before_step` on are neither deleted nor counted, since other ranks may still be draining them.
+        """
+        names = [
+            name
+            for name in list_checkpoints(self.durable_root, self.regex)
+            if before_step is None or checkpoint_step(name) < before_step
+        ]
+        for name in names[: max(len(names) - self.num_kept_checkpoints, 0)]:
+            logger.info("Deleting old checkpoint %s.", os.path.join(self.durable_root, name))
+            delete_checkpoint(self.durable_root, name)
+
+    def _drain(self, subdir, limit_durable_checkpoints):
+        if limit_durable_checkpoints:
+            self.limit_durable_checkpoints(before_step=checkpoint_step(subdir))
+        start = time.time()
+        dst_dir = os.path.join(self.durable_root, subdir)
+        num_bytes = copy_checkpoint(self.local_dir(subdir), dst_dir)
+        drain_time = time.time() - start
+        logger.info(
+            "Drained %s to %s: %.1f MB in %.2f sec (%.1f MB/s).",
+            self.local_dir(subdir),
+            dst_dir,
+            num_bytes / 1e6,
+            drain_time,
+            num_bytes / 1e6 / max(drain_time, 1e-9),
+        )
+        # Only checkpoints up to this one have been drained
+        drained = [
+            name
+            for name in list_checkpoints(self.local_root, self.regex)
+            if checkpoint_step(name) <= checkpoint_step(subdir)
+        ]
+        for name in drained[: max(len(drained) - self.num_kept_local_checkpoints, 0)]:
+            logger.info("Deleting drained checkpoint %s.", self.local_dir(name))
+            delete_checkpoint(self.local_root, name)
+        return num_bytes
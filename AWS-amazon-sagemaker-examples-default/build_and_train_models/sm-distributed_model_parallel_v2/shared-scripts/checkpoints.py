@@ -15,6 +15,7 @@ import torch
 import torch.distributed as dist
 import torch.sagemaker.checkpoint.utils as tsm_checkpoint
 from pathlib import Path
+from checkpoint_storage import CHECKPOINT_DIR_REGEX, limit_num_checkpoints
 from data.utils import is_s3_source, parse_s3_address
 from logging_utils import get_logger
 from torch.distributed import checkpoint
@@ -39,7 +40,7 @@ logger = get_logger()
 
 # How to remove extra checkpoints, `regex` and `sort_fn` need to match for correctness.
 #   - Sort subdir by the **last** int, right before `steps` as shown in the regex.
-_CHECKPOINT_DIR_REGEX = r"^.*\d+steps$"
+_CHECKPOINT_DIR_REGEX = CHECKPOINT_DIR_REGEX
 _CHECKPOINT_SORT_FN = tsm_checkpoint.SORT_BY_LAST_INT
 _DEFAULT_STATE_DICT_TYPE = StateDictType.SHARDED_STATE_DICT
 
@@ -252,19 +253,21 @@ def _delete_old_checkpoints(
     num_kept_checkpoints,
     sort_fn=_CHECKPOINT_SORT_FN,
     regex=_CHECKPOINT_DIR_REGEX,
+    root_dir=None,
 ):
-    if is_s3_source(str(save_dir)):
-        return
     rank = dist.get_rank()
     is_rank_zero = rank == 0
     if is_rank_zero:
-        tsm_checkpoint.limit_num_subdirs(
-            os.path.abspath(save_dir),
-            num_kept_checkpoints,
-            sort_fn=sort_fn,
-            regex=regex,
-            log=is_rank_zero,
-        )
+        if is_s3_source(str(save_dir)):
+            limit_num_checkpoints(root_dir, num_kept_checkpoints, regex=regex)
+        else:
+            tsm_checkpoint.limit_num_subdirs(
+                os.path.abspath(save_dir),
+                num_kept_checkpoints,
+                sort_fn=sort_fn,
+                regex=regex,
+                log=is_rank_zero,
+            )
         logger.info("Finished checkpointing to %s.", save_dir)
     dist.barrier()
 
@@ -291,7 +294,7 @@ def _save_async_sharded(
         blocking=True, process_group=process_group
     )
     _delete_old_checkpoints(
-        save_dir, num_kept_checkpoints
+        save_dir, num_kept_checkpoints, root_dir=root_dir
     )
 
     with FSDP.state_dict_type(model, _DEFAULT_STATE_DICT_TYPE):
@@ -354,7 +357,7 @@ def _save_async_local(
         blocking=True, process_group=current_replication_group
     )
     _delete_old_checkpoints(
-        checkpoint_dir, num_kept_checkpoints
+        checkpoint_dir, num_kept_checkpoints, root_dir=root_dir
     )
     with sm_state_dict_type(model, SMStateDictType.SM_LOCAL_STATE_DICT):
         optim_state_dict = optimizer.state_dict()
@@ -393,8 +396,13 @@ def save_checkpoint(  # pylint: disable=too-many-arguments,too-many-locals
     expert_parallel_degree: int,
     checkpoint_type=CheckpointingMethod.LOCAL,
     async_calls=None,
+    checkpoint_drainer=None,
 ) -> None:
-    """Export checkpoint."""
+    """Export checkpoint.
+
+    With a `checkpoint_storage.CheckpointDrainer`, the checkpoint is written to the drainer's local tier and
+    copied to `root_dir` in the background.
+    """
     from torch.sagemaker import state
 
     # seeing a NCCL crash during broadcast in checkpointing sometimes
@@ -405,8 +413,17 @@ def save_checkpoint(  # pylint: disable=too-many-arguments,too-many-locals
     if not root_dir:
         return
 
+    if isinstance(checkpoint_type, str):
+        checkpoint_type = CheckpointingMethod[checkpoint_type.upper()]
+
     save_dir = os.path.join(root_dir, subdir)
-    if is_s3_source(root_dir):
+    if checkpoint_drainer is not None:
+        if checkpoint_type not in (CheckpointingMethod.SHARDED, CheckpointingMethod.LOCAL):
+            raise NotImplementedError(
+                "Two-tier checkpointing is only supported with sharded and local checkpoints"
+            )
+        save_dir = checkpoint_drainer.local_dir(subdir)
+    elif is_s3_source(root_dir):
         if (
             checkpoint_type != CheckpointingMethod.ASYNC_SHARDED and
             checkpoint_type != CheckpointingMethod.ASYNC_LOCAL
@@ -416,9 +433,6 @@ def save_checkpoint(  # pylint: disable=too-many-arguments,too-many-locals
     if dist.get_rank() == 0:
         logger.info("Checkpointing to %s ...", save_dir)
 
-    if isinstance(checkpoint_type, str):
-        checkpoint_type = CheckpointingMethod[checkpoint_type.upper()]
-
     ckpt_start = time.process_time()
     if checkpoint_type == CheckpointingMethod.SHARDED:
         if tensor_parallel_degree > 1:
@@ -492,6 +506,15 @@ def save_checkpoint(  # pylint: disable=too-many-arguments,too-many-locals
     if dist.get_rank() == 0:
         logger.info("Finished checkpointing to %s.", save_dir)
 
+    if checkpoint_drainer is not None:
+        # The previous drain normally finished during training. All ranks must be done with it before
+        # rank 0's retention can delete older checkpoints from the durable tier.
+        drain_wait = checkpoint_drainer.wait()
+        compute_stats_of_metric(drain_wait, "waiting for previous checkpoint drain (s)", process_group)
+        dist.barrier()
+        checkpoint_drainer.submit(subdir, limit_durable_checkpoints=dist.get_rank() == 0)
+        return
+
     if is_s3_source(root_dir):
         s3_start = time.process_time()
 
@@ -510,6 +533,8 @@ def save_checkpoint(  # pylint: disable=too-many-arguments,too-many-locals
             "Rank %d: saved to %s in %f sec", dist.get_rank(), bucketdir, s3_time
         )
         dist.barrier()
+        if subdir and dist.get_rank() == 0:
+            limit_num_checkpoints(root_dir, num_kept_checkpoints)
 
     # Only limit subdirs when writing intermediate checkpoints, not the final checkpoint.
     if not subdir:
@@ -576,6 +601,12 @@ def _load_sharded_with_fn(
             state_dict.update(val_state_dict)
         except:
             pass
+        try:
+            sampler_state_dict = {"train_sampler_state": {"num_replicas": 0, "consumed_samples": 0}}
+            _load_from_disk(sampler_state_dict)
+            state_dict.update(sampler_state_dict)
+        except:
+            pass
 
         if dist.get_rank() == 0:
             logger.info("Loaded model state from disk")
@@ -713,6 +744,12 @@ def _load_async_local(
             state_dict.update(val_state_dict)
         except:
             pass
+        try:
+            sampler_state_dict = {"train_sampler_state": {"num_replicas": 0, "consumed_samples": 0}}
+            _load_from_disk(sampler_state_dict)
+            state_dict.update(sampler_state_dict)
+        except:
+            pass
 
         if global_rank == 0:
             logger.info(f"Loaded model and optimizer state from {checkpoint_dir}")
@@ -829,12 +866,17 @@ def load_checkpoint(
         backward_compat_get_val_resume_from_sequence_number(state_dict)
     )
 
+    # Checkpoints saved before sampler state was added resume with the same number of data parallel ranks
+    train_sampler_state = state_dict.get("train_sampler_state")
+
     if dist.get_rank() == 0:
         logger.info(
-            "Loaded state from disk: epoch %d, start_train_path_index %d, resume_from_sequence_number %d.",
+            "Loaded state from disk: epoch %d, start_train_path_index %d, resume_from_sequence_number %d, "
+            "train_sampler_state %s.",
             state_dict["epoch"],
             state_dict["start_train_path_index"],
             resume_from_sequence_number,
+            train_sampler_state,
         )
 
     return (
@@ -846,4 +888,5 @@ def load_checkpoint(
         state_dict["start_train_path_index"],
         resume_from_sequence_number,
         val_resume_from_sequence_number,
+        train_sampler_state,
     )
@@ -7,6 +7,7 @@ from typing import List, Tuple, TypeVar
 import numpy as np
 import torch
 import torch.distributed as dist
+from data.dataset.token_shard import TokenShard
 from logging_utils import get_logger
 
 logger = get_logger()
@@ -74,3 +75,43 @@ class GPTPretrainingDataset(torch.utils.data.Dataset):
             iids = iids[s_idx:e_idx]
             attns = attns[s_idx:e_idx]
         return iids, attns
+
+
+###### Load pre-tokenized binary GPT pretraining data ######
+class GPTBinaryPretrainingDataset(torch.utils.data.Dataset):
+    """GPT Pretraining Dataset over memory-mapped token shards (see data/dataset/token_shard.py).
+
+    Samples are sliced from the mapped token files without decoding, so ranks and dataloader workers
+    share the page cache instead of each holding the data. Samples longer than `max_sequence_length`
+    are cropped at a random position, as in `GPTPretrainingDataset`.
+    """
+
+    def __init__(
+        self,
+        input_paths: List[str],
+        max_sequence_length=None,
+    ):
+        self.input_paths = input_paths
+        self.max_sequence_length = max_sequence_length
+        self.shards = [TokenShard(path) for path in input_paths]
+        self.cumulative_lengths = np.cumsum([len(shard) for shard in self.shards])
+        if (dist.get_rank() if dist.is_initialized() else 0) == 0:
+            logger.debug(f"Mapped {len(self)} sequences from {len(self.shards)} files")
+
+    def __len__(self) -> int:
+        return int(self.cumulative_lengths[-1]) if len(self.shards) else 0
+
+    def __getitem__(self, index: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        shard_index = int(np.searchsorted(self.cumulative_lengths, index, side="right"))
+        if shard_index > 0:
+            index -= int(self.cumulative_lengths[shard_index - 1])
+        tokens = self.shards[shard_index][index]
+        self.actual_sequence_length = len(tokens)
+
+        if self.max_sequence_length and self.actual_sequence_length > self.max_sequence_length:
+            s_idx = np.random.randint(0, self.actual_sequence_length - self.max_sequence_length)
+            tokens = tokens[s_idx : s_idx + self.max_sequence_length]
+        # Only the sample is copied, to the int64 tensor the model expects
+        iids = torch.from_numpy(tokens.astype(np.int64))
+        attns = torch.ones(len(tokens), dtype=torch.long)
+        return iids, attns
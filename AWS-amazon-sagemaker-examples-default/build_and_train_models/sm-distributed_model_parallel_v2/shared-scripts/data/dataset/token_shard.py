@@ -0,0 +1,117 @@
+"""Pre-tokenized binary shards.
+
+A shard is a pair of files sharing a path prefix:
+
+* ``<prefix>.bin``: the tokens of all sequences, concatenated as a flat uint16 or uint32 array.
+* ``<prefix>.idx``: a 32 byte header (magic, version, token item size, number of sequences) followed by
+  ``num_sequences + 1`` int64 token offsets, so sequence ``i`` is ``tokens[offsets[i]:offsets[i + 1]]``.
+
+Shards are read with ``np.memmap``, so a sequence is a zero-copy slice of the page cache and ranks and
+dataloader workers on a node share the same physical pages.
+"""
+import os
+import struct
+
+import numpy as np
+
+_INDEX_MAGIC = b"SMPTOKS\x00"
+_INDEX_VERSION = 1
+_INDEX_HEADER = struct.Struct("<8sQQQ")
+BIN_SUFFIX = ".bin"
+IDX_SUFFIX = ".idx"
+
+
+def token_dtype(vocab_size):
+    """Smallest unsigned dtype that holds every token ID of a vocabulary."""
+    return np.dtype(np.uint16) if vocab_size <= np.iinfo(np.uint16).max + 1 else np.dtype(np.uint32)
+
+
+def shard_prefix(path):
+    """Strip the .bin or .idx suffix from a shard path."""
+    for suffix in (BIN_SUFFIX, IDX_SUFFIX):
+        if path.endswith(suffix):
+            return path[: -len(suffix)]
+    return path
+
+
+class TokenShardWriter:
+    """Append sequences to a shard. Files are renamed into place by `close`, so a shard is either complete or absent."""
+
+    def __init__(self, prefix, vocab_size):
+        self.prefix = prefix
+        self.dtype = token_dtype(vocab_size)
+        self.vocab_size = vocab_size
+        self._bin_file = open(prefix + BIN_SUFFIX + ".tmp", "wb")
+        self._lengths = []
+        self.num_tokens = 0
+
+    def add(self, tokens):
+        """Append one sequence."""
+        self.add_blocks(np.asarray(tokens).reshape(1, -1))
+
+    def add_blocks(self, blocks):
+        """Append each row of a 2D array of token IDs as one sequence."""
+        blocks = np.asarray(blocks)
+        if blocks.size and (blocks.min() < 0 or blocks.max() >= self.vocab_size):
+            raise ValueError(f"Token IDs must be in [0, {self.vocab_size}) for {self.prefix}")
+        self._bin_file.write(blocks.astype(self.dtype, copy=False).tobytes())
+        self._lengths.extend([blocks.shape[1]] * blocks.shape[0])
+        self.num_tokens += blocks.size
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def close(self):
+        self._bin_file.close()
+        offsets = np.zeros(len(self._lengths) + 1, dtype=np.int64)
+        np.cumsum(self._lengths, out=offsets[1:])
+        with open(self.prefix + IDX_SUFFIX + ".tmp", "wb") as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, _INDEX_VERSION, self.dtype.itemsize, len(self._lengths)))
+            f.write(offsets.tobytes())
+        os.replace(self.prefix + BIN_SUFFIX + ".tmp", self.prefix + BIN_SUFFIX)
+        os.replace(self.prefix + IDX_SUFFIX + ".tmp", self.prefix + IDX_SUFFIX)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._bin_file.close()
+
+
+class TokenShard:
+    """Read-only view of a shard. The token file is mapped lazily, once per process."""
+
+    def __init__(self, prefix):
+        self.prefix = shard_prefix(prefix)
+        with open(self.prefix + IDX_SUFFIX, "rb") as f:
+            magic, version, itemsize, num_sequences = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+            if magic != _INDEX_MAGIC or version != _INDEX_VERSION:
+                raise ValueError(f"{self.prefix}{IDX_SUFFIX} is not a version {_INDEX_VERSION} token shard index")
+            self.offsets = np.fromfile(f, dtype=np.int64, count=num_sequences + 1)
+        self.dtype = np.dtype(np.uint16) if itemsize == 2 else np.dtype(np.uint32)
+        self._tokens = None
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = np.memmap(self.prefix + BIN_SUFFIX, dtype=self.dtype, mode="r")
+        return self._tokens
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def sequence_length(self, index):
+        return int(self.offsets[index + 1] - self.offsets[index])
+
+    def __getitem__(self, index):
+        """Tokens of a sequence, as a read-only view of the mapped file."""
+        return self.tokens[self.offsets[index] : self.offsets[index + 1]]
+
+    def __getstate__(self):
+        # Pickling a memmap copies its data, dataloader workers map the file themselves instead
+        state = self.__dict__.copy()
+        state["_tokens"] = None
+        return state
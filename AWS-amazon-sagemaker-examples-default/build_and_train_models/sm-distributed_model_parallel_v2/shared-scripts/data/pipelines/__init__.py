@@ -13,7 +13,7 @@ def create_data_pipeline(
             train_batch_size=args.train_batch_size,
             sequence_length=args.max_context_width,
         )
-    elif args.dataset_type == "gpt_jsonl":
+    elif args.dataset_type in ("gpt_jsonl", "gpt_bin"):
         data_pipeline = GPTDataPipeline(
             dataset_train_path=args.training_dir,
             train_batch_size=args.train_batch_size,
@@ -23,6 +23,7 @@ def create_data_pipeline(
             use_last_file_only_for_valid=args.fast_validation > 0,
             sequence_length=args.max_context_width,
             zipped_data=args.zipped_data,
+            binary_data=args.dataset_type == "gpt_bin",
             seed=args.seed,
             num_workers=args.data_num_workers,
             resume_from_sequence_number=resume_from_sequence_number,
@@ -2,40 +2,51 @@ from abc import abstractmethod
 
 import torch
 import torch.distributed as dist
-from torch.utils.data import DataLoader
 
 
-# Adapted from accelerate's SkipDataLoader to skip certain number of sequences instead of batches
-# https://github.com/huggingface/accelerate/blob/80da9cfb09bb3cc9f1b385cb55d6b90d025a5fd9/src/accelerate/data_loader.py#L858C1-L878C28
-class SkipDataLoader(DataLoader):
+class ResumableDistributedSampler(torch.utils.data.DistributedSampler):
     """
-    Subclass of a PyTorch `DataLoader` that will skip the first batches.
+    `DistributedSampler` that starts an epoch from a given sample of this rank's shard.
+
+    Resuming only slices the list of sample indices, so no skipped sample is read, decoded or collated
+    and the time to the first step does not depend on the position in the epoch. The start index only
+    applies to the first iteration, later epochs start from the beginning.
 
     Args:
         dataset (`torch.utils.data.dataset.Dataset`):
-            The dataset to use to build this datalaoder.
-        skip_batches (`int`, *optional*, defaults to 0):
-            The number of batches to skip at the beginning.
+            The dataset to sample from.
+        start_index (`int`, *optional*, defaults to 0):
+            The number of samples of this rank's shard already consumed in the current epoch.
         kwargs:
-            All other keyword arguments to pass to the regular `DataLoader` initialization.
+            All other keyword arguments to pass to the regular `DistributedSampler` initialization.
     """
 
-    def __init__(self, *args, resume_from_sequence_number=0, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.resume_from_sequence_number = resume_from_sequence_number
-        self.cur_seq_index = 0
+    def __init__(self, dataset, start_index=0, **kwargs):
+        super().__init__(dataset, **kwargs)
+        self.start_index = start_index % self.num_samples if self.num_samples else 0
 
     def __iter__(self):
-        for batch in super().__iter__():
-            num_seq = int(self.batch_size)
-            if self.cur_seq_index + num_seq > self.resume_from_sequence_number % (len(self) * self.batch_size):
-                yield batch
-            else:
-                if dist.get_rank() == 0:
-                    print(
-                        f"Dataloader skipping {num_seq} sequences in this batch as starting from {self.resume_from_sequence_number} sequences"
-                    )
-            self.cur_seq_index += num_seq
+        indices = list(super().__iter__())[self.start_index :]
+        if self.start_index and dist.is_initialized() and dist.get_rank() == 0:
+            print(f"Sampler resuming from sample {self.start_index} of {self.num_samples} of this rank")
+        self.start_index = 0
+        return iter(indices)
+
+    def __len__(self):
+        return self.num_samples - self.start_index
+
+
+def rescale_resume_sequence_number(sampler_state, resume_from_sequence_number, num_replicas):
+    """
+    Convert the per-rank resume position of a checkpoint to a run with `num_replicas` data parallel ranks.
+
+    Ranks take strided samples of the same index order, so the samples consumed by all ranks are the first
+    `consumed_samples` of that order whatever the number of ranks. Checkpoints without sampler state
+    keep their per-rank position.
+    """
+    if not sampler_state or not sampler_state.get("num_replicas"):
+        return resume_from_sequence_number
+    return int(sampler_state["consumed_samples"]) // num_replicas
 
 
 class DataPipeline:
@@ -72,8 +83,9 @@ class DataPipeline:
     def _create_dataloader(self, dataset, batch_size, resume_from_sequence_number):
         # TODO: set sampler.epoch to correctly shuffle across epochs, else same order will be used for
         # all epochs not relevant now as we have no epochs
-        sampler = torch.utils.data.DistributedSampler(
+        sampler = ResumableDistributedSampler(
             dataset,
+            start_index=resume_from_sequence_number,
             shuffle=self.shuffle,
             seed=self.seed,
             rank=self.dp_rank,
@@ -89,14 +101,14 @@ class DataPipeline:
             "pin_memory": True,
             "drop_last": True,
         }
+        return torch.utils.data.DataLoader(dataset, **kwargs)
 
-        if resume_from_sequence_number > 0:
-            dataloader = SkipDataLoader(
-                dataset, resume_from_sequence_number=resume_from_sequence_number, **kwargs
-            )
-        else:
-            dataloader = torch.utils.data.DataLoader(dataset, **kwargs)
-        return dataloader
+    def sampler_state_dict(self, resume_from_sequence_number):
+        """State saved in checkpoints to resume sampling, possibly with a different number of data parallel ranks."""
+        return {
+            "num_replicas": self.dp_size,
+            "consumed_samples": resume_from_sequence_number * self.dp_size,
+        }
 
     @abstractmethod
     def get_batch(self, data):
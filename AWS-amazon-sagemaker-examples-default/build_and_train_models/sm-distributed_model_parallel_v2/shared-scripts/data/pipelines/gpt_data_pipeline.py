@@ -2,7 +2,7 @@
 import os
 from typing import List, Union
 
-from data.dataset.gpt_dataset import GPTPretrainingDataset
+from data.dataset.gpt_dataset import GPTBinaryPretrainingDataset, GPTPretrainingDataset
 from data.pipelines.data_pipeline import DataPipeline
 from data.utils import is_s3_source
 from logging_utils import get_logger
@@ -27,6 +27,7 @@ class GPTDataPipeline(DataPipeline):
         sequence_length=2048,
         dataset_type="gpt",
         zipped_data=False,
+        binary_data=False,
         seed=1234,
         num_workers=0,
         resume_from_sequence_number=0,
@@ -47,6 +48,7 @@ class GPTDataPipeline(DataPipeline):
             shuffle=shuffle,
         )
         self.sequence_length = sequence_length
+        self.binary_data = binary_data
         self.train_paths = self.get_train_paths(
             dataset_type, dataset_train_path, zipped_data=zipped_data
         )
@@ -62,12 +64,19 @@ class GPTDataPipeline(DataPipeline):
             self.use_last_file_only_for_valid = use_last_file_only_for_valid
             self._create_val_dataset()
 
-    def _create_val_dataset(self):
-        self.val_dataset = GPTPretrainingDataset(
-            self.val_paths if not self.use_last_file_only_for_valid else [self.val_paths[-1]],
+    def _create_dataset(self, paths):
+        if self.binary_data:
+            return GPTBinaryPretrainingDataset(paths, max_sequence_length=self.sequence_length)
+        return GPTPretrainingDataset(
+            paths,
             max_sequence_length=self.sequence_length,
             zipped=self.zipped_data,
         )
+
+    def _create_val_dataset(self):
+        self.val_dataset = self._create_dataset(
+            self.val_paths if not self.use_last_file_only_for_valid else [self.val_paths[-1]]
+        )
         self.val_dataloader = self._create_dataloader(self.val_dataset, self.val_batch_size, self.val_resume_from_sequence_number)
 
     def increment_path_in_epoch(self):
@@ -79,12 +88,12 @@ class GPTDataPipeline(DataPipeline):
         return True
 
     def create_train_dataset(self):
-        self.train_dataset = GPTPretrainingDataset(
-            self.train_paths[self.cur_train_path : self.cur_train_path + 1],
-            max_sequence_length=self.sequence_length,
-            zipped=self.zipped_data,
+        self.train_dataset = self._create_dataset(
+            self.train_paths[self.cur_train_path : self.cur_train_path + 1]
         )
         self.train_dataloader = self._create_dataloader(self.train_dataset, self.train_batch_size, self.resume_from_sequence_number)
+        # The resume position is within the file training resumed from, later files start from the beginning
+        self.resume_from_sequence_number = 0
 
     def get_train_paths(
         self, data_type, training_dir, zipped_data=False
@@ -100,11 +109,15 @@ class GPTDataPipeline(DataPipeline):
                 ]
             )
         elif data_type == "gpt":
-            if zipped_data > 0:
+            if self.binary_data:
+                file_extension = ".bin"
+            elif zipped_data > 0:
                 file_extension = ".json.gz"
             else:
                 file_extension = ".json"
             if is_s3_source(training_dir):
+                if self.binary_data:
+                    raise ValueError("Binary token shards are memory-mapped and need a local or shared file system")
                 assert S3Dataset, "awsio package needs to be installed"
                 train_paths = S3Dataset(training_dir)
             else:
@@ -134,11 +147,15 @@ class GPTDataPipeline(DataPipeline):
                 ]
             )
         elif data_type == "gpt":
-            if zipped_data > 0:
+            if self.binary_data:
+                file_extension = ".bin"
+            elif zipped_data > 0:
                 file_extension = ".json.gz"
             else:
                 file_extension = ".json"
             if is_s3_source(test_dir):
+                if self.binary_data:
+                    raise ValueError("Binary token shards are memory-mapped and need a local or shared file system")
                 assert S3Dataset, "awsio package needs to be installed"
                 val_paths = S3Dataset(test_dir)
             else:
@@ -0,0 +1,108 @@
+"""Convert GPT JSON lines data to memory-mapped token shards.
+
+Each `.json.gz` (or `.json`) file of `{"input_ids": [...], "attention_mask": [...]}` lines becomes a
+`.bin`/`.idx` shard pair with the same name, read by `GPTBinaryPretrainingDataset` with `--dataset_type gpt_bin`.
+Files are converted in parallel, and files whose shard already exists are skipped, so an interrupted
+conversion can be restarted.
+
+Example command, from the shared-scripts directory
+----
+python -m data.prep.convert_gpt_jsonl_to_bin --input_dir /fsx/datasets/gpt/train \
+    --output_dir /fsx/datasets/gpt-bin/train \
+    --vocab_size 50432
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from data.dataset.token_shard import BIN_SUFFIX, IDX_SUFFIX, TokenShardWriter
+
+logger = logging.getLogger(__name__)
+
+_WRITE_BATCH_SIZE = 1024
+
+
+def _output_prefix(input_path, output_dir):
+    name = os.path.basename(input_path)
+    for suffix in (".json.gz", ".json"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+            break
+    return os.path.join(output_dir, name)
+
+
+def _write_batch(writer, batch):
+    # Fixed-length sequences, the common case for pretraining data, are written as one 2D array
+    if len({len(ids) for ids in batch}) == 1:
+        writer.add_blocks(np.array(batch))
+    else:
+        for ids in batch:
+            writer.add(np.array(ids))
+
+
+def convert_file(input_path, output_dir, vocab_size):
+    """Convert one JSON lines file and return (sequences, tokens) written."""
+    prefix = _output_prefix(input_path, output_dir)
+    if os.path.exists(prefix + BIN_SUFFIX) and os.path.exists(prefix + IDX_SUFFIX):
+        return 0, 0
+
+    opener = gzip.open if input_path.endswith(".gz") else open
+    with opener(input_path, "rt") as f, TokenShardWriter(prefix, vocab_size) as writer:
+        batch = []
+        for line_number, line in enumerate(f, 1):
+            obj = json.loads(line)
+            mask = obj.get("attention_mask")
+            # Shards store tokens only, and the dataset returns an all-ones attention mask
+            if mask is not None and not all(mask):
+                raise ValueError(
+                    f"{input_path}:{line_number} has padding, binary shards only support unpadded sequences"
+                )
+            batch.append(obj["input_ids"])
+            if len(batch) == _WRITE_BATCH_SIZE:
+                _write_batch(writer, batch)
+                batch = []
+        if batch:
+            _write_batch(writer, batch)
+    return len(writer), writer.num_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert GPT JSON lines data to memory-mapped token shards")
+    parser.add_argument("--input_dir", type=str, required=True)
+    parser.add_argument("--output_dir", type=str, required=True)
+    parser.add_argument(
+        "--vocab_size", type=int, required=True, help="Tokens are stored as uint16 up to 65536, else uint32"
+    )
+    parser.add_argument("--num_proc", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname).1s %(message)s")
+
+    input_paths = sorted(
+        os.path.join(args.input_dir, p)
+        for p in os.listdir(args.input_dir)
+        if p.endswith(".json.gz") or p.endswith(".json")
+    )
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.time()
+    total_sequences = total_tokens = 0
+    with ProcessPoolExecutor(max_workers=args.num_proc) as executor:
+        futures = [executor.submit(convert_file, path, args.output_dir, args.vocab_size) for path in input_paths]
+        for path, future in zip(input_paths, futures):
+            sequences, tokens = future.result()
+            total_sequences += sequences
+            total_tokens += tokens
+            logger.info(f"Converted {path}: {sequences} sequences, {tokens} tokens")
+    logger.info(
+        f"Converted {len(input_paths)} files, {total_sequences} sequences and {total_tokens} tokens "
+        f"in {time.time() - start:.1f} seconds"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
 import argparse
 import functools
+import json
 import logging
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from itertools import chain
 
+import numpy as np
 import torch
 import transformers
 from datasets import load_dataset
@@ -35,6 +39,16 @@ python prepare_hf_dataset.py --dataset_path /fsx/datasets/c4/en/hf \
     --hf_tokenizer_name meta-llama/Llama-2-7b-hf \
     --seq_len 4096 \
     --val_split_percentage 20
+
+3. C4 streamed to binary token shards for --dataset_type gpt_bin, from the shared-scripts directory.
+The corpus is read iteratively and never cached, so memory and disk use do not grow with its size.
+python -m data.prep.prepare_hf_dataset --streaming 1 \
+    --dataset_name allenai/c4 \
+    --dataset_config_name en \
+    --output_dir /fsx/datasets/c4/en/bin/llama/4096 \
+    --hf_tokenizer_name meta-llama/Llama-2-7b-hf \
+    --seq_len 4096 \
+    --val_split_percentage 1
 """
 
 parser = argparse.ArgumentParser()
@@ -46,6 +60,14 @@ parser.add_argument("--hf_tokenizer_name", type=str, default="meta-llama/Llama-2
 parser.add_argument("--output_dir", default=None, type=str)
 parser.add_argument("--num_proc", default=64, type=int)
 parser.add_argument("--seq_len", type=int, default=4096)
+parser.add_argument(
+    "--streaming",
+    type=int,
+    default=0,
+    help="Stream the corpus and write binary token shards with a resumable manifest instead of HF datasets",
+)
+parser.add_argument("--shard_sequences", type=int, default=100000, help="Sequences per shard when streaming")
+parser.add_argument("--tokenize_batch_size", type=int, default=1000, help="Documents per tokenizer call when streaming")
 args, _ = parser.parse_known_args()
 
 if args.dataset_path is not None and (args.dataset_name is not None and args.dataset_config_name):
@@ -173,14 +195,257 @@ def tokenize_dataset(
     torch.save({"arguments": args}, f"{output_dir}/args")
 
 
+_MANIFEST_NAME = "manifest.json"
+
+# Tokenizer of a streaming worker process, loaded once by `_init_tokenize_worker`
+_worker_tokenizer = None
+
+
+def _init_tokenize_worker(hf_tokenizer_name):
+    global _worker_tokenizer
+    _worker_tokenizer = AutoTokenizer.from_pretrained(hf_tokenizer_name, trust_remote_code=True)
+    # Documents longer than the model are expected, they are packed into blocks
+    transformers.utils.logging.set_verbosity_error()
+
+
+def _tokenize_texts(texts):
+    """Tokenize a batch of documents with the worker's tokenizer into one flat token array."""
+    input_ids = _worker_tokenizer(texts, return_attention_mask=False)["input_ids"]
+    return np.fromiter(chain.from_iterable(input_ids), dtype=np.int32, count=sum(len(ids) for ids in input_ids))
+
+
+def pack_blocks(carry, tokens, block_size):
+    """Append tokens to the remainder carried from earlier batches and split off all full blocks.
+
+    Returns the blocks as a 2D array and the new remainder. Unlike `group_texts`, the remainder is carried
+    to the next batch rather than dropped.
+    """
+    tokens = np.concatenate([carry, tokens])
+    num_tokens = len(tokens) // block_size * block_size
+    return tokens[:num_tokens].reshape(-1, block_size), tokens[num_tokens:]
+
+
+def _routed_batches(dataset, start, text_column_name, route, positions, batch_size):
+    """Group the documents of a stream, numbered from `start`, into lists of texts per output split.
+
+    `route` maps a source index to an output split. Documents before the `positions` of their split were
+    already consumed by it, and are skipped. Yields (split, source documents read, stream state, texts),
+    where the second and third values are the position to resume reading from.
+    """
+    texts = {}
+    for index, example in enumerate(dataset, start):
+        split = route(index)
+        if index < positions[split]:
+            continue
+        split_texts = texts.setdefault(split, [])
+        split_texts.append(example[text_column_name])
+        if len(split_texts) == batch_size:
+            yield split, index + 1, dataset.state_dict(), split_texts
+            texts[split] = []
+    for split, split_texts in texts.items():
+        if split_texts:
+            yield split, index + 1, dataset.state_dict(), split_texts
+
+
+def _tokenize_in_order(executor, batches, max_pending):
+    """Tokenize batches on a process pool, yielding (split, source documents read, stream state, tokens) in order.
+
+    At most `max_pending` batches are in flight, which bounds memory use.
+    """
+    pending = deque()
+    for split, documents_read, stream_state, texts in batches:
+        pending.append((split, documents_read, stream_state, executor.submit(_tokenize_texts, texts)))
+        if len(pending) >= max_pending:
+            split, documents_read, stream_state, future = pending.popleft()
+            yield split, documents_read, stream_state, future.result()
+    while pending:
+        split, documents_read, stream_state, future = pending.popleft()
+        yield split, documents_read, stream_state, future.result()
+
+
+def _write_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, _MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+class _ShardedSplit:
+    """Packs the tokens of one output split into shards, and records its progress in the manifest."""
+
+    def __init__(self, split, output_dir, manifest, vocab_size, sequence_length, shard_sequences):
+        self.split = split
+        self.split_dir = os.path.join(output_dir, split)
+        self.output_dir = output_dir
+        self.manifest = manifest
+        self.state = manifest["splits"][split]
+        self.vocab_size = vocab_size
+        self.sequence_length = sequence_length
+        self.shard_sequences = shard_sequences
+        self.carry = np.array(self.state["carry"], dtype=np.int32)
+        self.writer = None
+        self.documents_read = self.state["documents_read"]
+        self.stream_state = self.state["stream_state"]
+        os.makedirs(self.split_dir, exist_ok=True)
+
+    def add(self, documents_read, stream_state, tokens):
+        self.documents_read, self.stream_state = documents_read, stream_state
+        blocks, self.carry = pack_blocks(self.carry, tokens, self.sequence_length)
+        if len(blocks):
+            if self.writer is None:
+                from data.dataset.token_shard import TokenShardWriter
+
+                name = f"{self.split}_{len(self.state['shards']):05d}"
+                self.writer = TokenShardWriter(os.path.join(self.split_dir, name), self.vocab_size)
+            self.writer.add_blocks(blocks)
+        if self.writer is not None and len(self.writer) >= self.shard_sequences:
+            self._close_shard()
+
+    def finish(self):
+        if self.writer is not None:
+            self._close_shard()
+        # As in `group_texts`, the final partial block is dropped
+        self.state["complete"] = True
+        _write_manifest(self.output_dir, self.manifest)
+        logger.info(
+            f"Finished {self.split}: {sum(shard['sequences'] for shard in self.state['shards'])} sequences "
+            f"in {len(self.state['shards'])} shards"
+        )
+
+    def _close_shard(self):
+        # A shard is only listed once its files are complete, with the position to resume from
+        writer, self.writer = self.writer, None
+        writer.close()
+        self.state["shards"].append(
+            {"name": os.path.basename(writer.prefix), "sequences": len(writer), "tokens": writer.num_tokens}
+        )
+        self.state["documents_read"] = self.documents_read
+        self.state["stream_state"] = self.stream_state
+        self.state["carry"] = self.carry.tolist()
+        _write_manifest(self.output_dir, self.manifest)
+        logger.info(f"Wrote {writer.prefix}: {len(writer)} sequences at source document {self.documents_read}")
+
+
+def tokenize_dataset_streaming(
+    dataset_name,
+    dataset_config_name,
+    dataset_path,
+    hf_tokenizer_name,
+    output_dir,
+    val_split_percentage=20,
+    sequence_length=4096,
+    num_proc=64,
+    shard_sequences=100000,
+    tokenize_batch_size=1000,
+):
+    """Tokenize a streamed corpus and pack it into binary token shards for `--dataset_type gpt_bin`.
+
+    Shards are written to `output_dir/train` and `output_dir/val`. Without a validation split in the source,
+    document `i` goes to val if `i % 100 < val_split_percentage`, and both splits are written in one pass
+    over the source. `manifest.json` records the finished shards of each split, the source position as a
+    `state_dict` of the streamed dataset, and the tokens carried past the last full block. Rerunning the same
+    command resumes from there.
+    """
+    if dataset_path is not None:
+        raw_datasets = load_dataset(dataset_path, streaming=True)
+    else:
+        raw_datasets = load_dataset(dataset_name, dataset_config_name, streaming=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(hf_tokenizer_name, trust_remote_code=True)
+    assert tokenizer.model_max_length >= sequence_length
+    vocab_size = len(tokenizer)
+
+    column_names = raw_datasets["train"].column_names or list(next(iter(raw_datasets["train"])).keys())
+    text_column_name = "text" if "text" in column_names else column_names[0]
+
+    # Each pass reads one source split and routes its documents to output splits
+    if "validation" in raw_datasets.keys():
+        passes = [("train", ["train"], lambda index: "train"), ("validation", ["val"], lambda index: "val")]
+    else:
+        passes = [
+            ("train", ["train", "val"], lambda index: "val" if index % 100 < val_split_percentage else "train"),
+        ]
+
+    settings = {
+        "dataset": dataset_path if dataset_path is not None else f"{dataset_name}/{dataset_config_name}",
+        "hf_tokenizer_name": hf_tokenizer_name,
+        "seq_len": sequence_length,
+        "val_split_percentage": val_split_percentage,
+    }
+    manifest_path = os.path.join(output_dir, _MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest["settings"] != settings:
+            raise ValueError(
+                f"{manifest_path} was written with {manifest['settings']}, not {settings}. "
+                "Use a new output_dir, or delete it to start over."
+            )
+    else:
+        manifest = {"settings": settings, "splits": {}}
+
+    with ProcessPoolExecutor(
+        max_workers=num_proc, initializer=_init_tokenize_worker, initargs=(hf_tokenizer_name,)
+    ) as executor:
+        for source_split, splits, route in passes:
+            for split in splits:
+                manifest["splits"].setdefault(
+                    split,
+                    {"documents_read": 0, "stream_state": None, "carry": [], "shards": [], "complete": False},
+                )
+            sharded_splits = {
+                split: _ShardedSplit(split, output_dir, manifest, vocab_size, sequence_length, shard_sequences)
+                for split in splits
+                if not manifest["splits"][split]["complete"]
+            }
+            if not sharded_splits:
+                logger.info(f"Skipping {', '.join(splits)}, complete in {manifest_path}")
+                continue
+
+            # Complete splits consume no documents, the others resume from their own position
+            positions = {split: float("inf") for split in splits}
+            positions.update({split: sharded.documents_read for split, sharded in sharded_splits.items()})
+            dataset = raw_datasets[source_split]
+            resume_from = min(sharded_splits.values(), key=lambda sharded: sharded.documents_read)
+            if resume_from.documents_read:
+                progress = ", ".join(
+                    f"{split} after {len(sharded.state['shards'])} shards" for split, sharded in sharded_splits.items()
+                )
+                logger.info(f"Resuming {source_split} at source document {resume_from.documents_read}, {progress}")
+                dataset.load_state_dict(resume_from.stream_state)
+
+            batches = _routed_batches(
+                dataset, resume_from.documents_read, text_column_name, route, positions, tokenize_batch_size
+            )
+            for split, documents_read, stream_state, tokens in _tokenize_in_order(executor, batches, 2 * num_proc):
+                sharded_splits[split].add(documents_read, stream_state, tokens)
+            for sharded in sharded_splits.values():
+                sharded.finish()
+
+
 if __name__ == "__main__":
-    tokenize_dataset(
-        dataset_name=args.dataset_name,
-        dataset_config_name=args.dataset_config_name,
-        dataset_path=args.dataset_path,
-        hf_tokenizer_name=args.hf_tokenizer_name,
-        output_dir=args.output_dir,
-        val_split_percentage=args.val_split_percentage,
-        sequence_length=args.seq_len,
-        num_proc=args.num_proc,
-    )
+    if args.streaming:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname).1s %(message)s")
+        tokenize_dataset_streaming(
+            dataset_name=args.dataset_name,
+            dataset_config_name=args.dataset_config_name,
+            dataset_path=args.dataset_path,
+            hf_tokenizer_name=args.hf_tokenizer_name,
+            output_dir=args.output_dir,
+            val_split_percentage=args.val_split_percentage,
+            sequence_length=args.seq_len,
+            num_proc=args.num_proc,
+            shard_sequences=args.shard_sequences,
+            tokenize_batch_size=args.tokenize_batch_size,
+        )
+    else:
+        tokenize_dataset(
+            dataset_name=args.dataset_name,
+            dataset_config_name=args.dataset_config_name,
+            dataset_path=args.dataset_path,
+            hf_tokenizer_name=args.hf_tokenizer_name,
+            output_dir=args.output_dir,
+            val_split_percentage=args.val_split_percentage,
+            sequence_length=args.seq_len,
+            num_proc=args.num_proc,
+        )
@@ -2,9 +2,12 @@
 
 import logging
 import os
+import queue
+import threading
 from typing import Any, Dict, Optional
 
 import numpy as np
+import torch
 import torch.distributed as dist
 
 _logger = None
@@ -42,6 +45,70 @@ def get_logger():
     return _logger
 
 
+class AsyncSummaryWriter:
+    """Wrap a TensorBoard SummaryWriter so that writes happen on a background thread.
+
+    Tensors are copied to the host without blocking, and the thread reads them after the copy finishes. So
+    logging a loss or grad norm tensor does not make the training loop wait for the GPU.
+    """
+
+    _STOP = object()
+
+    def __init__(self, writer, max_pending: int = 10000):
+        self.writer = writer
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="summary-writer")
+        self._thread.start()
+
+    @staticmethod
+    def _to_host(value):
+        if isinstance(value, dict):
+            return {key: AsyncSummaryWriter._to_host(item) for key, item in value.items()}
+        if isinstance(value, torch.Tensor):
+            return value.detach().to("cpu", non_blocking=True)
+        return value
+
+    def _submit(self, method, *args, **kwargs):
+        args = tuple(self._to_host(arg) for arg in args)
+        kwargs = {key: self._to_host(value) for key, value in kwargs.items()}
+        event = None
+        if torch.cuda.is_available():
+            event = torch.cuda.Event()
+            event.record()
+        self._queue.put((method, args, kwargs, event))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            method, args, kwargs, event = item
+            if event is not None:
+                event.synchronize()
+            try:
+                getattr(self.writer, method)(*args, **kwargs)
+            except Exception as error:  # pylint: disable=broad-except
+                _logger.warning("Failed to write %s to tensorboard: %s", method, error)
+
+    def add_scalar(self, *args, **kwargs):
+        self._submit("add_scalar", *args, **kwargs)
+
+    def add_scalars(self, *args, **kwargs):
+        self._submit("add_scalars", *args, **kwargs)
+
+    def add_histogram(self, *args, **kwargs):
+        self._submit("add_histogram", *args, **kwargs)
+
+    def add_text(self, *args, **kwargs):
+        self._submit("add_text", *args, **kwargs)
+
+    def close(self):
+        """Write everything queued and close the wrapped writer."""
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self.writer.close()
+
+
 def show_env_vars(rank: Optional[int] = 0):
     """Show env vars."""
     my_rank = dist.get_rank()
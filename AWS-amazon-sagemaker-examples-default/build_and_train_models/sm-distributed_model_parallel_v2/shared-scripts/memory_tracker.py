@@ -1,5 +1,6 @@
 """Memory tracker."""
 
+import atexit
 import os
 from typing import Any, Tuple
 
@@ -33,15 +34,31 @@ last_mem_usage = base_mem_usage
 _GB = 1024**3
 _FORMAT = "7.4f"
 
+# NVML device handles, NVML is initialized on first use and shut down at exit
+_nvml_handles = {}
+
+
+def _nvml_handle(local_rank: int):
+    if not _nvml_handles:
+        py3nvml.nvmlInit()
+        atexit.register(py3nvml.nvmlShutdown)
+    if local_rank not in _nvml_handles:
+        _nvml_handles[local_rank] = py3nvml.nvmlDeviceGetHandleByIndex(local_rank)
+    return _nvml_handles[local_rank]
+
 
 def memory_status(  # pylint: disable=too-many-locals
     tag: str = "",
     reset_max: bool = True,
-    sync: bool = True,
+    sync: bool = False,
     writers: Tuple[Any] = (),
     step: int = 0,
 ) -> Tuple[float]:
-    """Memory status gpu."""
+    """Memory status gpu.
+
+    The caching allocator counts memory when it is allocated, so its stats are current without `sync`.
+    Synchronizing only additionally waits for queued kernels, which stalls training.
+    """
     rank = dist.get_rank()
     local_rank = rank % torch.cuda.device_count()
 
@@ -52,9 +69,7 @@ def memory_status(  # pylint: disable=too-many-locals
         torch.cuda.synchronize()
 
     if py3nvml is not None:
-        py3nvml.nvmlInit()
-        handle = py3nvml.nvmlDeviceGetHandleByIndex(local_rank)
-        info = py3nvml.nvmlDeviceGetMemoryInfo(handle)
+        info = py3nvml.nvmlDeviceGetMemoryInfo(_nvml_handle(local_rank))
         total_used = info.used / _GB
         total_used_str = f"Totally used GPU memory: {total_used} GB."
     else:
@@ -77,9 +92,6 @@ def memory_status(  # pylint: disable=too-many-locals
     if reset_max:
         torch.cuda.reset_peak_memory_stats()
 
-    if py3nvml is not None:
-        py3nvml.nvmlShutdown()
-
     usage = {
         "allocated": alloced,
         "max_allocated": max_alloced,
@@ -0,0 +1,215 @@
+"""Sampled step profiler.
+
+Records per-phase timings of sampled training steps without synchronizing the GPU. Phases are bracketed by
+CUDA events, or by host timestamps without CUDA. Data wait is host time spent waiting for the next batch.
+Records go to a ring buffer. A background thread waits for their events, writes them to JSON lines and
+TensorBoard, and warns about dataloader starvation and host memory growth.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import psutil
+import torch
+from logging_utils import get_logger
+
+logger = get_logger()
+
+_GB = 1024**3
+
+
+class _StepRecord:
+    __slots__ = ("step", "data_wait", "step_time", "phases")
+
+    def __init__(self, step, data_wait):
+        self.step = step
+        self.data_wait = data_wait
+        self.step_time = None
+        # (name, start marker, end marker), a marker is a CUDA event or a host timestamp
+        self.phases = []
+
+
+class StepProfiler:
+    """Time the phases of every `sample_freq`-th step. Steps that are not sampled only cost a timestamp.
+
+    With `sample_freq` 0 the profiler is disabled and starts no thread.
+
+    Usage in a training loop, with `begin_phase`/`end_phase` pairs like NVTX ranges:
+
+        profiler.start_step(step)
+        profiler.begin_phase("forward")
+        ...
+        profiler.end_phase()
+        profiler.end_step()
+    """
+
+    def __init__(
+        self,
+        sample_freq: int,
+        output_dir=None,
+        writers=(),
+        rank: int = 0,
+        capacity: int = 1024,
+        flush_interval: float = 30.0,
+        starvation_threshold: float = 0.1,
+        memory_growth_alert_gb: float = 2.0,
+    ):
+        self.sample_freq = sample_freq
+        self.writers = writers
+        self.rank = rank
+        self.flush_interval = flush_interval
+        self.starvation_threshold = starvation_threshold
+        self.memory_growth_alert_gb = memory_growth_alert_gb
+        self.num_dropped = 0
+        self._use_cuda_events = torch.cuda.is_available()
+        # Appends and pops on a deque are thread safe, the oldest records are dropped if the flusher falls behind
+        self._records = deque(maxlen=capacity)
+        self._record = None
+        self._step_start = None
+        self._last_step_end = None
+        self._process = psutil.Process(os.getpid())
+        self._memory_baseline = None
+
+        self._file = None
+        self._thread = None
+        if sample_freq <= 0:
+            return
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            self._file = open(os.path.join(output_dir, f"step_profile_rank{rank:05d}.jsonl"), "a")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True, name="step-profiler")
+        self._thread.start()
+
+    def _marker(self):
+        if self._use_cuda_events:
+            event = torch.cuda.Event(enable_timing=True)
+            event.record()
+            return event
+        return time.perf_counter()
+
+    def start_step(self, step):
+        """Call when the batch of a step is available."""
+        now = time.perf_counter()
+        self._step_start = now
+        self._record = None
+        if self.sample_freq > 0 and step % self.sample_freq == 0:
+            data_wait = now - self._last_step_end if self._last_step_end is not None else None
+            self._record = _StepRecord(step, data_wait)
+
+    def begin_phase(self, name):
+        if self._record is not None:
+            self._record.phases.append((name, self._marker(), None))
+
+    def end_phase(self):
+        if self._record is not None:
+            name, start, _ = self._record.phases[-1]
+            self._record.phases[-1] = (name, start, self._marker())
+
+    def end_step(self):
+        """Call after all work of a step, so the time until the next `start_step` is data wait."""
+        self._last_step_end = time.perf_counter()
+        if self._record is not None:
+            self._record.step_time = self._last_step_end - self._step_start
+            if len(self._records) == self._records.maxlen:
+                self.num_dropped += 1
+            self._records.append(self._record)
+            self._record = None
+
+    @staticmethod
+    def _elapsed_ms(start, end):
+        if isinstance(start, float):
+            return (end - start) * 1000
+        # Only blocks this thread, until the GPU reaches the end of the phase
+        end.synchronize()
+        return start.elapsed_time(end)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as error:  # pylint: disable=broad-except
+                logger.warning("Step profiler flush failed: %s", error)
+
+    def flush(self):
+        """Write the recorded steps, and check for dataloader starvation and host memory growth."""
+        results = []
+        while self._records:
+            record = self._records.popleft()
+            phases_ms = {}
+            for name, start, end in record.phases:
+                if end is not None:
+                    phases_ms[name] = phases_ms.get(name, 0.0) + self._elapsed_ms(start, end)
+            results.append(
+                {
+                    "step": record.step,
+                    "data_wait_ms": record.data_wait * 1000 if record.data_wait is not None else None,
+                    "step_ms": record.step_time * 1000,
+                    "phases_ms": phases_ms,
+                }
+            )
+        if not results:
+            return
+
+        rss = self._process.memory_info().rss
+        for result in results:
+            result["host_rss_gb"] = rss / _GB
+            result["dropped"] = self.num_dropped
+        if self._file is not None:
+            self._file.write("".join(json.dumps(result) + "\n" for result in results))
+            self._file.flush()
+        for writer in self.writers:
+            for result in results:
+                times = dict(result["phases_ms"])
+                if result["data_wait_ms"] is not None:
+                    times["data_wait"] = result["data_wait_ms"]
+                times["step"] = result["step_ms"]
+                writer.add_scalars("StepProfile/time_ms", times, result["step"])
+            writer.add_scalar("StepProfile/host_rss_gb", rss / _GB, results[-1]["step"])
+
+        self._check_starvation(results)
+        self._check_memory_growth(rss, results[-1]["step"])
+
+    def _check_starvation(self, results):
+        waited = [result for result in results if result["data_wait_ms"] is not None]
+        if not waited:
+            return
+        data_wait = sum(result["data_wait_ms"] for result in waited)
+        total = data_wait + sum(result["step_ms"] for result in waited)
+        if total > 0 and data_wait / total > self.starvation_threshold:
+            logger.warning(
+                "Rank %d: dataloader starvation, waited for data %.1f%% of the time over %d sampled steps "
+                "up to step %d. Consider more dataloader workers or faster storage.",
+                self.rank,
+                100 * data_wait / total,
+                len(waited),
+                waited[-1]["step"],
+            )
+
+    def _check_memory_growth(self, rss, step):
+        if self._memory_baseline is None:
+            self._memory_baseline = rss
+            return
+        growth = (rss - self._memory_baseline) / _GB
+        if growth > self.memory_growth_alert_gb:
+            logger.warning(
+                "Rank %d: host memory grew by %.2f GB to %.2f GB RSS at step %d.",
+                self.rank,
+                growth,
+                rss / _GB,
+                step,
+            )
+            # Warn again only after further growth
+            self._memory_baseline = rss
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        if self._file is not None:
+            self._file.close()
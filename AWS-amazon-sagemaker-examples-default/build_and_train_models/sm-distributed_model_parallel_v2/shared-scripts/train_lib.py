@@ -2,6 +2,7 @@
 import datetime
 import functools
 import math
+import os
 import re
 import time
 from contextlib import nullcontext
@@ -18,6 +19,7 @@ from transformer_engine.common.recipe import Format, DelayedScaling
 
 import transformers
 from accelerate import init_empty_weights
+from checkpoint_storage import CheckpointDrainer
 from checkpoints import (
     _CHECKPOINT_DIR_REGEX,
     _DEFAULT_STATE_DICT_TYPE,
@@ -29,8 +31,10 @@ from checkpoints import (
     get_current_replication_group,
 )
 from data.pipelines import GPTDataPipeline, create_data_pipeline
+from data.pipelines.data_pipeline import rescale_resume_sequence_number
 from fsdp_utils import get_backward_fetch_policy, get_sharding_strategy, get_transformer_layer
 from logging_utils import (
+    AsyncSummaryWriter,
     create_args_table,
     get_logger,
     log_and_write_eval_metrics,
@@ -41,6 +45,7 @@ from logging_utils import (
 )
 from memory_tracker import memory_status, memory_status_cpu
 from packaging import version as pversion
+from step_profiler import StepProfiler
 from torch import optim
 from torch.distributed.elastic.multiprocessing.errors import record
 from torch.distributed.fsdp import FullyShardedDataParallel as FSDP
@@ -146,7 +151,7 @@ def get_batch_for_cp_rank(batch):
 
 def train_step(  # pylint: disable=too-many-arguments,too-many-branches,too-many-locals
     args, display_step: int, batch_idx: int, nvtx_warmup_iters,
-    data_pipeline, input_data, model, optimizer, lr_scheduler, writers, fp8_recipe
+    data_pipeline, input_data, model, optimizer, lr_scheduler, writers, fp8_recipe, step_profiler
 ):
     if batch_idx >= nvtx_warmup_iters:
         torch.cuda.nvtx.range_push(f"iteration{batch_idx}")
@@ -170,6 +175,7 @@ def train_step(  # pylint: disable=too-many-arguments,too-many-branches,too-many
 
     if batch_idx >= nvtx_warmup_iters:
         torch.cuda.nvtx.range_push("forward")
+    step_profiler.begin_phase("forward")
 
     # uses default causal mask
     if args.fp8==1 and args.use_smp_implementation==1:
@@ -178,6 +184,7 @@ def train_step(  # pylint: disable=too-many-arguments,too-many-branches,too-many
     else:
         loss = model(input_ids=input_ids, attention_mask=None, labels=labels)["loss"]
 
+    step_profiler.end_phase()
     if batch_idx >= nvtx_warmup_iters:
         # for forward
         torch.cuda.nvtx.range_pop()
@@ -188,9 +195,12 @@ def train_step(  # pylint: disable=too-many-arguments,too-many-branches,too-many
 
     if batch_idx >= nvtx_warmup_iters:
         torch.cuda.nvtx.range_push("backward")
+    step_profiler.begin_phase("backward")
 
     loss.backward()
 
+    step_profiler.end_phase()
+
     if batch_idx >= nvtx_warmup_iters:
         # for backward
         torch.cuda.nvtx.range_pop()
@@ -201,11 +211,14 @@ def train_step(  # pylint: disable=too-many-arguments,too-many-branches,too-many
 
     if batch_idx >= nvtx_warmup_iters:
         torch.cuda.nvtx.range_push("opt_step")
+    step_profiler.begin_phase("optimizer")
 
     grad_norm = clip_grad_norm_(model, args.grad_clip)
     optimizer.step()
     lr_scheduler.step()
 
+    step_profiler.end_phase()
+
     if batch_idx >= nvtx_warmup_iters:
         # for opt step
         torch.cuda.nvtx.range_pop()
@@ -247,6 +260,7 @@ def train(
     world_size,
     checkpointing_pg_metadata,
     fp8_recipe,
+    train_sampler_state=None,
 ):
     """Train."""
     if args.enable_memory_profiling > 0:
@@ -272,6 +286,10 @@ def train(
     # Set the same seed for computation
     set_seed(args.seed)
 
+    # Seek the sampler to the checkpointed position, also when the number of data parallel ranks changed
+    resume_from_sequence_number = rescale_resume_sequence_number(
+        train_sampler_state, resume_from_sequence_number, dp_size
+    )
     data_pipeline = create_data_pipeline(
         args, start_train_path_index, resume_from_sequence_number, val_resume_from_sequence_number, dp_rank, dp_size
     )
@@ -285,6 +303,22 @@ def train(
             async_calls = AsyncCallsQueue()
         except Exception:
             raise NotImplementedError("async_sharded checkpointing not supported")
+    checkpoint_drainer = None
+    if args.checkpoint_local_dir:
+        checkpoint_drainer = CheckpointDrainer(
+            os.path.join(args.checkpoint_local_dir, f"checkpoint_{global_rank}"),
+            args.checkpoint_dir[0],
+            num_kept_local_checkpoints=args.num_kept_local_checkpoints,
+            num_kept_checkpoints=args.num_kept_checkpoints[0],
+        )
+    step_profiler = StepProfiler(
+        args.step_profile_freq,
+        output_dir=args.step_profile_dir,
+        writers=writers,
+        rank=global_rank,
+        starvation_threshold=args.dataloader_starvation_threshold,
+        memory_growth_alert_gb=args.host_memory_growth_alert_gb,
+    )
 
 
 
@@ -302,6 +336,7 @@ def train(
         for batch_idx, input_data in enumerate(data_pipeline.train_dataloader):
             if total_steps >= args.max_steps:
                 break
+            step_profiler.start_step(total_steps)
 
             if args.profile_nsys > 0 and batch_idx == nvtx_warmup_iters:
                 torch.cuda.cudart().cudaProfilerStart()
@@ -318,6 +353,7 @@ def train(
                 lr_scheduler,
                 writers,
                 fp8_recipe,
+                step_profiler,
             )
             total_steps += 1
             cur_seq_index += batch_num_sequences
@@ -397,6 +433,7 @@ def train(
                     "start_train_path_index": save_train_path_index,
                     "resume_from_sequence_number": save_train_seq_index,
                     "val_resume_from_sequence_number": save_val_seq_index,
+                    "train_sampler_state": data_pipeline.sampler_state_dict(save_train_seq_index),
                 }
 
                 subdir = f"{args.model_type}-{total_steps}steps"
@@ -409,6 +446,7 @@ def train(
                 if args.enable_memory_profiling > 0:
                     msg = f"({_DEFAULT_STATE_DICT_TYPE})"
                     memory_status(tag=f"Before ckpt {msg}", writers=writers, step=display_step)
+                step_profiler.begin_phase("checkpoint")
                 save_checkpoint(
                     model,
                     optimizer,
@@ -423,13 +461,19 @@ def train(
                     expert_parallel_degree=int(tsm.state.expert_parallel_degree),
                     checkpoint_type=checkpoint_type,
                     async_calls=async_calls,
+                    checkpoint_drainer=checkpoint_drainer,
                 )
+                step_profiler.end_phase()
                 if args.enable_memory_profiling > 0:
                     msg = f"({_DEFAULT_STATE_DICT_TYPE})"
                     memory_status(tag=f"After ckpt {msg}", writers=writers, step=display_step)
 
+            step_profiler.end_step()
+
         if isinstance(data_pipeline, GPTDataPipeline):
             incremented_in_epoch = data_pipeline.increment_path_in_epoch()
+            # Sequence numbers are positions within the current file
+            cur_seq_index = 0
             if not incremented_in_epoch:
                 # path index set to 0
                 epoch += 1
@@ -445,6 +489,13 @@ def train(
         async_calls.maybe_finalize_async_calls(
             blocking=True, process_group=process_group
         )
+    # wait for the last checkpoint to reach checkpoint_dir
+    if checkpoint_drainer:
+        checkpoint_drainer.close()
+        dist.barrier()
+        if global_rank == 0:
+            checkpoint_drainer.limit_durable_checkpoints()
+    step_profiler.close()
 
 
     return total_steps
@@ -464,6 +515,8 @@ def main(args):
     )
     if len(set(ckpt_lens)) != 1:
         raise ValueError(f"Len mismtach for checkpoint dir, freq vs num to keep:  {ckpt_lens}.")
+    if args.checkpoint_local_dir and args.checkpoint_type not in ("sharded", "local"):
+        raise ValueError("checkpoint_local_dir is only supported with sharded and local checkpoint types.")
 
     if args.distributed_backend == "smddp":
         import smdistributed.dataparallel.torch.torch_smddp  # pylint: disable=unused-import
@@ -493,7 +546,8 @@ def main(args):
         from torch.utils.tensorboard import SummaryWriter
 
         logger.info("Writing metrics for tensorboard to %s.", args.tensorboard_dir)
-        writers = tuple(SummaryWriter(log_dir=tb_dir) for tb_dir in args.tensorboard_dir)
+        # Writes happen on a background thread, so logging does not stall training steps
+        writers = tuple(AsyncSummaryWriter(SummaryWriter(log_dir=tb_dir)) for tb_dir in args.tensorboard_dir)
         table_str = create_args_table(args.__dict__)
         for writer in writers:
             writer.add_text("Arguments", table_str)
@@ -740,6 +794,7 @@ def main(args):
             start_train_path_index,
             resume_from_sequence_number,
             val_resume_from_sequence_number,
+            train_sampler_state,
         ) = load_checkpoint(
             args,
             model,
@@ -760,6 +815,7 @@ def main(args):
         start_train_path_index = 0
         resume_from_sequence_number = 0
         val_resume_from_sequence_number = 0
+        train_sampler_state = None
 
     train_start_time = time.time()
     # total_steps, throughput, loss
@@ -780,6 +836,7 @@ def main(args):
         world_size,
         checkpointing_pg_metadata,
         fp8_recipe,
+        train_sampler_state=train_sampler_state,
     )
     time_now = time.time()
     total_sec = time_now - global_start_time
@@ -819,4 +876,7 @@ def main(args):
             train_sec, train_min, total_min
         )
 
+    for writer in writers:
+        writer.close()
+
     dist.destroy_process_group()
@@ -7,6 +7,11 @@ It creates realistic-looking equity order data for testing and development purpo
 
 Usage:
     python data_generator.py [--num_records NUM] [--output_file PATH]
+    python equity_orders_generator.py --num_records NUM --output_dir DIR [--format {csv,parquet}] [--seed SEED]
+        [--chunk_size NUM] [--workers NUM] [--partition_by COLUMN ...] [--as_of TIME]
+
+The single CSV mode only needs the standard library. The sharded mode (--output_dir) needs the
+packages of requirements.txt.
 """
 
 import argparse
@@ -17,7 +22,9 @@ import os
 import random
 import string
 import uuid
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any
+
+import shard_arguments
 
 # Configure logging
 logging.basicConfig(
@@ -129,6 +136,34 @@ def generate_equity_orders(num_records: int) -> List[Dict[str, Any]]:
     return [generate_equity_order() for _ in range(num_records)]
 
 
+def generate_order_chunk(rng: "np.random.Generator", seed: int, start: int, count: int,
+                         as_of: datetime.datetime) -> "pd.DataFrame":
+    """Generate a chunk of equity orders with vectorized columns for sharded output."""
+    import numpy as np
+    import pandas as pd
+
+    import shard_writer
+
+    order_type = shard_writer.random_choice(rng, ORDER_TYPES, count)
+    price = shard_writer.random_prices(rng, count)
+    stop_price = shard_writer.random_prices(rng, count)
+    # Prices only apply to some order types and are left empty (null) otherwise
+    return pd.DataFrame({
+        "order_id": shard_writer.random_uuids(rng, count),
+        "timestamp": shard_writer.random_timestamps(rng, count, as_of),
+        "account_id": shard_writer.random_choice(rng, shard_writer.account_id_pool(seed), count),
+        "security_id": shard_writer.random_choice(rng, STOCK_TICKERS, count),
+        "order_type": order_type,
+        "side": shard_writer.random_choice(rng, SIDES, count),
+        "quantity": shard_writer.random_quantities(rng, count),
+        "time_in_force": shard_writer.random_choice(rng, TIME_IN_FORCE, count),
+        "order_instructions": shard_writer.random_choice(rng, ORDER_INSTRUCTIONS, count),
+        "execution_instructions": shard_writer.random_choice(rng, EXECUTION_INSTRUCTIONS, count),
+        "price": np.where(np.isin(order_type, ["LIMIT", "STOP_LIMIT"]), price, np.nan),
+        "stop_price": np.where(np.isin(order_type, ["STOP", "STOP_LIMIT"]), stop_price, np.nan)
+    })
+
+
 def write_to_csv(orders: List[Dict[str, Any]], output_file: str) -> None:
     """Write orders to a CSV file."""
     try:
@@ -153,26 +188,33 @@ def write_to_csv(orders: List[Dict[str, Any]], output_file: str) -> None:
         raise
 
 
-def parse_arguments() -> Tuple[int, str]:
+def parse_arguments() -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Generate synthetic equity order data')
     parser.add_argument('--num_records', type=int, default=1000,
                         help='Number of records to generate (default: 1000)')
     parser.add_argument('--output_file', type=str, default='equity_orders.csv',
                         help='Output CSV file path (default: equity_orders.csv)')
+    shard_arguments.add_shard_arguments(parser)
     
-    args = parser.parse_args()
-    return args.num_records, args.output_file
+    return parser.parse_args()
 
 
 def main() -> None:
     """Main function to generate and save equity order data."""
     try:
-        num_records, output_file = parse_arguments()
+        args = parse_arguments()
         
-        logger.info(f"Starting equity order data generation: {num_records} records")
-        orders = generate_equity_orders(num_records)
-        write_to_csv(orders, output_file)
+        logger.info(f"Starting equity order data generation: {args.num_records} records")
+        if args.output_dir:
+            # The sharded mode needs numpy and pandas, the single CSV mode only the standard library
+            import shard_writer
+
+            shard_writer.write_shards(generate_order_chunk, args.num_records, args.output_dir, args.format, args.seed,
+                                      args.chunk_size, args.workers, args.partition_by, args.as_of)
+        else:
+            orders = generate_equity_orders(args.num_records)
+            write_to_csv(orders, args.output_file)
         logger.info("Data generation completed successfully")
         
     except Exception as e:
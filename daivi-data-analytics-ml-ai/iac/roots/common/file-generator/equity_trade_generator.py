@@ -7,6 +7,11 @@ It creates realistic-looking equity trade data for testing and development purpo
 
 Usage:
     python equity_trade_generator.py [--num_records NUM] [--output_file PATH]
+    python equity_trade_generator.py --num_records NUM --output_dir DIR [--format {csv,parquet}] [--seed SEED]
+        [--chunk_size NUM] [--workers NUM] [--partition_by COLUMN ...] [--as_of TIME]
+
+The single CSV mode only needs the standard library. The sharded mode (--output_dir) needs the
+packages of requirements.txt.
 """
 
 import argparse
@@ -17,7 +22,9 @@ import os
 import random
 import string
 import uuid
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any
+
+import shard_arguments
 
 # Configure logging
 logging.basicConfig(
@@ -112,6 +119,28 @@ def generate_equity_trades(num_records: int) -> List[Dict[str, Any]]:
     return [generate_equity_trade() for _ in range(num_records)]
 
 
+def generate_trade_chunk(rng: "np.random.Generator", seed: int, start: int, count: int,
+                         as_of: datetime.datetime) -> "pd.DataFrame":
+    """Generate a chunk of equity trades with vectorized columns for sharded output."""
+    import pandas as pd
+
+    import shard_writer
+
+    quantity = shard_writer.random_quantities(rng, count)
+    return pd.DataFrame({
+        "order_id": shard_writer.random_uuids(rng, count),
+        "trade_id": shard_writer.random_uuids(rng, count),
+        "account_id": shard_writer.random_choice(rng, shard_writer.account_id_pool(seed), count),
+        "security_id": shard_writer.random_choice(rng, STOCK_TICKERS, count),
+        "side": shard_writer.random_choice(rng, SIDES, count),
+        "quantity": quantity,
+        "price": shard_writer.random_prices(rng, count),
+        "execution_time": shard_writer.random_timestamps(rng, count, as_of),
+        "fee": quantity * 0.01,
+        "commission": quantity * 0.02
+    })
+
+
 def write_to_csv(trades: List[Dict[str, Any]], output_file: str) -> None:
     """Write trades to a CSV file."""
     try:
@@ -136,26 +165,33 @@ def write_to_csv(trades: List[Dict[str, Any]], output_file: str) -> None:
         raise
 
 
-def parse_arguments() -> Tuple[int, str]:
+def parse_arguments() -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Generate synthetic equity trade data')
     parser.add_argument('--num_records', type=int, default=10000,
                         help='Number of records to generate (default: 1000)')
     parser.add_argument('--output_file', type=str, default="../../../../data/equity_trades/equity_trades.csv",
                         help='Output CSV file path (default: equity_trades.csv)')
+    shard_arguments.add_shard_arguments(parser)
     
-    args = parser.parse_args()
-    return args.num_records, args.output_file
+    return parser.parse_args()
 
 
 def main() -> None:
     """Main function to generate and save equity trade data."""
     try:
-        num_records, output_file = parse_arguments()
+        args = parse_arguments()
         
-        logger.info(f"Starting equity trade data generation: {num_records} records")
-        trades = generate_equity_trades(num_records)
-        write_to_csv(trades, output_file)
+        logger.info(f"Starting equity trade data generation: {args.num_records} records")
+        if args.output_dir:
+            # The sharded mode needs numpy and pandas, the single CSV mode only the standard library
+            import shard_writer
+
+            shard_writer.write_shards(generate_trade_chunk, args.num_records, args.output_dir, args.format, args.seed,
+                                      args.chunk_size, args.workers, args.partition_by, args.as_of)
+        else:
+            trades = generate_equity_trades(args.num_records)
+            write_to_csv(trades, args.output_file)
         logger.info("Data generation completed successfully")
         
     except Exception as e:
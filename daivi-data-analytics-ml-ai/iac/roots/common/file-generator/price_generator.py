@@ -7,8 +7,16 @@ It creates realistic-looking opening price data for testing and development purp
 
 Usage:
     python opening_price_generator.py 
+    python price_generator.py --num_records NUM --output_dir DIR [--format {csv,parquet}] [--seed SEED]
+        [--chunk_size NUM] [--workers NUM] [--partition_by COLUMN ...] [--as_of TIME]
+
+The single CSV mode only needs the standard library. The sharded mode (--output_dir) needs the
+packages of requirements.txt.
+
+In sharded mode, rows cycle through the symbols, so the default number of records is one opening price per symbol.
 """
 
+import argparse
 import csv
 import datetime
 import logging
@@ -16,6 +24,8 @@ import os
 import random
 from typing import Dict, List, Any
 
+import shard_arguments
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -104,6 +114,40 @@ def generate_opening_prices() -> List[Dict[str, Any]]:
     return prices
 
 
+def generate_price_chunk(rng: "np.random.Generator", seed: int, start: int, count: int,
+                         as_of: datetime.datetime) -> "pd.DataFrame":
+    """Generate a chunk of opening prices with vectorized columns for sharded output."""
+    import numpy as np
+    import pandas as pd
+
+    import shard_writer
+
+    row_index = np.arange(start, start + count)
+    midnight = as_of.replace(hour=0, minute=0, second=0, microsecond=0)
+    # Nanoseconds since midnight of the reference time, made unique by the row index
+    timestamp = int((as_of - midnight).total_seconds()) * 1_000_000_000 + row_index
+    return pd.DataFrame({
+        "message_type": MESSAGE_TYPE,
+        "timestamp": timestamp.astype(str),
+        "symbol": np.asarray(SYMBOLS)[row_index % len(SYMBOLS)],
+        "market_center": shard_writer.random_choice(rng, MARKET_CENTERS, count),
+        "open_close_indicator": shard_writer.random_choice(rng, OPEN_CLOSE_INDICATORS, count),
+        "price": shard_writer.random_prices(rng, count)
+    })
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Generate synthetic opening price data')
+    parser.add_argument('--num_records', type=int, default=len(SYMBOLS),
+                        help=f'Number of records to generate in sharded mode (default: {len(SYMBOLS)})')
+    parser.add_argument('--output_file', type=str, default="../../../../data/price/price.csv",
+                        help='Output CSV file path (default: price.csv)')
+    shard_arguments.add_shard_arguments(parser)
+
+    return parser.parse_args()
+
+
 def write_to_csv(prices: List[Dict[str, Any]], output_file: str) -> None:
     """Write prices to a CSV file."""
     try:
@@ -131,10 +175,17 @@ def write_to_csv(prices: List[Dict[str, Any]], output_file: str) -> None:
 def main() -> None:
     """Main function to generate and save opening price data."""
     try:
-        output_file = "../../../../data/price/price.csv"
+        args = parse_arguments()
         
-        prices = generate_opening_prices()
-        write_to_csv(prices, output_file)
+        if args.output_dir:
+            # The sharded mode needs numpy and pandas, the single CSV mode only the standard library
+            import shard_writer
+
+            shard_writer.write_shards(generate_price_chunk, args.num_records, args.output_dir, args.format, args.seed,
+                                      args.chunk_size, args.workers, args.partition_by, args.as_of)
+        else:
+            prices = generate_opening_prices()
+            write_to_csv(prices, args.output_file)
         logger.info("Data generation completed successfully")
         
     except Exception as e:
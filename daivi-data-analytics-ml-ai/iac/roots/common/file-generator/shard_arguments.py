@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Sharded Output Arguments
+
+Command line arguments of the sharded output mode of the file generators. This module only
+uses the standard library, so the default single CSV mode runs without the packages of
+requirements.txt, which shard_writer needs.
+"""
+
+import argparse
+import os
+
+# Default reference time for generated timestamps, fixed so seeded runs are reproducible
+DEFAULT_AS_OF = "2025-01-01 00:00:00"
+DEFAULT_CHUNK_SIZE = 1_000_000
+FORMATS = ["csv", "parquet"]
+
+
+def add_shard_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the sharded output arguments to a generator's argument parser."""
+    parser.add_argument('--output_dir', type=str, default=None,
+                        help='Write seeded, chunked shards to this directory instead of a single CSV file '
+                             '(needs the packages of requirements.txt)')
+    parser.add_argument('--format', type=str, choices=FORMATS, default="parquet",
+                        help='Shard file format (default: parquet)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed for sharded output (default: 0)')
+    parser.add_argument('--chunk_size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Records per shard (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--partition_by', type=str, nargs='*', default=[],
+                        help='Columns to partition shards by, as column=value directories')
+    parser.add_argument('--as_of', type=str, default=DEFAULT_AS_OF,
+                        help=f'Reference time for generated timestamps (default: {DEFAULT_AS_OF})')
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Sharded Data Writer
+
+Shared helpers for the file generators to write large synthetic datasets as seeded,
+vectorized chunks. Each chunk is generated from its own random generator derived from
+the seed and the chunk index, and written to its own shard file, so chunks can be
+generated by any number of worker processes and the output is identical for a given
+seed, chunk size and reference time. Needs the packages of requirements.txt.
+
+Usage (from a generator script):
+    python equity_trade_generator.py --num_records 100000000 --output_dir trades --format parquet --seed 42
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from shard_arguments import DEFAULT_AS_OF, DEFAULT_CHUNK_SIZE, FORMATS
+
+logger = logging.getLogger(__name__)
+
+ChunkGenerator = Callable[[np.random.Generator, int, int, int, datetime.datetime], pd.DataFrame]
+
+
+def chunk_rng(seed: int, chunk_index: int) -> np.random.Generator:
+    """Return the random generator of a chunk, independent of which worker generates it."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+
+
+def random_choice(rng: np.random.Generator, values: List, size: int) -> np.ndarray:
+    """Draw `size` values uniformly from a list."""
+    return np.asarray(values)[rng.integers(0, len(values), size)]
+
+
+def random_uuids(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Generate `size` random version 4 UUID strings."""
+    raw = rng.integers(0, 256, (size, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # Version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    hex_chars = np.frombuffer(raw.tobytes().hex().encode('ascii'), dtype='S1').reshape(size, 32)
+    with_dashes = np.insert(hex_chars, [8, 12, 16, 20], b'-', axis=1)
+    return np.ascontiguousarray(with_dashes).view('S36').ravel().astype(str)
+
+
+def random_quantities(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Generate share quantities, 80% between 1 and 1000 and the rest between 1000 and 10000."""
+    small = rng.random(size) < 0.8
+    return np.where(small, rng.integers(1, 1001, size), rng.integers(1000, 10001, size))
+
+
+def random_prices(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Generate prices between $1 and $1000 with 2 decimal places."""
+    return np.round(rng.uniform(1.0, 1000.0, size), 2)
+
+
+def random_timestamps(rng: np.random.Generator, size: int, as_of: datetime.datetime) -> np.ndarray:
+    """Generate timestamp strings from the 24 hours before `as_of`, with millisecond precision."""
+    seconds = np.datetime64(as_of, 's') - rng.integers(0, 86401, size).astype('timedelta64[s]')
+    return np.char.replace(np.datetime_as_string(seconds.astype('datetime64[ms]'), unit='ms'), 'T', ' ')
+
+
+def account_id_pool(seed: int, size: int = 1000) -> np.ndarray:
+    """Generate the fixed pool of account IDs for a seed."""
+    digits = np.random.default_rng(np.random.SeedSequence(seed)).integers(0, 10**8, size)
+    return np.char.add("ACC-", np.char.zfill(digits.astype(str), 8))
+
+
+def parse_as_of(value: str) -> datetime.datetime:
+    """Parse the reference time argument."""
+    return datetime.datetime.fromisoformat(value)
+
+
+def _write_chunk(generate_chunk: ChunkGenerator, output_dir: str, file_format: str, partition_by: List[str],
+                 seed: int, as_of: datetime.datetime, chunk_index: int, start: int, count: int) -> int:
+    """Generate one chunk and write it as one shard file per partition. Returns the number of rows."""
+    df = generate_chunk(chunk_rng(seed, chunk_index), seed, start, count, as_of)
+    file_name = f"part-{chunk_index:05d}.{file_format}"
+    groups = df.groupby(partition_by, sort=True) if partition_by else [((), df)]
+    for keys, group in groups:
+        keys = keys if isinstance(keys, tuple) else (keys,)
+        directory = os.path.join(output_dir, *[f"{column}={value}" for column, value in zip(partition_by, keys)])
+        os.makedirs(directory, exist_ok=True)
+        group = group.drop(columns=partition_by)
+        if file_format == "parquet":
+            group.to_parquet(os.path.join(directory, file_name), index=False)
+        else:
+            group.to_csv(os.path.join(directory, file_name), index=False)
+    return len(df)
+
+
+def write_shards(generate_chunk: ChunkGenerator, num_records: int, output_dir: str, file_format: str = "parquet",
+                 seed: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: Optional[int] = None,
+                 partition_by: Optional[List[str]] = None, as_of: str = DEFAULT_AS_OF) -> None:
+    """Generate `num_records` rows in chunks on a process pool and write them as shard files.
+
+    Args:
+        generate_chunk: Module-level function returning the rows of a chunk as a DataFrame,
+            given the chunk's random generator, the seed, the first global row index, the row count and
+            the reference time
+        num_records: Total number of rows
+        output_dir: Directory of the shard files
+        file_format: "parquet" or "csv"
+        seed: Random seed
+        chunk_size: Rows per chunk and shard file
+        workers: Number of worker processes
+        partition_by: Columns to partition shard files by
+        as_of: Reference time for generated timestamps
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported format: {file_format}")
+    partition_by = partition_by or []
+    as_of_time = parse_as_of(as_of)
+    chunks = [(index, start, min(chunk_size, num_records - start))
+              for index, start in enumerate(range(0, num_records, chunk_size))]
+    logger.info(f"Writing {num_records} records as {len(chunks)} {file_format} shards to {output_dir} "
+                f"with seed {seed} and {workers or os.cpu_count()} workers")
+
+    os.makedirs(output_dir, exist_ok=True)
+    write_chunk = partial(_write_chunk, generate_chunk, output_dir, file_format, partition_by, seed, as_of_time)
+    start_time = time.time()
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(write_chunk, *chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            written += future.result()
+            logger.info(f"Wrote {written}/{num_records} records")
+
+    elapsed = time.time() - start_time
+    logger.info(f"Successfully wrote {written} records in {elapsed:.1f} seconds "
+                f"({written / elapsed if elapsed > 0 else 0:.0f} records/sec)")
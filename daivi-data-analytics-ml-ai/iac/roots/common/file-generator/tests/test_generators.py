@@ -0,0 +1,48 @@
+"""Tests of the file generators, run with `python -m pytest tests` from the file-generator directory."""
+
+import csv
+import os
+import subprocess
+import sys
+
+import pytest
+
+GENERATOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GENERATORS = ["equity_trade_generator.py", "equity_orders_generator.py", "price_generator.py"]
+
+# Runs a generator with numpy, pandas and pyarrow unavailable, like a plain Python installation
+WITHOUT_SHARD_PACKAGES = (
+    "import runpy, sys\n"
+    "sys.modules.update(numpy=None, pandas=None, pyarrow=None)\n"
+    "sys.argv = sys.argv[1:]\n"
+    "runpy.run_path(sys.argv[0], run_name='__main__')\n"
+)
+
+
+def run_generator(*args):
+    return subprocess.run([sys.executable, *args], cwd=GENERATOR_DIR, capture_output=True, text=True, check=True)
+
+
+@pytest.mark.parametrize("generator", GENERATORS)
+def test_csv_mode_needs_only_the_standard_library(generator, tmp_path):
+    output_file = tmp_path / "out.csv"
+    run_generator("-c", WITHOUT_SHARD_PACKAGES, generator, "--num_records", "25", "--output_file", str(output_file))
+    with open(output_file, newline="") as f:
+        rows = list(csv.DictReader(f))
+    # The price generator writes one opening price per symbol in CSV mode
+    assert len(rows) == 25 if generator != "price_generator.py" else rows
+
+
+@pytest.mark.parametrize("generator", GENERATORS)
+def test_sharded_mode_is_independent_of_the_number_of_workers(generator, tmp_path):
+    pytest.importorskip("numpy")
+    pytest.importorskip("pandas")
+    outputs = []
+    for workers in ["1", "3"]:
+        output_dir = tmp_path / f"workers-{workers}"
+        run_generator(generator, "--num_records", "1000", "--output_dir", str(output_dir), "--format", "csv",
+                      "--seed", "7", "--chunk_size", "300", "--workers", workers)
+        outputs.append({name: (output_dir / name).read_text() for name in sorted(os.listdir(output_dir))})
+    assert list(outputs[0]) == ["part-00000.csv", "part-00001.csv", "part-00002.csv", "part-00003.csv"]
+    assert outputs[0] == outputs[1]
+    assert sum(len(text.splitlines()) - 1 for text in outputs[0].values()) == 1000
@@ -47,6 +47,12 @@ except Exception as e:
     logger.error(f"Error getting required arguments: {str(e)}")
     raise Exception("This script requires workflow arguments. Use the standard billing.py script for direct processing.")
 
+# Optional arguments for the incremental merge mode
+OPTIONAL_ARGS = ['WRITE_MODE', 'MERGE_KEYS', 'WATERMARK_COLUMN', 'MERGE_PRUNE_COLUMN', 'COMPACT_AFTER_WRITE', 'COMPACT_PERIOD']
+optional_args_present = [name for name in OPTIONAL_ARGS if f"--{name}" in sys.argv]
+if optional_args_present:
+    args.update(getResolvedOptions(sys.argv, optional_args_present))
+
 TARGET_DATABASE_NAME = args.get("TARGET_DATABASE_NAME")
 CRAWLER_NAME = args.get("CRAWLER_NAME")
 BASE_ICEBERG_BUCKET = args.get("ICEBERG_BUCKET")
@@ -94,6 +100,25 @@ def get_sql_type(spark_type):
     # Default to STRING for types we don't explicitly handle
     return "STRING"
 
+# "append" appends every loaded row, "merge" upserts rows on MERGE_KEYS and skips files that were already processed
+WRITE_MODE = args.get("WRITE_MODE", "append").lower()
+if WRITE_MODE not in ("append", "merge"):
+    raise Exception(f"Unsupported WRITE_MODE {WRITE_MODE}, expected 'append' or 'merge'")
+MERGE_KEYS = [key.strip().lower() for key in args.get("MERGE_KEYS", "identity_line_item_id,identity_time_interval").split(',') if key.strip()]
+# Rows at or below the watermark of previous runs are skipped
+WATERMARK_COLUMN = args.get("WATERMARK_COLUMN", "").strip().lower() or None
+# Column whose value never changes for a key; MERGE and compaction only touch files overlapping the new rows' range
+MERGE_PRUNE_COLUMN = args.get("MERGE_PRUNE_COLUMN", "line_item_usage_start_date").strip().lower() or None
+COMPACT_AFTER_WRITE = args.get("COMPACT_AFTER_WRITE", "true").lower() == "true"
+# Compaction only rewrites periods before the one holding the newest row, which is still open and receives rows in later runs
+COMPACT_PERIOD = args.get("COMPACT_PERIOD", "month").strip().lower()
+if COMPACT_PERIOD not in ("year", "quarter", "month", "week", "day", "hour"):
+    raise Exception(f"Unsupported COMPACT_PERIOD {COMPACT_PERIOD}, expected year, quarter, month, week, day or hour")
+COMPACTION_MIN_INPUT_FILES = 5
+PROCESSED_FILES_TABLE_NAME = f"{ICEBERG_TABLE_NAME}_processed_files"
+logger.info(f"Write mode: {WRITE_MODE}, merge keys: {MERGE_KEYS}, watermark column: {WATERMARK_COLUMN}, "
+            f"prune column: {MERGE_PRUNE_COLUMN}")
+
 # Extract source file path from workflow events
 logger.info("=== Getting source file path from workflow properties ===")
 file_to_process = None  # Initialize to None, will be set from properties
@@ -243,7 +268,7 @@ def load_data_from_crawler_table(glueContext, database_name, table_name):
         
         # Convert to DataFrame for easier handling
         df = dynamic_frame.toDF()
-        logger.info(f"Successfully loaded data with {df.count()} rows using DynamicFrame")
+        logger.info("Successfully loaded data using DynamicFrame")
         return df
         
     except Exception as e:
@@ -261,7 +286,7 @@ def load_data_from_crawler_table(glueContext, database_name, table_name):
                 # Default to parquet
                 df = spark.read.format("parquet").load(file_to_process)
                 
-            logger.info(f"Successfully loaded {df.count()} rows directly from source file")
+            logger.info("Successfully loaded data directly from source file")
             return df
                 
         except Exception as src_e:
@@ -319,6 +344,102 @@ def reset_iceberg_table_if_needed(database_name, table_name, drop_existing=False
         logger.error(f"Error checking/dropping table: {str(e)}")
         return False
 
+def get_source_file_etag(file_path):
+    """
+    Return the ETag of the source file, which changes when a file is re-delivered with different content
+    """
+    bucket, key = file_path.replace("s3://", "", 1).split('/', 1)
+    return boto3.client('s3').head_object(Bucket=bucket, Key=key)['ETag'].strip('"')
+
+def ensure_processed_files_table():
+    """
+    Create the Iceberg table tracking the files (and watermark) processed in merge mode
+    """
+    spark.sql(f"""
+        CREATE TABLE IF NOT EXISTS {TARGET_DATABASE_NAME}.{PROCESSED_FILES_TABLE_NAME} (
+            file_path STRING,
+            etag STRING,
+            watermark STRING,
+            added_records BIGINT,
+            processed_at TIMESTAMP
+        ) USING iceberg
+        LOCATION '{ICEBERG_S3_PATH}_processed_files'
+    """)
+
+def is_file_processed(file_path, etag):
+    """
+    Check if this version of a file was already merged into the Iceberg table
+    """
+    processed = spark.table(f"{TARGET_DATABASE_NAME}.{PROCESSED_FILES_TABLE_NAME}")
+    return len(processed.filter((processed.file_path == file_path) & (processed.etag == etag)).take(1)) > 0
+
+def get_last_watermark():
+    """
+    Return the watermark recorded by the most recent run, or None
+    """
+    processed = spark.table(f"{TARGET_DATABASE_NAME}.{PROCESSED_FILES_TABLE_NAME}")
+    rows = processed.filter(processed.watermark.isNotNull()).orderBy(processed.processed_at.desc()).select("watermark").take(1)
+    return rows[0]["watermark"] if rows else None
+
+def record_processed_file(file_path, etag, watermark, added_records):
+    """
+    Record a merged file so re-deliveries of the same content are skipped
+    """
+    spark.createDataFrame(
+        [(file_path, etag, watermark, added_records, datetime.datetime.now(timezone.utc).replace(tzinfo=None))],
+        "file_path STRING, etag STRING, watermark STRING, added_records BIGINT, processed_at TIMESTAMP"
+    ).writeTo(f"{TARGET_DATABASE_NAME}.{PROCESSED_FILES_TABLE_NAME}").append()
+
+def get_last_snapshot_summary(database_name, table_name):
+    """
+    Return the summary of the latest Iceberg snapshot, which holds the added and deleted record counts
+    """
+    rows = spark.sql(f"SELECT summary FROM {database_name}.{table_name}.snapshots ORDER BY committed_at DESC LIMIT 1").collect()
+    return rows[0]["summary"] if rows else {}
+
+def merge_into_iceberg(df, database_name, table_name, keys, prune_range=None):
+    """
+    Upsert rows into the Iceberg table on the merge keys. Optionally limit the target scan to the
+    (column, min, max) range of the new rows, so the merge cost follows the new data instead of the table size
+    """
+    source_columns = [c.lower() for c in df.columns]
+    missing_keys = [key for key in keys if key not in source_columns]
+    if missing_keys:
+        raise Exception(f"Merge keys {missing_keys} are not columns of the source data")
+
+    # MERGE requires at most one source row per key
+    df.dropDuplicates(keys).createOrReplaceTempView("incremental_source")
+    conditions = [f"t.`{key}` <=> s.`{key}`" for key in keys]
+    if prune_range:
+        column, low, high, sql_type = prune_range
+        conditions.append(f"t.`{column}` BETWEEN CAST('{low}' AS {sql_type}) AND CAST('{high}' AS {sql_type})")
+    merge_sql = f"""
+        MERGE INTO {database_name}.{table_name} t
+        USING incremental_source s
+        ON {' AND '.join(conditions)}
+        WHEN MATCHED THEN UPDATE SET *
+        WHEN NOT MATCHED THEN INSERT *
+    """
+    logger.info(f"Merging with: {merge_sql}")
+    spark.sql(merge_sql)
+
+def compact_iceberg_table(database_name, table_name, where=None):
+    """
+    Rewrite small data files written by incremental runs, optionally only within a filter
+    """
+    catalog = spark.conf.get("spark.sql.defaultCatalog", "glue_catalog")
+    where_arg = f", where => \"{where}\"" if where else ""
+    try:
+        result = spark.sql(f"""
+            CALL {catalog}.system.rewrite_data_files(
+                table => '{database_name}.{table_name}',
+                options => map('min-input-files', '{COMPACTION_MIN_INPUT_FILES}'){where_arg}
+            )
+        """).collect()
+        logger.info(f"Compaction result: {result[0].asDict() if result else 'nothing to compact'}")
+    except Exception as e:
+        logger.warning(f"Compaction of {table_name} failed: {str(e)}")
+
 # Find the table created by the crawler - we don't need to start the crawler anymore
 # as it's handled by the workflow
 logger.info("===== Finding crawler-created table =====")
@@ -330,17 +451,26 @@ if not crawler_table:
 crawler_table_name = crawler_table['Name']
 logger.info(f"Found crawler-created table: {crawler_table_name}")
 
+file_etag = None
+if WRITE_MODE == "merge":
+    ensure_processed_files_table()
+    file_etag = get_source_file_etag(file_to_process)
+    if is_file_processed(file_to_process, file_etag):
+        logger.info(f"File {file_to_process} with ETag {file_etag} was already processed, skipping")
+        delete_crawler_created_table(TARGET_DATABASE_NAME, crawler_table_name)
+        job.commit()
+        logger.info("Job completed - skipped already processed file")
+        sys.exit(0)
+
 # Load data from the crawler-created table
 logger.info("===== Loading data from crawler table =====")
 try:
     # Get the source DataFrame
     source_df = load_data_from_crawler_table(glueContext, TARGET_DATABASE_NAME, crawler_table_name)
     
-    # Cache it to improve performance
-    source_df.cache()
-    row_count = source_df.count()
+    # Rows are counted from the Iceberg snapshot after writing instead of materializing the source here
     column_count = len(source_df.columns)
-    logger.info(f"Successfully loaded source data with {row_count} rows and {column_count} columns")
+    logger.info(f"Successfully loaded source data with {column_count} columns")
     
     # Print the schema for debugging
     logger.info("Source schema:")
@@ -427,12 +557,61 @@ if iceberg_exists:
     except Exception as e:
         logger.warning(f"Error getting target schema: {str(e)}")
 
+# In merge mode, drop rows at or below the last watermark and find the range of the new rows
+new_watermark = None
+prune_range = None
+compact_range = None
+compact_column = None
+if WRITE_MODE == "merge":
+    source_fields = {field.name.lower(): field for field in source_df.schema.fields}
+    if WATERMARK_COLUMN:
+        if WATERMARK_COLUMN not in source_fields:
+            raise Exception(f"Watermark column {WATERMARK_COLUMN} is not a column of the source data")
+        new_watermark = get_last_watermark()
+        if new_watermark is not None:
+            watermark_type = get_sql_type(source_fields[WATERMARK_COLUMN].dataType)
+            source_df = source_df.filter(f"`{WATERMARK_COLUMN}` > CAST('{new_watermark}' AS {watermark_type})")
+            logger.info(f"Keeping rows with {WATERMARK_COLUMN} after {new_watermark}")
+    aggregates = []
+    if WATERMARK_COLUMN:
+        aggregates.append(f"CAST(max(`{WATERMARK_COLUMN}`) AS STRING) AS max_watermark")
+    if MERGE_PRUNE_COLUMN and MERGE_PRUNE_COLUMN in source_fields:
+        aggregates += [f"CAST(min(`{MERGE_PRUNE_COLUMN}`) AS STRING) AS prune_min",
+                       f"CAST(max(`{MERGE_PRUNE_COLUMN}`) AS STRING) AS prune_max"]
+    elif MERGE_PRUNE_COLUMN:
+        logger.warning(f"Prune column {MERGE_PRUNE_COLUMN} is not a column of the source data, merging without pruning")
+    if COMPACT_AFTER_WRITE:
+        # Compaction is bounded by the prune column, or else the watermark column, to the closed periods of the new rows
+        compact_column = next((c for c in [MERGE_PRUNE_COLUMN, WATERMARK_COLUMN] if c and c in source_fields), None)
+    if compact_column:
+        open_period = f"date_trunc('{COMPACT_PERIOD}', max(`{compact_column}`))"
+        aggregates += [f"CAST(min(`{compact_column}`) AS STRING) AS compact_min",
+                       f"CAST({open_period} AS STRING) AS compact_open_period",
+                       f"CAST(min(`{compact_column}`) AS TIMESTAMP) < {open_period} AS compact_has_closed"]
+    if aggregates:
+        # One pass over the new rows only
+        stats = source_df.selectExpr(*aggregates).collect()[0].asDict()
+        if stats.get("max_watermark") is not None:
+            new_watermark = stats["max_watermark"]
+        if stats.get("prune_min") is not None:
+            prune_range = (MERGE_PRUNE_COLUMN, stats["prune_min"], stats["prune_max"],
+                           get_sql_type(source_fields[MERGE_PRUNE_COLUMN].dataType))
+            logger.info(f"New rows have {MERGE_PRUNE_COLUMN} between {prune_range[1]} and {prune_range[2]}")
+        if stats.get("compact_has_closed"):
+            compact_range = (compact_column, stats["compact_min"], stats["compact_open_period"],
+                             get_sql_type(source_fields[compact_column].dataType))
+
 # Create or update the custom Iceberg table for workflow
 logger.info("===== Working with custom Iceberg table =====")
 
 # Save as custom Iceberg table with schema evolution
 try:
-    if iceberg_exists and not drop_if_exists:
+    if iceberg_exists and not drop_if_exists and WRITE_MODE == "merge":
+        logger.info(f"Iceberg table {ICEBERG_TABLE_NAME} already exists, merging data on {MERGE_KEYS}")
+        merge_into_iceberg(source_df, TARGET_DATABASE_NAME, ICEBERG_TABLE_NAME, MERGE_KEYS, prune_range)
+        row_count = int(get_last_snapshot_summary(TARGET_DATABASE_NAME, ICEBERG_TABLE_NAME).get("added-records", 0))
+        logger.info(f"Successfully merged {row_count} added records into Iceberg table {ICEBERG_TABLE_NAME}")
+    elif iceberg_exists and not drop_if_exists:
         logger.info(f"Iceberg table {ICEBERG_TABLE_NAME} already exists, appending data")
         
         # For existing table, use append mode with schema merging enabled
@@ -444,6 +623,7 @@ try:
             .option("path", ICEBERG_S3_PATH) \
             .saveAsTable(f"{TARGET_DATABASE_NAME}.{ICEBERG_TABLE_NAME}")
         
+        row_count = int(get_last_snapshot_summary(TARGET_DATABASE_NAME, ICEBERG_TABLE_NAME).get("added-records", 0))
         logger.info(f"Successfully appended {row_count} rows to Iceberg table {ICEBERG_TABLE_NAME}")
     else:
         logger.info(f"Creating new Iceberg table {ICEBERG_TABLE_NAME}")
@@ -456,8 +636,23 @@ try:
             .option("path", ICEBERG_S3_PATH) \
             .saveAsTable(f"{TARGET_DATABASE_NAME}.{ICEBERG_TABLE_NAME}")
         
+        row_count = int(get_last_snapshot_summary(TARGET_DATABASE_NAME, ICEBERG_TABLE_NAME).get("added-records", 0))
         logger.info(f"Successfully created Iceberg table {ICEBERG_TABLE_NAME} with {row_count} rows")
     
+    if WRITE_MODE == "merge":
+        record_processed_file(file_to_process, file_etag, new_watermark, row_count)
+        if COMPACT_AFTER_WRITE:
+            logger.info("===== Compacting small files =====")
+            if compact_range:
+                compact_where = (f"{compact_range[0]} >= CAST('{compact_range[1]}' AS {compact_range[3]}) AND "
+                                 f"{compact_range[0]} < CAST('{compact_range[2]}' AS {compact_range[3]})")
+                compact_iceberg_table(TARGET_DATABASE_NAME, ICEBERG_TABLE_NAME, compact_where)
+            elif compact_column:
+                logger.info(f"New rows are all in the open {COMPACT_PERIOD} of {compact_column}, skipping compaction")
+            else:
+                logger.info("No prune or watermark column bounds the compaction, compacting the whole table")
+                compact_iceberg_table(TARGET_DATABASE_NAME, ICEBERG_TABLE_NAME)
+    
     # Clean up crawler table
     logger.info("===== Cleaning up =====")
     delete_success = delete_crawler_created_table(TARGET_DATABASE_NAME, crawler_table_name)
@@ -470,7 +665,8 @@ except Exception as e:
     logger.error(f"Error creating/updating Iceberg table: {str(e)}")
     
     # If it's a metadata-related error, try recreating the table
-    if ("metadata" in str(e).lower() or "incompatible" in str(e).lower()) and not drop_if_exists:
+    # Recreating keeps only this run's rows, so merge mode never does it
+    if ("metadata" in str(e).lower() or "incompatible" in str(e).lower()) and not drop_if_exists and WRITE_MODE != "merge":
         logger.warning(f"Detected issue: {str(e)}. Attempting to recreate the table...")
         try:
             # Drop the table to clear metadata
@@ -484,6 +680,7 @@ except Exception as e:
                 .option("path", ICEBERG_S3_PATH) \
                 .saveAsTable(f"{TARGET_DATABASE_NAME}.{ICEBERG_TABLE_NAME}")
                 
+            row_count = int(get_last_snapshot_summary(TARGET_DATABASE_NAME, ICEBERG_TABLE_NAME).get("added-records", 0))
             logger.info(f"Successfully recreated table after schema/metadata issue")
         except Exception as retry_error:
             logger.error(f"Failed to recreate table: {str(retry_error)}")
@@ -496,7 +693,7 @@ logger.info("\n===== Job Summary =====")
 logger.info(f"- Data source: {file_to_process}")
 logger.info(f"- Crawler-created table: {crawler_table_name}")
 logger.info(f"- Created/updated Iceberg table: {ICEBERG_TABLE_NAME} at {ICEBERG_S3_PATH}")
-logger.info(f"- Processed {row_count} rows with {column_count} columns")
+logger.info(f"- Processed {row_count} rows with {column_count} columns in {WRITE_MODE} mode")
 if missing_columns:
     logger.info(f"- Added missing columns: {', '.join(missing_columns)}")
 if columns_added:
@@ -2,6 +2,9 @@
 # SPDX-License-Identifier: MIT-0
 
 import sys
+import json
+import time
+import boto3
 from awsglue.transforms import *
 from awsglue.utils import getResolvedOptions
 from pyspark.context import SparkContext
@@ -9,6 +12,9 @@ from awsglue.context import GlueContext
 from awsglue.job import Job
 
 from pyspark.sql import DataFrame, Row
+import pyspark.sql.functions as F
+import pyspark.sql.types as T
+from pyspark import StorageLevel
 import datetime
 from awsglue import DynamicFrame
 
@@ -21,24 +27,92 @@ DATA_TABLE_NAME = args.get("DATA_TABLE_NAME")
 METADATA_DATABASE_NAME = args.get("METADATA_DATABASE_NAME")
 METADATA_TABLE_NAME = args.get("METADATA_TABLE_NAME")
 
+# Optional arguments
+OPTIONAL_ARGS = ['DEDUP_WATERMARK', 'METRICS_NAMESPACE']
+optional_args_present = [name for name in OPTIONAL_ARGS if f"--{name}" in sys.argv]
+if optional_args_present:
+    args.update(getResolvedOptions(sys.argv, optional_args_present))
+
 sc = SparkContext()
 glueContext = GlueContext(sc)
 spark = glueContext.spark_session
 job = Job(glueContext)
 job.init(args['JOB_NAME'], args)
 
+# Trades are deduplicated on this column within the watermark window, so redelivered Kafka records are written once
+TRADE_ID_COLUMN = "execution_id"
+EVENT_TIME_COLUMN = "__src_timestamp"
+DEDUP_WATERMARK = args.get("DEDUP_WATERMARK", "10 minutes")
+METRICS_NAMESPACE = args.get("METRICS_NAMESPACE")
+cloudwatch = boto3.client("cloudwatch") if METRICS_NAMESPACE else None
+
 # Script generated for node Apache Kafka
-dataframe_ApacheKafka_node1730958321534 = glueContext.create_data_frame.from_options(connection_type="kafka",connection_options={"connectionName": CONNECTION_NAME, "classification": "json", "startingOffsets": "earliest", "topicName": TOPIC_NAME, "inferSchema": "true", "typeOfData": "kafka", "failOnDataLoss": "false"}, transformation_ctx="dataframe_ApacheKafka_node1730958321534")
+dataframe_ApacheKafka_node1730958321534 = glueContext.create_data_frame.from_options(connection_type="kafka",connection_options={"connectionName": CONNECTION_NAME, "classification": "json", "startingOffsets": "earliest", "topicName": TOPIC_NAME, "inferSchema": "true", "typeOfData": "kafka", "failOnDataLoss": "false", "addRecordTimestamp": "true", "emitConsumerLagMetrics": "true"}, transformation_ctx="dataframe_ApacheKafka_node1730958321534")
+
+def with_event_time(data_frame):
+    """
+    Make the Kafka record timestamp an event time column usable as a watermark
+    """
+    if isinstance(data_frame.schema[EVENT_TIME_COLUMN].dataType, T.TimestampType):
+        return data_frame
+    # Record timestamps are epoch milliseconds
+    return data_frame.withColumn(EVENT_TIME_COLUMN, (data_frame[EVENT_TIME_COLUMN].cast("double") / 1000).cast("timestamp"))
+
+deduplicated_trades = with_event_time(dataframe_ApacheKafka_node1730958321534) \
+    .withWatermark(EVENT_TIME_COLUMN, DEDUP_WATERMARK) \
+    .dropDuplicatesWithinWatermark([TRADE_ID_COLUMN])
+
+def publish_batch_metrics(batchId, row_count, elapsed_seconds, lag_seconds):
+    """
+    Log per-batch throughput and lag, and publish them to CloudWatch when METRICS_NAMESPACE is set
+    """
+    metrics = {
+        "batch_id": batchId,
+        "rows": row_count,
+        "seconds": round(elapsed_seconds, 3),
+        "rows_per_second": round(row_count / elapsed_seconds, 1) if elapsed_seconds > 0 else 0,
+        "lag_seconds": round(lag_seconds, 3) if lag_seconds is not None else None
+    }
+    print(f"Batch metrics: {json.dumps(metrics)}")
+    if cloudwatch is None:
+        return
+    dimensions = [{"Name": "JobName", "Value": args["JOB_NAME"]}]
+    metric_data = [
+        {"MetricName": "BatchRows", "Dimensions": dimensions, "Value": row_count, "Unit": "Count"},
+        {"MetricName": "BatchRowsPerSecond", "Dimensions": dimensions, "Value": metrics["rows_per_second"], "Unit": "Count/Second"},
+        {"MetricName": "BatchProcessingTime", "Dimensions": dimensions, "Value": elapsed_seconds, "Unit": "Seconds"}
+    ]
+    if lag_seconds is not None:
+        metric_data.append({"MetricName": "BatchLag", "Dimensions": dimensions, "Value": lag_seconds, "Unit": "Seconds"})
+    try:
+        cloudwatch.put_metric_data(Namespace=METRICS_NAMESPACE, MetricData=metric_data)
+    except Exception as e:
+        print(f"Could not publish batch metrics: {str(e)}")
 
 def processBatch(data_frame, batchId):
-    if (data_frame.count() > 0):
-        ApacheKafka_node1730958321534 = DynamicFrame.fromDF(data_frame, glueContext, "from_data_frame")
+    start_time = time.time()
+    # Persist so the Kafka source is read once for the stats and both writes
+    data_frame.persist(StorageLevel.MEMORY_AND_DISK)
+    try:
+        stats = data_frame.agg(F.count(F.lit(1)).alias("rows"), F.max(EVENT_TIME_COLUMN).alias("latest")).collect()[0]
+        row_count = stats["rows"]
+        if row_count == 0:
+            return
+        trades = data_frame.drop(EVENT_TIME_COLUMN)
+
+        ApacheKafka_node1730958321534 = DynamicFrame.fromDF(trades, glueContext, "from_data_frame")
         # Script generated for node AWS Glue Data Catalog
         AWSGlueDataCatalog_node1730958324693 = glueContext.write_dynamic_frame.from_catalog(frame=ApacheKafka_node1730958321534, database=DATA_DATABASE_NAME, table_name=DATA_TABLE_NAME, transformation_ctx="AWSGlueDataCatalog_node1730958324693")
 
         # Script generated for node AWS Glue Data Catalog
-        AWSGlueDataCatalog_node1730958325901_df = ApacheKafka_node1730958321534.toDF()
-        AWSGlueDataCatalog_node1730958325901 = glueContext.write_data_frame.from_catalog(frame=AWSGlueDataCatalog_node1730958325901_df, database=METADATA_DATABASE_NAME, table_name=METADATA_TABLE_NAME, additional_options={})
+        AWSGlueDataCatalog_node1730958325901 = glueContext.write_data_frame.from_catalog(frame=trades, database=METADATA_DATABASE_NAME, table_name=METADATA_TABLE_NAME, additional_options={})
+
+        # Lag from the newest record of the batch reaching the topic until both targets are written
+        latest = stats["latest"]
+        lag_seconds = (datetime.datetime.now() - latest).total_seconds() if latest is not None else None
+        publish_batch_metrics(batchId, row_count, time.time() - start_time, lag_seconds)
+    finally:
+        data_frame.unpersist()
 
-glueContext.forEachBatch(frame = dataframe_ApacheKafka_node1730958321534, batch_function = processBatch, options = {"windowSize": "100 seconds", "checkpointLocation": args["TempDir"] + "/" + args["JOB_NAME"] + "/checkpoint/"})
+glueContext.forEachBatch(frame = deduplicated_trades, batch_function = processBatch, options = {"windowSize": "100 seconds", "checkpointLocation": args["TempDir"] + "/" + args["JOB_NAME"] + "/checkpoint/"})
 job.commit()
\ No newline at end of file
@@ -303,6 +303,7 @@ resource "aws_glue_job" "trade_job" {
     "--DATA_TABLE_NAME"                   = aws_glue_catalog_table.trade_table_hive.name
     "--METADATA_DATABASE_NAME"            = aws_glue_catalog_database.glue_database.name
     "--METADATA_TABLE_NAME"               = aws_glue_catalog_table.trade_table_iceberg.name
+    "--DEDUP_WATERMARK"                   = "10 minutes"
     "--TempDir"                           = var.GLUE_TEMP_BUCKET
     "--enable-continuous-cloudwatch-log"  = "true"
     "--enable-job-insights"               = "true"   
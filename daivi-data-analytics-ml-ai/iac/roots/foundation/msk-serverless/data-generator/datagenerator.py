@@ -1,8 +1,11 @@
 import logging
 from datetime import datetime
 from faker import Faker
+import itertools
+import numpy as np
 import random
 import string
+import time
 import uuid
 import os
 
@@ -352,6 +355,126 @@ def generate_timestamp() -> str:
     return str(nanoseconds)
 
 
+# Pre-generated value pools for batch generation
+SECURITY_POOL = np.array([''.join(c) for c in itertools.product(string.ascii_uppercase, repeat=3)])
+SYMBOL_POOL = np.array(SYMBOLS)
+MARKET_CENTER_POOL = np.array(MARKET_CENTERS)
+TRANSACTION_TYPES = np.array(['BUY', 'SELL'])
+TRANSACTION_EVENT_TYPES = np.array(['NEW', 'AMEND', 'CANCEL'])
+PAST_DATETIME_SECONDS = 30 * 24 * 60 * 60  # Same range as Faker's past_datetime()
+
+
+def get_intra_day_events(count, rng=None):
+    """Generate a batch of intra-day transaction events.
+
+    Every field is drawn for the whole batch at once from NumPy arrays and pre-generated
+    pools, with the same value ranges as get_intra_day_event().
+
+    Args:
+        count (int): Number of events to generate
+        rng (numpy.random.Generator): Random generator, one per worker thread or process
+
+    Returns:
+        list: Event dictionaries in the Event.to_dict() format
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    trade_quantity = rng.integers(0, 10**3, count)
+    transaction_type = rng.integers(0, 2, count)
+    multiplier = np.where(transaction_type == 0, 1, -1)
+    settle_amount = trade_quantity * rng.integers(10, 101, count) * multiplier
+    source_dataset_name = np.where(rng.integers(1, 11, count) == 1, "poison", "source_dataset_1")
+    now = int(time.time() * 10**6)
+    past = now - PAST_DATETIME_SECONDS * 10**6
+    trade_date = np.datetime_as_string(rng.integers(past, now, count).astype('datetime64[us]'))
+    settle_date = np.datetime_as_string(rng.integers(past, now, count).astype('datetime64[us]'))
+    # All events of a batch share their creation time
+    creation_time = datetime.now().isoformat()
+
+    columns = zip(
+        rng.integers(0, 10**5, count).astype(str).tolist(),
+        rng.integers(0, 10**10, count).astype(str).tolist(),
+        rng.integers(0, 10**6, count).astype(str).tolist(),
+        SECURITY_POOL[rng.integers(0, len(SECURITY_POOL), count)].tolist(),
+        TRANSACTION_TYPES[transaction_type].tolist(),
+        TRANSACTION_EVENT_TYPES[rng.integers(0, 3, count)].tolist(),
+        trade_date.tolist(),
+        settle_date.tolist(),
+        trade_quantity.astype(str).tolist(),
+        settle_amount.astype(str).tolist(),
+        source_dataset_name.tolist(),
+    )
+    return [
+        {
+            'version': "1.0",
+            'eventType': "TRANSACTION_RECORD",
+            'eventCreationTime': creation_time,
+            'sourceDatasetName': dataset,
+            'sourcePartition': "1",
+            'sourceOffset': "1",
+            'account': account,
+            'payloadType': "TransactionEventPayload",
+            'payload': {
+                'id': transaction_id,
+                'transactionSourceName': "TransactionSource1",
+                'sourceTransactionId': source_id,
+                'sourceTransactionEntryTime': creation_time,
+                'accountNumber': account,
+                'security': security,
+                'transactionType': transaction,
+                'transactionEventType': event_type,
+                'tradeDate': trade,
+                'settleDate': settle,
+                'settleCurrency': "USD",
+                'tradeQuantity': quantity,
+                'settleAmount': amount
+            }
+        }
+        for transaction_id, source_id, account, security, transaction, event_type, trade, settle, quantity, amount, dataset in columns
+    ]
+
+
+def get_trade_events(count, rng=None):
+    """Generate a batch of trade events.
+
+    Every field is drawn for the whole batch at once from NumPy arrays and pre-generated
+    pools, with the same value ranges as get_trade_event(). Timestamps increase by one
+    nanosecond per event so events of a batch stay distinct and ordered.
+
+    Args:
+        count (int): Number of events to generate
+        rng (numpy.random.Generator): Random generator, one per worker thread or process
+
+    Returns:
+        list: Trade dictionaries in the Trade.to_dict() format
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    columns = zip(
+        (int(generate_timestamp()) + np.arange(count)).astype(str).tolist(),
+        SYMBOL_POOL[rng.integers(0, len(SYMBOL_POOL), count)].tolist(),
+        MARKET_CENTER_POOL[rng.integers(0, len(MARKET_CENTER_POOL), count)].tolist(),
+        rng.integers(0, 10**12, count).astype(str).tolist(),
+        np.round(rng.uniform(1.0, 1000.0, count), 2).astype(str).tolist(),
+        rng.integers(0, 10**3, count).astype(str).tolist(),
+        rng.integers(0, 10**5, count).astype(str).tolist(),
+        rng.integers(0, 10**5, count).astype(str).tolist(),
+    )
+    return [
+        {
+            'message_type': "T",
+            'timestamp': ts,
+            'symbol': sy,
+            'market_center': mc,
+            'execution_id': e,
+            'last_price': lp,
+            'last_size': ls,
+            'cumulative_volume': cv,
+            'national_volume': sv,
+            'flags': "1"
+        }
+        for ts, sy, mc, e, lp, ls, cv, sv in columns
+    ]
+
+
 def main():
     """Main function for testing the module directly."""
     # Configure logging for direct execution
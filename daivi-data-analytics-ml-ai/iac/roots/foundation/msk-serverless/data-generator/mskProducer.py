@@ -5,8 +5,10 @@ import os
 import socket
 import time
 import traceback
-from multiprocessing import Process
-from threading import Thread
+from multiprocessing import Pipe, Process, current_process
+from threading import Thread, current_thread
+
+import numpy as np
 
 from aws_msk_iam_sasl_signer import MSKAuthTokenProvider
 from kafka import KafkaProducer
@@ -26,6 +28,16 @@ DEFAULT_EXECUTION = "threads"
 DEFAULT_TOPIC = "intraday-source-topic"
 DEFAULT_DURATION = 15
 DEFAULT_SLEEP = 1
+DEFAULT_BATCH_SIZE = 0        # Events generated per batch, 0 publishes one event at a time
+DEFAULT_RATE = 0              # Target events per second per worker in batch mode, 0 for unlimited
+DEFAULT_COMPRESSION = "gzip"  # gzip needs no extra libraries; lz4, snappy and zstd need their codec packages
+
+# Producer settings for batch mode
+BATCH_LINGER_MS = 20
+BATCH_MAX_BYTES = 512 * 1024
+BATCH_BUFFER_MEMORY = 64 * 1024 * 1024
+RATE_CHECKS_PER_SECOND = 10
+REPORT_INTERVAL_SECONDS = 10
 
 
 class MSKTokenProvider(AbstractTokenProvider):
@@ -58,16 +70,26 @@ def get_msk_bootstrap_servers(secret_name):
         raise
 
 
-def create_kafka_producer(bootstrap_servers, token_provider):
+def create_kafka_producer(bootstrap_servers, token_provider, batching=False, compression=DEFAULT_COMPRESSION):
     """Create a Kafka producer with the specified configuration.
     
     Args:
         bootstrap_servers: MSK bootstrap servers string
         token_provider: OAuth token provider for authentication
+        batching: Tune the producer for high-throughput batch publishing
+        compression: Compression codec for message batches
         
     Returns:
         KafkaProducer: Configured Kafka producer
     """
+    batch_settings = {}
+    if batching:
+        # Wait briefly to fill large batches instead of sending small requests as soon as possible
+        batch_settings = {
+            'linger_ms': BATCH_LINGER_MS,
+            'batch_size': BATCH_MAX_BYTES,
+            'buffer_memory': BATCH_BUFFER_MEMORY,
+        }
     return KafkaProducer(
         bootstrap_servers=bootstrap_servers,
         security_protocol='SASL_SSL',
@@ -79,7 +101,8 @@ def create_kafka_producer(bootstrap_servers, token_provider):
         retries=3,                    # Retry failed sends
         retry_backoff_ms=100,         # Backoff time between retries
         max_in_flight_requests_per_connection=1,  # Prevent message reordering on retries
-        compression_type='gzip'       # Compress messages for efficiency
+        compression_type=compression, # Compress messages for efficiency
+        **batch_settings
     )
 
 
@@ -93,9 +116,13 @@ def publish_events(topic, duration, producer, sleep, event_generator, key_extrac
         sleep: Sleep time between messages in seconds
         event_generator: Function to generate events
         key_extractor: Function to extract key from event
+
+    Returns:
+        dict: Worker throughput statistics
     """
     counter = 0
-    t_end = time.time() + 60 * duration
+    start_time = time.time()
+    t_end = start_time + 60 * duration
     logger.info(f"Publishing events to topic {topic} for {duration} minutes")
     
     try:
@@ -133,48 +160,173 @@ def publish_events(topic, duration, producer, sleep, event_generator, key_extrac
         # Ensure final flush before reporting
         producer.flush()
         logger.info(f"Total events produced: {counter}")
+    return report_throughput(counter, 0, time.time() - start_time)
 
 
-def publish_intraday_thread(topic, duration, producer, sleep):
+def publish_event_batches(topic, duration, producer, batch_generator, key_field, batch_size, rate):
+    """Publish events to Kafka in generated batches, optionally at a target rate.
+
+    Events are generated `batch_size` at a time and handed to the producer, which groups
+    them into large compressed requests. The producer is only flushed when publishing ends.
+
+    Args:
+        topic: Kafka topic to publish to
+        duration: Duration in minutes to run
+        producer: Kafka producer instance
+        batch_generator: Function generating a list of event dictionaries from a count and random generator
+        key_field: Event dictionary field used as the message key
+        batch_size: Number of events generated at a time
+        rate: Target events per second, 0 for unlimited
+
+    Returns:
+        dict: Worker throughput statistics
+    """
+    counter = 0
+    failed = 0
+    rng = np.random.default_rng()
+    start_time = time.time()
+    t_end = start_time + 60 * duration
+    next_report = start_time + REPORT_INTERVAL_SECONDS
+    # Generate smaller batches at low rates so pacing stays smooth
+    chunk = max(1, min(batch_size, int(rate / RATE_CHECKS_PER_SECOND))) if rate else batch_size
+    logger.info(f"Publishing event batches of {chunk} to topic {topic} for {duration} minutes at "
+                f"{f'{rate} events/sec' if rate else 'maximum rate'}")
+
+    def on_error(e):
+        nonlocal failed
+        failed += 1
+        logger.error(f"Message delivery failed: {e}")
+
+    try:
+        while time.time() < t_end:
+            for event_dict in batch_generator(chunk, rng):
+                producer.send(
+                    topic,
+                    event_dict,
+                    key=event_dict[key_field].encode(encoding='UTF-8')
+                ).add_errback(on_error)
+            counter += chunk
+
+            now = time.time()
+            if now >= next_report:
+                logger.info(f"Produced {counter} events at {counter / (now - start_time):.0f} events/sec")
+                next_report = now + REPORT_INTERVAL_SECONDS
+            if rate:
+                # Wait until the events sent so far are due at the target rate
+                delay = min(start_time + counter / rate, t_end) - now
+                if delay > 0:
+                    time.sleep(delay)
+
+    except Exception as e:
+        logger.error(f"Failed to send messages: {e}")
+        logger.debug(traceback.format_exc())
+    finally:
+        producer.flush()
+    return report_throughput(counter, failed, time.time() - start_time)
+
+
+def report_throughput(events, failed, seconds):
+    """Log and return the throughput statistics of a worker.
+
+    Args:
+        events: Number of events sent
+        failed: Number of events whose delivery failed
+        seconds: Publishing time in seconds
+
+    Returns:
+        dict: Worker throughput statistics
+    """
+    stats = {
+        "worker": current_worker_name(),
+        "events": events,
+        "failed": failed,
+        "seconds": round(seconds, 2),
+        "events_per_second": round(events / seconds, 1) if seconds > 0 else 0.0,
+    }
+    logger.info(f"Worker throughput: {stats}")
+    return stats
+
+
+def current_worker_name():
+    """Name of the worker thread, or of the worker process in process mode."""
+    process = current_process()
+    return process.name if process.name != "MainProcess" else current_thread().name
+
+
+def publish_intraday_thread(topic, duration, producer, sleep, batch_size=DEFAULT_BATCH_SIZE, rate=DEFAULT_RATE, results=None):
     """Thread function to publish intraday events."""
-    publish_events(
-        topic=topic,
-        duration=duration,
-        producer=producer,
-        sleep=sleep,
-        event_generator=datagenerator.get_intra_day_event,
-        key_extractor=lambda event: event.account
-    )
+    if batch_size:
+        stats = publish_event_batches(
+            topic=topic,
+            duration=duration,
+            producer=producer,
+            batch_generator=datagenerator.get_intra_day_events,
+            key_field='account',
+            batch_size=batch_size,
+            rate=rate
+        )
+    else:
+        stats = publish_events(
+            topic=topic,
+            duration=duration,
+            producer=producer,
+            sleep=sleep,
+            event_generator=datagenerator.get_intra_day_event,
+            key_extractor=lambda event: event.account
+        )
+    if results is not None:
+        results.append(stats)
+    return stats
 
 
-def publish_trade_thread(topic, duration, producer, sleep):
+def publish_trade_thread(topic, duration, producer, sleep, batch_size=DEFAULT_BATCH_SIZE, rate=DEFAULT_RATE, results=None):
     """Thread function to publish trade events."""
-    publish_events(
-        topic=topic,
-        duration=duration,
-        producer=producer,
-        sleep=sleep,
-        event_generator=datagenerator.get_trade_event,
-        key_extractor=lambda event: event.mc
-    )
+    if batch_size:
+        stats = publish_event_batches(
+            topic=topic,
+            duration=duration,
+            producer=producer,
+            batch_generator=datagenerator.get_trade_events,
+            key_field='market_center',
+            batch_size=batch_size,
+            rate=rate
+        )
+    else:
+        stats = publish_events(
+            topic=topic,
+            duration=duration,
+            producer=producer,
+            sleep=sleep,
+            event_generator=datagenerator.get_trade_event,
+            key_extractor=lambda event: event.mc
+        )
+    if results is not None:
+        results.append(stats)
+    return stats
 
 
-def publish_intraday_process(topic, duration, bootstrap_servers, token_provider, sleep):
+def publish_intraday_process(topic, duration, bootstrap_servers, token_provider, sleep,
+                             batch_size=DEFAULT_BATCH_SIZE, rate=DEFAULT_RATE, compression=DEFAULT_COMPRESSION, results=None):
     """Process function to publish intraday events."""
-    producer = create_kafka_producer(bootstrap_servers, token_provider)
+    producer = create_kafka_producer(bootstrap_servers, token_provider, bool(batch_size), compression)
     try:
-        publish_intraday_thread(topic, duration, producer, sleep)
+        stats = publish_intraday_thread(topic, duration, producer, sleep, batch_size, rate)
     finally:
         producer.close()
+    if results is not None:
+        results.send(stats)
 
 
-def publish_trade_process(topic, duration, bootstrap_servers, token_provider, sleep):
+def publish_trade_process(topic, duration, bootstrap_servers, token_provider, sleep,
+                          batch_size=DEFAULT_BATCH_SIZE, rate=DEFAULT_RATE, compression=DEFAULT_COMPRESSION, results=None):
     """Process function to publish trade events."""
-    producer = create_kafka_producer(bootstrap_servers, token_provider)
+    producer = create_kafka_producer(bootstrap_servers, token_provider, bool(batch_size), compression)
     try:
-        publish_trade_thread(topic, duration, producer, sleep)
+        stats = publish_trade_thread(topic, duration, producer, sleep, batch_size, rate)
     finally:
         producer.close()
+    if results is not None:
+        results.send(stats)
 
 
 def get_cluster_arn():
@@ -203,7 +355,7 @@ def parse_event_parameters(event):
         event: Lambda event object
         
     Returns:
-        tuple: (topic, duration, parallel, execution, sleep)
+        tuple: (topic, duration, parallel, execution, sleep, batch_size, rate, compression)
     """
     # Default values
     topic = DEFAULT_TOPIC
@@ -211,6 +363,9 @@ def parse_event_parameters(event):
     parallel = DEFAULT_PARALLEL
     execution = DEFAULT_EXECUTION
     sleep = DEFAULT_SLEEP
+    batch_size = DEFAULT_BATCH_SIZE
+    rate = DEFAULT_RATE
+    compression = DEFAULT_COMPRESSION
 
     # Try to parse parameters from event body
     input_body = event.get("body", {})
@@ -226,11 +381,15 @@ def parse_event_parameters(event):
             parallel = json_param.get("parallel", parallel)
             execution = json_param.get("execution", execution)
             sleep = json_param.get("sleep", sleep)
+            batch_size = json_param.get("batch_size", batch_size)
+            rate = json_param.get("rate", rate)
+            compression = json_param.get("compression", compression)
         except json.JSONDecodeError as e:
             logger.warning(f"Failed to parse event body as JSON: {e}")
     
-    logger.info(f"Using parameters: topic={topic}, duration={duration}, parallel={parallel}, execution={execution}, sleep={sleep}")
-    return topic, duration, parallel, execution, sleep
+    logger.info(f"Using parameters: topic={topic}, duration={duration}, parallel={parallel}, execution={execution}, sleep={sleep}, "
+                f"batch_size={batch_size}, rate={rate}, compression={compression}")
+    return topic, duration, parallel, execution, sleep, batch_size, rate, compression
 
 
 def lambda_handler(event, context):
@@ -251,7 +410,7 @@ def lambda_handler(event, context):
         cluster_arn = get_cluster_arn()
         
         # Parse parameters from event
-        topic, duration, parallel, execution, sleep = parse_event_parameters(event)
+        topic, duration, parallel, execution, sleep, batch_size, rate, compression = parse_event_parameters(event)
         
         # Get bootstrap servers
         msk_endpoint_secret_name = os.environ['GLOBAL_MSK_ENDPOINT']
@@ -264,43 +423,56 @@ def lambda_handler(event, context):
         # Create producer for thread mode
         producer = None
         if execution == "threads":
-            producer = create_kafka_producer(msk_bootstrap_servers, token_provider)
+            producer = create_kafka_producer(msk_bootstrap_servers, token_provider, bool(batch_size), compression)
         
-        # Start workers
+        # Start workers; threads append their throughput statistics, processes send them over a pipe
         workers = []
+        worker_stats = []
+        stats_pipes = []
         for i in range(parallel):
+            if execution != "threads":
+                receiver, sender = Pipe(duplex=False)
+                stats_pipes.append(receiver)
             if topic == "intraday-source-topic":
                 if execution == "threads":
                     worker = Thread(
                         target=publish_intraday_thread, 
-                        args=(topic, duration, producer, sleep),
+                        args=(topic, duration, producer, sleep, batch_size, rate, worker_stats),
                         name=f"intraday-thread-{i}"
                     )
                 else:
                     worker = Process(
                         target=publish_intraday_process, 
-                        args=(topic, duration, msk_bootstrap_servers, token_provider, sleep),
+                        args=(topic, duration, msk_bootstrap_servers, token_provider, sleep, batch_size, rate, compression, sender),
                         name=f"intraday-process-{i}"
                     )
             else:
                 if execution == "threads":
                     worker = Thread(
                         target=publish_trade_thread, 
-                        args=(topic, duration, producer, sleep),
+                        args=(topic, duration, producer, sleep, batch_size, rate, worker_stats),
                         name=f"trade-thread-{i}"
                     )
                 else:
                     worker = Process(
                         target=publish_trade_process, 
-                        args=(topic, duration, msk_bootstrap_servers, token_provider, sleep),
+                        args=(topic, duration, msk_bootstrap_servers, token_provider, sleep, batch_size, rate, compression, sender),
                         name=f"trade-process-{i}"
                     )
             
             workers.append(worker)
             worker.start()
+            if execution != "threads":
+                # Only the worker keeps the sending end, so recv() fails instead of blocking if it dies
+                sender.close()
             logger.debug(f"Started worker {i+1}/{parallel}: {worker.name}")
         
         # Wait for all workers to complete
+        for receiver in stats_pipes:
+            try:
+                worker_stats.append(receiver.recv())
+            except EOFError:
+                logger.warning("A worker process exited without reporting statistics")
         for worker in workers:
             worker.join()
         
@@ -309,7 +481,10 @@ def lambda_handler(event, context):
             producer.close()
         
         execution_time = time.time() - start_time
-        logger.info(f"Lambda execution completed successfully in {execution_time:.2f} seconds")
+        total_events = sum(stats["events"] for stats in worker_stats)
+        events_per_second = round(sum(stats["events_per_second"] for stats in worker_stats), 1)
+        logger.info(f"Lambda execution completed successfully in {execution_time:.2f} seconds, "
+                    f"{total_events} events at {events_per_second} events/sec")
         
         return {
             "statusCode": 200,
@@ -317,7 +492,12 @@ def lambda_handler(event, context):
                 "message": f"Successfully published events to topic {topic}",
                 "workers": parallel,
                 "execution_mode": execution,
-                "duration_minutes": duration
+                "duration_minutes": duration,
+                "batch_size": batch_size,
+                "rate": rate,
+                "total_events": total_events,
+                "events_per_second": events_per_second,
+                "worker_stats": worker_stats
             })
         }
         
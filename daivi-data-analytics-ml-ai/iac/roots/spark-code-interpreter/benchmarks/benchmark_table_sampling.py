@@ -0,0 +1,134 @@
+"""Benchmark schema sampling of uploaded CSV and Excel files.
+
+Compares the ranged S3 reads of parse_csv_from_s3 and table_parser_openpyxl with the
+whole-object downloads they replaced, on generated fixtures served by an in-memory S3
+stand-in. For each case it prints the run time, the bytes fetched, the GET requests and
+the peak Python memory, and checks that the old and new sample are identical. Memory
+tracing slows both variants down, so compare times relative to each other.
+
+Run it from the streamlit-app directory, which holds config.json and pricing.json like the app:
+
+    python ../benchmarks/benchmark_table_sampling.py --rows 400000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+import chardet
+import pandas as pd
+from botocore.exceptions import ClientError
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'streamlit-app'))
+import function_calling_utils as fcu
+
+BENCHMARK_BUCKET = "benchmark-bucket"
+
+
+class InMemoryS3:
+    """Serves objects from memory with the S3 client calls used for sampling, and counts what is fetched"""
+    def __init__(self):
+        self.objects = {}
+        self.bytes_fetched = 0
+        self.requests = 0
+
+    def head_object(self, Bucket, Key):
+        return {'ContentLength': len(self.objects[Key])}
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self.objects[Key]
+        self.requests += 1
+        if Range is None:
+            self.bytes_fetched += len(data)
+            return {'Body': io.BytesIO(data)}
+        start, end = map(int, Range[len("bytes="):].split('-'))
+        if start >= len(data):
+            raise ClientError({'Error': {'Code': 'InvalidRange'}}, 'GetObject')
+        part = data[start:end + 1]
+        self.bytes_fetched += len(part)
+        return {'Body': io.BytesIO(part), 'ContentRange': f"bytes {start}-{start + len(part) - 1}/{len(data)}"}
+
+
+def full_read_csv(s3, key, nrows=fcu.SCHEMA_SAMPLE_ROWS):
+    """CSV sampling before ranged reads: the object is downloaded twice, for chardet and to decode it"""
+    content = s3.get_object(Bucket=BENCHMARK_BUCKET, Key=key)['Body'].read()
+    encoding = chardet.detect(content)['encoding']
+    content = s3.get_object(Bucket=BENCHMARK_BUCKET, Key=key)['Body'].read().decode(encoding)
+    df = pd.read_csv(io.StringIO(content), delimiter=None, engine='python').iloc[:nrows]
+    return df.to_csv(index=False)
+
+
+def full_read_xlsx(s3, key, nrows=fcu.SCHEMA_SAMPLE_ROWS):
+    """Excel sampling before ranged reads: the workbook is downloaded and every row of every sheet parsed"""
+    xlsx_buffer = io.BytesIO(s3.get_object(Bucket=BENCHMARK_BUCKET, Key=key)['Body'].read())
+    wb = pd.read_excel(xlsx_buffer, sheet_name=None, header=None)
+    all_sheets_string = ""
+    for sheet_name, sheet_data in wb.items():
+        df = pd.DataFrame(sheet_data)
+        all_sheets_string += f'<SHEET NAME:{sheet_name}>\n{df.iloc[:nrows].to_csv(index=False, header=False)}\n</{sheet_name}>\n'
+    return all_sheets_string
+
+
+def csv_fixture(rows):
+    """A UTF-8 CSV with non-ASCII text, quoted delimiters and multi-line fields"""
+    lines = ['id,name,city,amount,note']
+    lines += [f'{i},Zoë {i},"São Paulo, BR",{i * 1.5},"multi\nline {i}"' for i in range(rows)]
+    return '\n'.join(lines).encode('utf-8')
+
+
+def xlsx_fixture(rows):
+    """A workbook with two sheets of rows and rows / 2 rows"""
+    wb = Workbook()
+    trades = wb.active
+    trades.title = 'Trades'
+    for i in range(rows):
+        trades.append([i, f'name {i}', i * 2.5, 'x' * 20])
+    prices = wb.create_sheet('Prices')
+    for i in range(rows // 2):
+        prices.append([f'2024-01-{i % 28 + 1:02d}', i, i / 3])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def run(s3, name, fn, *args):
+    s3.bytes_fetched = 0
+    s3.requests = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    output = fn(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:28s} {elapsed * 1e3:10.1f} ms  fetched {s3.bytes_fetched / 1e6:8.2f} MB "
+          f"in {s3.requests:3d} GETs  peak {peak / 1e6:8.1f} MB")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=400000, help='CSV rows, the workbook gets rows / 4 and rows / 8')
+    args = parser.parse_args()
+
+    s3 = InMemoryS3()
+    fcu.S3 = s3
+
+    s3.objects['sample.csv'] = csv_fixture(args.rows)
+    print(f"CSV fixture: {len(s3.objects['sample.csv']) / 1e6:.1f} MB")
+    before = run(s3, 'csv whole object (before)', full_read_csv, s3, 'sample.csv')
+    after = run(s3, 'csv ranged sample (after)', fcu.parse_csv_from_s3, f"s3://{BENCHMARK_BUCKET}/sample.csv")
+    assert before == after, "CSV samples differ"
+
+    s3.objects['sample.xlsx'] = xlsx_fixture(args.rows // 4)
+    print(f"XLSX fixture: {len(s3.objects['sample.xlsx']) / 1e6:.1f} MB")
+    before = run(s3, 'xlsx whole object (before)', full_read_xlsx, s3, 'sample.xlsx')
+    after = run(s3, 'xlsx ranged sample (after)', fcu.table_parser_openpyxl, f"s3://{BENCHMARK_BUCKET}/sample.xlsx")
+    assert before == after, "Excel samples differ"
+    print("Samples are identical")
+
+
+if __name__ == '__main__':
+    main()
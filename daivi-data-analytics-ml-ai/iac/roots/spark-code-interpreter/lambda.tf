@@ -72,7 +72,8 @@ resource "aws_lambda_function" "spark_code_interpreter" {
   # Environment variables for Spark configuration
   environment {
     variables = {
-      LOG_LEVEL = "INFO"
+      LOG_LEVEL            = "INFO"
+      SPARK_EXECUTION_MODE = "warm"
     }
   }
 
@@ -9,6 +9,11 @@ import re
 import tempfile
 import logging
 import sys
+import builtins
+import threading
+import time
+import select
+from contextlib import contextmanager
 
 # Configure logging
 logging.basicConfig(
@@ -23,6 +28,42 @@ logger = logging.getLogger("spark-lambda")
 # Ensure all child loggers also log to CloudWatch
 logging.getLogger().setLevel(logging.INFO)  # Set root logger to INFO level
 
+# "warm" keeps a SparkSession alive in a worker process across invocations of a warm container,
+# "spark-submit" starts a new spark-submit (and JVM) for every code snippet
+SPARK_EXECUTION_MODE = os.getenv('SPARK_EXECUTION_MODE', 'warm')
+WARM_WORKER_FLAG = '--warm-worker'
+WARM_CODE_FILENAME = '<spark-code>'
+WARM_END_MARKER = '__SPARK_WARM_WORKER_END__'
+WARM_OUTPUT_DRAIN_TIMEOUT = 5
+# Time kept back from the Lambda deadline to kill the warm worker, upload the outputs and respond
+WARM_DEADLINE_MARGIN_SECONDS = 15
+
+SPARK_CONFS = {
+    "spark.driver.extraJavaOptions": "-Dlog4j.configuration=file:/opt/spark/conf/log4j.properties",
+    "spark.executor.extraJavaOptions": "-Dlog4j.configuration=file:/opt/spark/conf/log4j.properties",
+    # Add S3A filesystem configurations
+    "spark.hadoop.fs.s3a.impl": "org.apache.hadoop.fs.s3a.S3AFileSystem",
+    "spark.hadoop.fs.s3a.aws.credentials.provider": "com.amazonaws.auth.DefaultAWSCredentialsProviderChain",
+    # Fix for IOStatisticsBinding issue
+    "spark.hadoop.fs.s3a.experimental.input.fadvise": "sequential",
+    "spark.hadoop.fs.s3a.connection.maximum": "100",
+    "spark.hadoop.fs.s3a.impl.disable.cache": "true",
+    "spark.hadoop.fs.s3a.path.style.access": "true",
+    "spark.hadoop.fs.s3a.committer.name": "directory",
+    "spark.hadoop.fs.s3a.committer.staging.conflict-mode": "append",
+    "spark.hadoop.fs.s3a.committer.staging.unique-filenames": "true",
+    "spark.hadoop.fs.s3a.fast.upload": "true",
+    "spark.hadoop.mapreduce.fileoutputcommitter.algorithm.version": "2",
+    # Additional configurations to fix IOStatisticsBinding error
+    "spark.driver.extraClassPath": "/opt/spark/jars/*",
+    "spark.executor.extraClassPath": "/opt/spark/jars/*",
+    "spark.hadoop.fs.s3a.bucket.all.committer.magic.enabled": "true",
+    "spark.hadoop.fs.s3a.attempts.maximum": "20",
+    "spark.hadoop.fs.s3a.connection.establish.timeout": "5000",
+    "spark.hadoop.fs.s3a.connection.timeout": "200000",
+    "spark.hadoop.fs.s3a.threads.max": "20",
+}
+
 class CodeExecutionError(Exception):
     pass
 
@@ -37,32 +78,9 @@ def local_code_executy(code_string, spark_configs):
     output_file_path = '/tmp/output.json'
     log_file_path = '/tmp/spark_log.txt'
 
-    spark_submit_args = [
-        "spark-submit",
-        "--conf", "spark.driver.extraJavaOptions=-Dlog4j.configuration=file:/opt/spark/conf/log4j.properties",
-        "--conf", "spark.executor.extraJavaOptions=-Dlog4j.configuration=file:/opt/spark/conf/log4j.properties",
-        # Add S3A filesystem configurations
-        "--conf", "spark.hadoop.fs.s3a.impl=org.apache.hadoop.fs.s3a.S3AFileSystem",
-        "--conf", "spark.hadoop.fs.s3a.aws.credentials.provider=com.amazonaws.auth.DefaultAWSCredentialsProviderChain",
-        # Fix for IOStatisticsBinding issue
-        "--conf", "spark.hadoop.fs.s3a.experimental.input.fadvise=sequential",
-        "--conf", "spark.hadoop.fs.s3a.connection.maximum=100",
-        "--conf", "spark.hadoop.fs.s3a.impl.disable.cache=true",
-        "--conf", "spark.hadoop.fs.s3a.path.style.access=true",
-        "--conf", "spark.hadoop.fs.s3a.committer.name=directory",
-        "--conf", "spark.hadoop.fs.s3a.committer.staging.conflict-mode=append",
-        "--conf", "spark.hadoop.fs.s3a.committer.staging.unique-filenames=true",
-        "--conf", "spark.hadoop.fs.s3a.fast.upload=true",
-        "--conf", "spark.hadoop.mapreduce.fileoutputcommitter.algorithm.version=2",
-        # Additional configurations to fix IOStatisticsBinding error
-        "--conf", "spark.driver.extraClassPath=/opt/spark/jars/*",
-        "--conf", "spark.executor.extraClassPath=/opt/spark/jars/*",
-        "--conf", "spark.hadoop.fs.s3a.bucket.all.committer.magic.enabled=true",
-        "--conf", "spark.hadoop.fs.s3a.attempts.maximum=20",
-        "--conf", "spark.hadoop.fs.s3a.connection.establish.timeout=5000",
-        "--conf", "spark.hadoop.fs.s3a.connection.timeout=200000",
-        "--conf", "spark.hadoop.fs.s3a.threads.max=20",
-    ]
+    spark_submit_args = ["spark-submit"]
+    for key, value in SPARK_CONFS.items():
+        spark_submit_args.extend(["--conf", f"{key}={value}"])
     if spark_configs:
         logger.info(f"Adding Spark configurations: {spark_configs}")
         for key, value in spark_configs.items():
@@ -112,12 +130,14 @@ def local_code_executy(code_string, spark_configs):
             process.wait()
             
             # Give threads a moment to finish processing any remaining output
-            import time
             time.sleep(1)
         
         # Check if process completed successfully
         if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, spark_submit_args)
+            raise subprocess.CalledProcessError(
+                process.returncode, spark_submit_args,
+                output=''.join(stdout_queue.queue), stderr=''.join(stderr_queue.queue)
+            )
             
         logger.info(f"Spark execution logs written to {log_file_path}")
 
@@ -143,6 +163,220 @@ def local_code_executy(code_string, spark_configs):
             if os.path.exists(file_path):
                 os.remove(file_path)
 
+
+class WarmSparkExecutor:
+    """Runs code snippets against a SparkSession that stays alive across invocations of a warm container.
+
+    The session lives in a worker process (this file started with --warm-worker) so that a snippet which crashes the
+    interpreter or the JVM only costs a restart of the worker. Requests are sent to the worker's stdin and results come
+    back as JSON lines over a dedicated pipe, while the worker's stdout and stderr are logged and kept per request for
+    error parsing. The worker is restarted when a request brings different Spark configurations, since most of them
+    can only be applied when the JVM starts, and it is killed and respawned when a snippet runs past its timeout.
+    """
+
+    def __init__(self):
+        self.process = None
+        self.spark_configs = None
+        self.results = None
+        self.last_timings = {}
+        self._lock = threading.Lock()
+        self._stdout_lines = []
+        self._stderr_lines = []
+        self._drained = {}
+
+    def execute(self, code_string, spark_configs, timeout=None):
+        spark_configs = spark_configs or {}
+        log_file_path = '/tmp/spark_log.txt'
+        with self._lock:
+            if self.process is not None and (self.process.poll() is not None or spark_configs != self.spark_configs):
+                logger.info("Restarting warm Spark worker")
+                self.stop()
+            if self.process is None:
+                self._start(spark_configs)
+
+            self._stdout_lines, self._stderr_lines = [], []
+            self._drained = {"stdout": threading.Event(), "stderr": threading.Event()}
+            start = time.perf_counter()
+            timed_out = False
+            try:
+                self.process.stdin.write(json.dumps({"code": code_string, "configs": spark_configs}) + "\n")
+                self.process.stdin.flush()
+                # The worker writes each result as one line, so the result is complete once the pipe is readable
+                timed_out = not select.select([self.results], [], [], timeout)[0]
+                line = '' if timed_out else self.results.readline()
+            except (BrokenPipeError, OSError):
+                line = ''
+            if line:
+                for event in self._drained.values():
+                    event.wait(WARM_OUTPUT_DRAIN_TIMEOUT)
+            elif timed_out:
+                logger.error(f"Spark code did not finish within {timeout:.0f} seconds, killing the warm Spark worker")
+                self.process.kill()
+                self.process.wait()
+                for thread in self._readers:
+                    thread.join(WARM_OUTPUT_DRAIN_TIMEOUT)
+            else:
+                # The worker died mid-request; wait for its remaining output before parsing the error
+                self.process.wait()
+                for thread in self._readers:
+                    thread.join(WARM_OUTPUT_DRAIN_TIMEOUT)
+            stdout, stderr = ''.join(self._stdout_lines), ''.join(self._stderr_lines)
+            with open(log_file_path, 'w') as log_file:
+                log_file.write(stdout + stderr)
+
+            if timed_out:
+                # Respawn right away, the worker only starts its SparkSession with the next request
+                self.stop()
+                self._start(spark_configs)
+                raise CodeExecutionError(
+                    f"Execution timed out after {timeout:.0f} seconds.\n\n"
+                    + parse_error(stdout, stderr, code_string, log_file_path)
+                )
+            if not line:
+                logger.error(f"Warm Spark worker exited with code {self.process.returncode}")
+                self.stop()
+                raise CodeExecutionError(parse_error(stdout, stderr, code_string, log_file_path))
+
+            response = json.loads(line)
+            self.last_timings = {
+                "session": "cold" if response["session_start_seconds"] else "warm",
+                "session_start_seconds": round(response["session_start_seconds"], 3),
+                "execution_seconds": round(response["execution_seconds"], 3),
+                "total_seconds": round(time.perf_counter() - start, 3),
+            }
+            logger.info(f"Warm Spark execution timings: {self.last_timings}")
+            if not response["ok"]:
+                logger.error("Spark job execution failed")
+                raise CodeExecutionError(parse_error(stdout, stderr + response["error"], code_string, log_file_path))
+            if "output" not in response:
+                logger.error("Code did not define an output variable")
+                raise CodeExecutionError("Output not found. Execution may have failed without producing output.")
+            return response["output"]
+
+    def stop(self):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+            self.process.stdin.close()
+            self.results.close()
+        self.process = None
+        self.results = None
+
+    def _start(self, spark_configs):
+        logger.info("Starting warm Spark worker")
+        read_fd, write_fd = os.pipe()
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), WARM_WORKER_FLAG, str(write_fd)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            pass_fds=(write_fd,),
+        )
+        os.close(write_fd)
+        self.results = os.fdopen(read_fd, 'r')
+        self.spark_configs = spark_configs
+        self._readers = [
+            threading.Thread(target=self._read_output, args=(self.process.stdout, "stdout", "SPARK-STDOUT"), daemon=True),
+            threading.Thread(target=self._read_output, args=(self.process.stderr, "stderr", "SPARK-STDERR"), daemon=True),
+        ]
+        for thread in self._readers:
+            thread.start()
+
+    def _read_output(self, out, stream, prefix):
+        for line in iter(out.readline, ''):
+            if line.startswith(WARM_END_MARKER):
+                self._drained[stream].set()
+                continue
+            logger.info(f"{prefix}: {line.strip()}")
+            (self._stdout_lines if stream == "stdout" else self._stderr_lines).append(line)
+        out.close()
+
+
+WARM_EXECUTOR = WarmSparkExecutor()
+
+
+@contextmanager
+def _shared_session_guard(spark):
+    """Ignore stop() calls of snippet code and undo its temporary views, caches and runtime configurations."""
+    from pyspark import SparkContext
+    from pyspark.sql import SparkSession
+
+    stops = SparkSession.stop, SparkContext.stop
+    SparkSession.stop = SparkContext.stop = lambda self: logger.info("Keeping the shared SparkSession running")
+    runtime_conf = {row.key: row.value for row in spark.sql("SET").collect()}
+    try:
+        yield
+    finally:
+        SparkSession.stop, SparkContext.stop = stops
+        try:
+            spark.sparkContext.cancelAllJobs()
+            spark.catalog.clearCache()
+            for table in spark.catalog.listTables():
+                if table.isTemporary:
+                    spark.catalog.dropTempView(table.name)
+            spark.catalog.setCurrentDatabase("default")
+            session_conf = spark._jsparkSession.sessionState().conf()
+            for row in spark.sql("SET").collect():
+                if row.key not in runtime_conf:
+                    session_conf.unsetConf(row.key)
+                elif row.value != runtime_conf[row.key]:
+                    session_conf.setConfString(row.key, runtime_conf[row.key])
+        except Exception as e:
+            logger.warning(f"Could not fully reset the shared SparkSession: {str(e)}")
+
+
+def run_warm_worker(result_fd):
+    """Serve code execution requests from stdin against one SparkSession, writing results to `result_fd`."""
+    from pyspark.sql import SparkSession
+
+    results = os.fdopen(result_fd, 'w')
+    spark = None
+    for request_line in sys.stdin:
+        request = json.loads(request_line)
+        response = {"session_start_seconds": 0.0, "execution_seconds": 0.0}
+        namespace = {}
+        try:
+            if spark is None:
+                start = time.perf_counter()
+                builder = SparkSession.builder.master("local[*]").appName("spark-code-interpreter")
+                for key, value in {**SPARK_CONFS, **request["configs"]}.items():
+                    builder = builder.config(key, value)
+                spark = builder.getOrCreate()
+                response["session_start_seconds"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            # Every snippet gets a fresh namespace; getOrCreate() in the snippet returns the shared session
+            namespace = {"__name__": "__main__", "__builtins__": builtins}
+            try:
+                with _shared_session_guard(spark):
+                    exec(compile(request["code"], WARM_CODE_FILENAME, "exec"), namespace)
+            finally:
+                response["execution_seconds"] = time.perf_counter() - start
+            response["ok"] = True
+            if "output" in namespace:
+                response["output"] = namespace["output"]
+        except BaseException as e:
+            if isinstance(e, SystemExit) and e.code in (None, 0):
+                response["ok"] = True
+                if "output" in namespace:
+                    response["output"] = namespace["output"]
+            else:
+                response["ok"] = False
+                # Skip this frame so the first frame of the traceback is the snippet's code
+                response["error"] = "".join(traceback.format_exception(type(e), e, e.__traceback__.tb_next))
+
+        if os.path.exists('/tmp/output.json'):
+            os.remove('/tmp/output.json')
+        sys.stdout.flush()
+        sys.stderr.flush()
+        print(WARM_END_MARKER, flush=True)
+        print(WARM_END_MARKER, file=sys.stderr, flush=True)
+        results.write(json.dumps(response, default=str) + "\n")
+        results.flush()
+
 def parse_error(stdout, stderr, code_string, log_file_path):
     logger.info("Parsing error details from Spark execution")
     error_message = "Execution Error:\n"
@@ -194,7 +428,7 @@ def parse_error(stdout, stderr, code_string, log_file_path):
 
     return error_message
     
-def execute_function_string(input_code, trial, bucket, key_prefix, spark_config):
+def execute_function_string(input_code, trial, bucket, key_prefix, spark_config, timeout=None):
     """
     Execute a given Python code string, potentially modifying dataset paths to use S3. 
     If it's the first trial (trial < 1) and the S3 bucket/prefix are not already in the code:
@@ -207,9 +441,11 @@ def execute_function_string(input_code, trial, bucket, key_prefix, spark_config)
     trial (int): A counter for execution attempts, used to determine if S3 paths should be injected.
     bucket (str): The name of the S3 bucket where datasets are stored.
     key_prefix (str): The S3 key prefix (folder path) where datasets are located within the bucket.
+    timeout (float, optional): Seconds the code may run in the warm worker before the worker is killed and respawned.
 
     Returns:
-    The result of executing the code using the local_code_executy function.
+    The result of executing the code in the warm SparkSession worker (SPARK_EXECUTION_MODE=warm)
+    or with the local_code_executy function (SPARK_EXECUTION_MODE=spark-submit).
 
     """
     code_string = input_code['code']
@@ -222,6 +458,8 @@ def execute_function_string(input_code, trial, bucket, key_prefix, spark_config)
     logger.debug(f"Code to execute:\n{code_string}")
     
     # Add cluster configuration to spark_config
+    if SPARK_EXECUTION_MODE == 'warm':
+        return WARM_EXECUTOR.execute(code_string, spark_config, timeout)
     return local_code_executy(code_string, spark_config)
 
 
@@ -268,7 +506,18 @@ def lambda_handler(event, context):
         logger.info(f"Job parameters - Bucket: {bucket}, Path: {s3_file_path}, Iterate: {iterate}")
         logger.info(f"Spark config: {spark_config}")
         
-        result = execute_function_string(input_data, iterate, bucket, s3_file_path, spark_config)
+        timeout = None
+        if context is not None:
+            timeout = max(context.get_remaining_time_in_millis() / 1000 - WARM_DEADLINE_MARGIN_SECONDS, 1)
+
+        start = time.perf_counter()
+        result = execute_function_string(input_data, iterate, bucket, s3_file_path, spark_config, timeout)
+        execution = {"mode": SPARK_EXECUTION_MODE, "total_seconds": round(time.perf_counter() - start, 3)}
+        if SPARK_EXECUTION_MODE == 'warm':
+            execution.update(WARM_EXECUTOR.last_timings)
+        else:
+            execution["session"] = "cold"
+        logger.info(f"Spark execution latency: {execution}")
         image_holder = []
         plotly_holder = []
         
@@ -303,7 +552,8 @@ def lambda_handler(event, context):
         tool_result = {
             "result": result,            
             "image_dict": image_holder,
-            "plotly": plotly_holder
+            "plotly": plotly_holder,
+            "execution": execution
         }
         logger.info(tool_result)
         logger.info("Spark job completed successfully")        
@@ -320,3 +570,7 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({'error': str(e)})
         }
+
+
+if __name__ == '__main__' and WARM_WORKER_FLAG in sys.argv:
+    run_warm_worker(int(sys.argv[sys.argv.index(WARM_WORKER_FLAG) + 1]))
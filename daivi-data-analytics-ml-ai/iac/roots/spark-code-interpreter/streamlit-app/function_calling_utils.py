@@ -10,11 +10,17 @@ import io
 import re
 from pptx import Presentation
 import random
+import codecs
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
 from python_calamine import CalamineWorkbook
+from openpyxl import load_workbook
 import chardet
 from docx.table import _Cell
 import concurrent.futures
-from functools import partial
+import multiprocessing
 from textractor import Textractor
 from textractor.data.constants import TextractFeatures
 from textractor.data.text_linearization_config import TextLinearizationConfig
@@ -28,6 +34,7 @@ from docx.document import Document
 from docx.text.paragraph import Paragraph
 from docx.table import Table as DocxTable
 import textract
+import logging
 
 config = Config(
     read_timeout=600, # Read timeout parameter
@@ -36,6 +43,8 @@ config = Config(
     )
 )
 
+logger = logging.getLogger("function-calling-utils")
+
 with open('config.json','r',encoding='utf-8') as f:
     config_file = json.load(f)
     
@@ -59,7 +68,24 @@ INPUT_BUCKET=config_file["input_bucket"]
 with open('pricing.json','r',encoding='utf-8') as f:
     pricing_file = json.load(f)
 
-S3=boto3.client('s3', region_name=REGION)
+# Uploads, copies and document extraction run on pools created once per app process instead of once per chat turn
+S3_TRANSFER_WORKERS=config_file.get("s3-transfer-workers", 16)
+DOCUMENT_PROCESS_WORKERS=config_file.get("document-process-workers", os.cpu_count())
+
+# Shared by all threads, so its connection pool is sized for the S3 transfer pool
+S3=boto3.client('s3', region_name=REGION, config=Config(max_pool_connections=S3_TRANSFER_WORKERS))
+
+# Uploaded tables are sampled so the model can infer their schema without reading whole files
+SCHEMA_SAMPLE_ROWS=20
+CSV_SAMPLE_INITIAL_BYTES=256*1024
+ENCODING_SAMPLE_BYTES=64*1024
+S3_RANGE_BLOCK_SIZE=1024*1024
+
+# Extracted document content is cached by source object content so chat history reloads skip re-extraction
+EXTRACTION_CACHE_VERSION="v1"
+EXTRACTION_CACHE_S3_PATH=f"{TEXTRACT_RESULT_CACHE_PATH}/extractions/{EXTRACTION_CACHE_VERSION}"
+EXTRACTION_CACHE_MAX_BYTES=config_file.get("extraction-cache-max-bytes", 256*1024*1024)
+
 def put_db(params,messages):
     """Store long term chat history in DynamoDB"""    
     chat_item = {
@@ -235,8 +261,6 @@ def copy_s3_object(source_uri, dest_bucket, dest_key):
     :param dest_key: Key to be used for the destination object
     :return: S3 URI of the copied object
     """
-    s3 = boto3.client('s3', region_name=REGION)
-
     # Parse the source URI
     source_bucket, source_key = parse_s3_uri(source_uri)
     if not source_bucket or not source_key:
@@ -255,7 +279,7 @@ def copy_s3_object(source_uri, dest_bucket, dest_key):
         dest_full_key = f"{dest_key}/{filename}"
 
         # Copy the object
-        s3.copy_object(CopySource=copy_source, Bucket=dest_bucket, Key=dest_full_key)
+        S3.copy_object(CopySource=copy_source, Bucket=dest_bucket, Key=dest_full_key)
         return f"s3://{dest_bucket}/{dest_full_key}"
 
     except ClientError as e:
@@ -509,41 +533,33 @@ def get_object_with_retry(bucket, key):
                 raise e
                 
 def exract_pdf_text_aws(file):    
-    file_base_name=os.path.basename(file)
     dir_name, ext = os.path.splitext(file)
-    # Checking if extracted doc content is in S3
-    if USE_TEXTRACT:        
-        if [x for x in get_s3_keys(f"{TEXTRACT_RESULT_CACHE_PATH}/") if file_base_name in x]:    
-            response = get_object_with_retry(BUCKET, f"{TEXTRACT_RESULT_CACHE_PATH}/{file_base_name}.txt")
-            text = response['Body'].read().decode()
-            return text
-        else:            
-            extractor = Textractor(region_name="us-east-1")
-            # Asynchronous call, you will experience some wait time. Try caching results for better experience
-            if "pdf" in ext:
-                print("Asynchronous call, you may experience some wait time.")
-                document = extractor.start_document_analysis(
-                file_source=file,
-                features=[TextractFeatures.LAYOUT,TextractFeatures.TABLES],       
-                save_image=False,   
-                s3_output_path=f"s3://{BUCKET}/textract_output/"
-            )
-            #Synchronous call
-            else:
-                document = extractor.analyze_document(
-                file_source=file,
-                features=[TextractFeatures.LAYOUT,TextractFeatures.TABLES],  
-                save_image=False,
-            )
-            config = TextLinearizationConfig(
-            hide_figure_layout=False,   
-            hide_header_layout=False,    
-            table_prefix="<table>",
-            table_suffix="</table>",
-            )
-            # Upload extracted content to s3
-            S3.put_object(Body=document.get_text(config=config), Bucket=BUCKET, Key=f"{TEXTRACT_RESULT_CACHE_PATH}/{file_base_name}.txt") 
-            return document.get_text(config=config)
+    # Extracted content is cached by the callers through EXTRACTION_CACHE
+    if USE_TEXTRACT:
+        extractor = Textractor(region_name="us-east-1")
+        # Asynchronous call, you will experience some wait time. Try caching results for better experience
+        if "pdf" in ext:
+            print("Asynchronous call, you may experience some wait time.")
+            document = extractor.start_document_analysis(
+            file_source=file,
+            features=[TextractFeatures.LAYOUT,TextractFeatures.TABLES],       
+            save_image=False,   
+            s3_output_path=f"s3://{BUCKET}/textract_output/"
+        )
+        #Synchronous call
+        else:
+            document = extractor.analyze_document(
+            file_source=file,
+            features=[TextractFeatures.LAYOUT,TextractFeatures.TABLES],  
+            save_image=False,
+        )
+        config = TextLinearizationConfig(
+        hide_figure_layout=False,   
+        hide_header_layout=False,    
+        table_prefix="<table>",
+        table_suffix="</table>",
+        )
+        return document.get_text(config=config)
     else:
         s3=boto3.resource("s3", region_name=REGION)
         match = re.match("s3://(.+?)/(.+)", file)
@@ -572,37 +588,119 @@ def exract_pdf_text_aws(file):
             text = pytesseract.image_to_string(image)
         return text    
 
+def get_s3_object_range(bucket_name, key, start, end):
+    """Fetch bytes start..end (inclusive) of an S3 object with a ranged GET.
+    Returns:
+       tuple: The fetched bytes and the total size of the object.
+    """
+    try:
+        response = S3.get_object(Bucket=bucket_name, Key=key, Range=f"bytes={start}-{end}")
+    except ClientError as e:
+        # Any range of an empty object is rejected as unsatisfiable
+        if e.response['Error']['Code'] == 'InvalidRange':
+            return b"", 0
+        raise
+    total_size = int(response['ContentRange'].rsplit('/', 1)[1])
+    return response['Body'].read(), total_size
+
+class S3RangeReader(io.RawIOBase):
+    """Seekable, read-only file object over an S3 object that fetches fixed-size blocks with ranged GETs on demand.
+    Lets zip based readers such as openpyxl open a workbook by reading only its directory and the parts they parse.
+    """
+    def __init__(self, bucket_name, key, block_size=S3_RANGE_BLOCK_SIZE):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.block_size = block_size
+        self.size = S3.head_object(Bucket=bucket_name, Key=key)['ContentLength']
+        self.position = 0
+        self.bytes_fetched = 0
+        self._blocks = {}
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self.position = offset
+        return self.position
+
+    def _get_block(self, index):
+        if index not in self._blocks:
+            start = index * self.block_size
+            end = min(start + self.block_size, self.size) - 1
+            self._blocks[index], _ = get_s3_object_range(self.bucket_name, self.key, start, end)
+            self.bytes_fetched += end - start + 1
+        return self._blocks[index]
+
+    def read(self, size=-1):
+        end = self.size if size is None or size < 0 else min(self.position + size, self.size)
+        chunks = []
+        while self.position < end:
+            index, offset = divmod(self.position, self.block_size)
+            chunk = self._get_block(index)[offset:offset + end - self.position]
+            chunks.append(chunk)
+            self.position += len(chunk)
+        return b"".join(chunks)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def _detect_encoding(sample):
+    """detect the encoding of a byte sample, defaulting to utf-8"""
+    return chardet.detect(sample)['encoding'] or 'utf-8'
+
 def detect_encoding(s3_uri):
-    """detect csv encoding"""
-    s3 = boto3.client('s3',region_name="us-east-1")
-    match = re.match("s3://(.+?)/(.+)", s3_uri)
-    if match:
-        bucket_name = match.group(1)
-        key = match.group(2) 
-    response = s3.get_object(Bucket=bucket_name, Key=key)
-    content = response['Body'].read()
-    result = chardet.detect(content)
-    return result['encoding']
+    """detect csv encoding from the leading bytes of the object"""
+    bucket_name, key = parse_s3_uri(s3_uri)
+    sample, _ = get_s3_object_range(bucket_name, key, 0, ENCODING_SAMPLE_BYTES - 1)
+    return _detect_encoding(sample)
 
 class InvalidContentError(Exception):
     pass
 
-def parse_csv_from_s3(s3_uri):
-    """Here we are only loading the first 20 rows to the model. 20 rows is sufficient for the model to figure out the schema"""
-    
+def parse_csv_from_s3(s3_uri, nrows=SCHEMA_SAMPLE_ROWS):
+    """Here we are only loading the first 20 rows to the model. 20 rows is sufficient for the model to figure out the schema.
+    Only the leading bytes of the object are fetched, growing the range until it holds the header and nrows complete rows.
+    """
     try:
-        # Detect the file encoding using chardet
-        encoding = detect_encoding(s3_uri)  
-        # Get the object from S3
-        response = get_s3_obj_from_bucket_(s3_uri)
-        # Read the content of the file
-        content = response['Body'].read().decode(encoding)
-        # Use StringIO to create a file-like object
-        csv_file = io.StringIO(content)
-        # Read the CSV file using pandas
-        df = pd.read_csv(csv_file, delimiter=None, engine='python').iloc[:20]   
-        return df.to_csv(index=False)
-        
+        bucket_name, key = parse_s3_uri(s3_uri)
+        if not bucket_name:
+            raise ValueError(f"Invalid S3 URI format: {s3_uri}")
+        range_size = CSV_SAMPLE_INITIAL_BYTES
+        while True:
+            content, total_size = get_s3_object_range(bucket_name, key, 0, range_size - 1)
+            complete = len(content) >= total_size
+            # Detect the file encoding on the leading bytes using chardet
+            encoding = _detect_encoding(content[:ENCODING_SAMPLE_BYTES])
+            # The incremental decoder holds back a multi-byte character cut off at the end of the range
+            text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(content, final=complete)
+            if not complete:
+                # Drop the trailing partial row
+                text = text[:text.rfind('\n') + 1]
+            try:
+                df = pd.read_csv(io.StringIO(text), delimiter=None, engine='python', nrows=nrows)
+            except (pd.errors.ParserError, pd.errors.EmptyDataError):
+                # A truncated quoted field or an oversized header needs a longer range
+                if complete:
+                    raise
+                df = None
+            if complete or (df is not None and len(df) >= nrows):
+                return df.to_csv(index=False)
+            range_size *= 4
+
     except Exception as e:
         raise InvalidContentError(f"Error: {e}")
         
@@ -610,58 +708,45 @@ def parse_csv_from_s3(s3_uri):
 def strip_newline(cell):
     return str(cell).strip()
 
-def table_parser_openpyxl(file):
+def table_parser_openpyxl(file, nrows=SCHEMA_SAMPLE_ROWS):
     """
-    Here we are only loading the first 20 rows to the model and we are not massaging the dataset by merging empty cells. 20 rows is sufficient for the model to figure out the schema
+    Here we are only loading the first 20 rows to the model and we are not massaging the dataset by merging empty cells. 20 rows is sufficient for the model to figure out the schema.
+    The workbook is opened in read-only mode over ranged S3 reads, so only the zip directory, shared strings and the leading rows of each sheet are fetched and parsed.
     """
-    # Read from S3
-    s3 = boto3.client('s3', region_name=REGION)
-    match = re.match("s3://(.+?)/(.+)", file)
-    if match:
-        bucket_name = match.group(1)
-        key = match.group(2)
-        obj = s3.get_object(Bucket=bucket_name, Key=key)    
-        # Read Excel file from S3 into a buffer
-        xlsx_buffer = io.BytesIO(obj['Body'].read()) 
-        # Load workbook
-        wb=pd.read_excel(xlsx_buffer,sheet_name=None, header=None)  
+    bucket_name, key = parse_s3_uri(file)
+    if not bucket_name:
+        raise Exception(f"{file} not formatted as an S3 path")
+    wb = load_workbook(S3RangeReader(bucket_name, key), read_only=True, data_only=True)
+    try:
         all_sheets_string=""
         # Iterate over each sheet in the workbook
-        for sheet_name, sheet_data in wb.items():
-            df = pd.DataFrame(sheet_data)
+        for ws in wb.worksheets:
+            rows = list(ws.iter_rows(max_row=nrows, values_only=True))
+            df = pd.DataFrame(rows)
             # Convert to string and tag by sheet name
-            all_sheets_string+=f'<SHEET NAME:{sheet_name}>\n{df.iloc[:20].to_csv(index=False, header=False)}\n</{sheet_name}>\n'
+            all_sheets_string+=f'<SHEET NAME:{ws.title}>\n{df.to_csv(index=False, header=False)}\n</{ws.title}>\n'
         return all_sheets_string
-    else:
-        raise Exception(f"{file} not formatted as an S3 path")
+    finally:
+        wb.close()
 
-def calamaine_excel_engine(file):
+def calamaine_excel_engine(file, nrows=SCHEMA_SAMPLE_ROWS):
     """
     Here we are only loading the first 20 rows to the model and we are not massaging the dataset by merging empty cells. 20 rows is sufficient for the model to figure out the schema
     """
-    # # Read from S3
-    s3 = boto3.client('s3',region_name=REGION)
-    match = re.match("s3://(.+?)/(.+)", file)
-    if match:
-        bucket_name = match.group(1)
-        key = match.group(2)
-        obj = s3.get_object(Bucket=bucket_name, Key=key)    
-        # Read Excel file from S3 into a buffer
-        xlsx_buffer = io.BytesIO(obj['Body'].read())
-        xlsx_buffer.seek(0)    
-        all_sheets_string=""
-        # Load the Excel file
-        workbook = CalamineWorkbook.from_filelike(xlsx_buffer)
-        # Iterate over each sheet in the workbook
-        for sheet_name in workbook.sheet_names:
-            # Get the sheet by name
-            sheet = workbook.get_sheet_by_name(sheet_name)
-            df = pd.DataFrame(sheet.to_python(skip_empty_area=False))
-            df = df.map(strip_newline)
-            all_sheets_string+=f'<{sheet_name}>\n{df.iloc[:20].to_csv(index=False, header=0)}\n</{sheet_name}>\n'
-        return all_sheets_string
-    else:
+    bucket_name, key = parse_s3_uri(file)
+    if not bucket_name:
         raise Exception(f"{file} not formatted as an S3 path")
+    all_sheets_string=""
+    # Load the Excel file; calamine reads the whole workbook, so only legacy formats that openpyxl cannot open land here
+    workbook = CalamineWorkbook.from_filelike(S3RangeReader(bucket_name, key))
+    # Iterate over each sheet in the workbook
+    for sheet_name in workbook.sheet_names:
+        # Get the sheet by name
+        sheet = workbook.get_sheet_by_name(sheet_name)
+        df = pd.DataFrame(sheet.to_python(skip_empty_area=False, nrows=nrows))
+        df = df.map(strip_newline)
+        all_sheets_string+=f'<{sheet_name}>\n{df.to_csv(index=False, header=0)}\n</{sheet_name}>\n'
+    return all_sheets_string
 
 def table_parser_utills(file):
     try:
@@ -676,7 +761,149 @@ def table_parser_utills(file):
         except Exception as e:
             raise Exception(str(e))
 
-def process_document_types(file):
+class ExtractionCache:
+    """
+    Two-tier cache of extracted document content, addressed by the content checksum (or ETag) of the source object.
+    A byte-size-bounded in-process LRU sits in front of an S3 tier shared by all app instances. Both tiers are single key lookups,
+    and any change to the source object changes its address, so entries never need invalidating.
+    """
+    def __init__(self, max_bytes=EXTRACTION_CACHE_MAX_BYTES, s3_prefix=EXTRACTION_CACHE_S3_PATH):
+        self.max_bytes = max_bytes
+        self.s3_prefix = s3_prefix
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(file):
+        """Content address of an S3 document, or None if the object cannot be described"""
+        bucket_name, key = parse_s3_uri(file)
+        if not bucket_name:
+            return None
+        try:
+            head = S3.head_object(Bucket=bucket_name, Key=key, ChecksumMode='ENABLED')
+        except ClientError as e:
+            print(f"Extraction cache bypassed for {file}: {e}")
+            return None
+        _, ext = os.path.splitext(key)
+        fingerprint = [head.get('ChecksumSHA256') or head['ETag'], head['ContentLength'], ext.lower(), USE_TEXTRACT, SCHEMA_SAMPLE_ROWS]
+        return hashlib.sha256(json.dumps(fingerprint).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _serialize(content):
+        if isinstance(content, bytes):
+            entry = {'type': 'bytes', 'content': base64.b64encode(content).decode('ascii')}
+        elif isinstance(content, str):
+            entry = {'type': 'text', 'content': content}
+        else:
+            entry = {'type': 'json', 'content': content}
+        return json.dumps(entry).encode('utf-8')
+
+    @staticmethod
+    def _deserialize(payload):
+        entry = json.loads(payload)
+        if entry['type'] == 'bytes':
+            return base64.b64decode(entry['content'])
+        return entry['content']
+
+    def get(self, cache_key, local=True, persistent=True):
+        """Return cached content from the local tier, the S3 tier, or both, or None on a miss in every tier looked up"""
+        payload = None
+        if local:
+            with self._lock:
+                payload = self._entries.get(cache_key)
+                if payload is not None:
+                    self._entries.move_to_end(cache_key)
+        if payload is None and persistent:
+            try:
+                payload = S3.get_object(Bucket=BUCKET, Key=f"{self.s3_prefix}/{cache_key}.json")['Body'].read()
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'NoSuchKey':
+                    print(f"Extraction cache read failed: {e}")
+                return None
+            if local:
+                self._put_local(cache_key, payload)
+        return self._deserialize(payload) if payload is not None else None
+
+    def put(self, cache_key, content, local=True, persistent=True):
+        """Store content in the local tier, the S3 tier, or both"""
+        payload = self._serialize(content)
+        if persistent:
+            try:
+                S3.put_object(Body=payload, Bucket=BUCKET, Key=f"{self.s3_prefix}/{cache_key}.json")
+            except ClientError as e:
+                print(f"Extraction cache write failed: {e}")
+        if local:
+            self._put_local(cache_key, payload)
+
+    def _put_local(self, cache_key, payload):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(cache_key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[cache_key] = payload
+            self.size += len(payload)
+            # Evict least recently used entries until the tier fits its byte budget
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+EXTRACTION_CACHE = ExtractionCache()
+
+def process_document_types(file, cache_key=None):
+    """Handle various document format, reusing the cached extraction of an unchanged document"""
+    cache_key = cache_key or ExtractionCache.key_for(file)
+    if cache_key:
+        content = EXTRACTION_CACHE.get(cache_key)
+        if content is not None:
+            return content
+    content = extract_document_content(file)
+    if cache_key:
+        EXTRACTION_CACHE.put(cache_key, content)
+    return content
+
+def extract_and_store_document(file, cache_key=None):
+    """
+    Extract a document that missed both cache tiers, in a document pool worker, and store it in the S3 tier only.
+    The local tier is kept by the parent process, so the workers do not each fill an LRU of their own.
+    """
+    content = extract_document_content(file)
+    if cache_key:
+        EXTRACTION_CACHE.put(cache_key, content, local=False)
+    return content
+
+def load_document(file, cache_key=None):
+    """
+    Load a document that missed the local tier, in an S3 transfer pool thread, from the S3 tier or by extracting it.
+    Only the S3 tier is read and written, the local tier is kept by the caller.
+    """
+    content = EXTRACTION_CACHE.get(cache_key, local=False) if cache_key else None
+    if content is None:
+        content = extract_document_content(file)
+        if cache_key:
+            EXTRACTION_CACHE.put(cache_key, content, local=False)
+    return content
+
+def load_history_documents(files):
+    """
+    Return the content of chat history attachments, in attachment order.
+    The HEAD and S3 tier GET requests of the attachments run concurrently on the S3 transfer pool, while the local tier is looked up here.
+    """
+    executor = get_s3_transfer_executor()
+    cache_keys = list(executor.map(ExtractionCache.key_for, files))
+    contents = [EXTRACTION_CACHE.get(cache_key, persistent=False) if cache_key else None for cache_key in cache_keys]
+    misses = [(file, cache_key) for file, cache_key, content in zip(files, cache_keys, contents) if content is None]
+    loaded = iter(executor.map(lambda miss: load_document(*miss), misses))
+    for index, (file, cache_key) in enumerate(zip(files, cache_keys)):
+        if contents[index] is None:
+            contents[index] = next(loaded)
+            if cache_key:
+                EXTRACTION_CACHE.put(cache_key, contents[index], persistent=False)
+    return contents
+
+def extract_document_content(file):
     """Handle various document format"""
     dir_name, ext = os.path.splitext(file)
     if ".csv"  == ext.lower():
@@ -723,6 +950,16 @@ def get_chat_history_db(params,cutoff,claude3):
     current_chat, chat_hist=[],[]
     if params['chat_histories']: 
         chat_hist=params['chat_histories'][-cutoff:]        
+        # Document attachments of all turns are loaded together, so their S3 requests overlap
+        attachments=[]
+        if LOAD_DOC_IN_ALL_CHAT_CONVO:
+            for d in chat_hist:
+                if d['document'] and not (d['image'] and claude3):
+                    attachments.extend(d['document'])
+                    if not claude3 and d['image']:
+                        attachments.extend(d['image'])
+        attachments=list(dict.fromkeys(attachments))
+        documents=dict(zip(attachments, load_history_documents(attachments)))
         for ids,d in enumerate(chat_hist):
            
             if d['image'] and claude3 and LOAD_DOC_IN_ALL_CHAT_CONVO:
@@ -751,12 +988,12 @@ def get_chat_history_db(params,cutoff,claude3):
             elif d['document'] and LOAD_DOC_IN_ALL_CHAT_CONVO: 
                 doc='Here is a document showing sample rows:\n'
                 for docs in d['document']:
-                    uploads=process_document_types(docs)
+                    uploads=documents[docs]
                     doc_name=os.path.basename(docs)
                     doc+=f"<{doc_name}>\n{uploads}\n</{doc_name}>\n"
                 if not claude3 and d["image"]:                   
                     for docs in d['image']:
-                        uploads=process_document_types(docs)
+                        uploads=documents[docs]
                         doc_name=os.path.basename(docs)
                         doc+=f"<{doc_name}>\n{uploads}\n</{doc_name}>\n"
                 current_chat.append({'role': 'user', 'content': [{"text":doc+d['user']}]})
@@ -917,35 +1154,99 @@ Provide the fixed code within <code> XML tags and all python top-level package n
         libs = ''    
     return code,libs
 
+_EXECUTOR_LOCK=threading.Lock()
+_S3_TRANSFER_EXECUTOR=None
+_DOCUMENT_EXECUTOR=None
+
+def get_s3_transfer_executor():
+    """Thread pool shared by all chat turns for S3 uploads, copies and metadata requests"""
+    global _S3_TRANSFER_EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _S3_TRANSFER_EXECUTOR is None:
+            _S3_TRANSFER_EXECUTOR=concurrent.futures.ThreadPoolExecutor(max_workers=S3_TRANSFER_WORKERS, thread_name_prefix="s3-transfer")
+        return _S3_TRANSFER_EXECUTOR
+
+def get_document_executor(reset=False):
+    """
+    Process pool shared by all chat turns for document extraction, replaced when reset or after a worker died.
+    Workers are spawned rather than forked so they do not inherit the app's threads and open S3 connections.
+    """
+    global _DOCUMENT_EXECUTOR
+    with _EXECUTOR_LOCK:
+        if reset and _DOCUMENT_EXECUTOR is not None:
+            _DOCUMENT_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+            _DOCUMENT_EXECUTOR=None
+        if _DOCUMENT_EXECUTOR is None:
+            _DOCUMENT_EXECUTOR=concurrent.futures.ProcessPoolExecutor(max_workers=DOCUMENT_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _DOCUMENT_EXECUTOR
+
+def timed_call(func, *args):
+    """Call func and return its result with the elapsed wall time in seconds"""
+    start=time.perf_counter()
+    result=func(*args)
+    return result, time.perf_counter()-start
+
+def lookup_extraction_cache(file):
+    """Return the content address of a document and its cached extraction, if any"""
+    cache_key = ExtractionCache.key_for(file)
+    return cache_key, EXTRACTION_CACHE.get(cache_key) if cache_key else None
+
 def process_files(files):
 
-    result_string=""
+    result_parts=[]
     errors = []
     future_proxy_mapping = {} 
-    futures = []
-
-    with concurrent.futures.ProcessPoolExecutor() as executor:
-        # Partial function to pass the process_document_types function
-        func = partial(process_document_types)   
-        for file in files:
-            future = executor.submit(func, file)
-            future_proxy_mapping[future] = file
-            futures.append(future)
-
-        # Collect the results and handle exceptions
-        for future in concurrent.futures.as_completed(futures):        
-            file_url= future_proxy_mapping[future]
+    timings = {}
+    pool_broken = False
+    turn_start=time.perf_counter()
+
+    # Cache lookups cost S3 requests, so all files are looked up concurrently
+    lookups = list(get_s3_transfer_executor().map(lambda file: timed_call(lookup_extraction_cache, file), files))
+    executor = get_document_executor()
+    for file, ((cache_key, cached), lookup_seconds) in zip(files, lookups):
+        timings[file] = {'cache_lookup': lookup_seconds, 'cache_hit': cached is not None}
+        if cached is not None:
+            future = concurrent.futures.Future()
+            future.set_result((cached, 0.0))
+        else:
             try:
-                result = future.result()               
-                doc_name=os.path.basename(file_url)
-                
-                result_string+=f"<s3://{BUCKET}/{S3_DOC_CACHE_PATH}/{doc_name}>\n{result}\n</s3://{BUCKET}/{S3_DOC_CACHE_PATH}/{doc_name}>\n"
-            except Exception as e:
-                # Get the original function arguments from the Future object
-                error = {'file': file_url, 'error': str(e)}
-                errors.append(error)
-
-    return errors, result_string
+                future = executor.submit(timed_call, extract_and_store_document, file, cache_key)
+            except concurrent.futures.process.BrokenProcessPool:
+                executor = get_document_executor(reset=True)
+                future = executor.submit(timed_call, extract_and_store_document, file, cache_key)
+        future_proxy_mapping[future] = (file, cache_key, cached is not None)
+
+    # Collect the results and handle exceptions
+    for future in concurrent.futures.as_completed(future_proxy_mapping):        
+        file_url, cache_key, cache_hit = future_proxy_mapping[future]
+        try:
+            result, extraction_seconds = future.result()               
+            timings[file_url].update(extraction=extraction_seconds, ready=time.perf_counter()-turn_start)
+            if cache_key and not cache_hit:
+                # The worker already stored the result in the S3 tier
+                EXTRACTION_CACHE.put(cache_key, result, persistent=False)
+            doc_name=os.path.basename(file_url)
+            
+            result_parts.append(f"<s3://{BUCKET}/{S3_DOC_CACHE_PATH}/{doc_name}>\n{result}\n</s3://{BUCKET}/{S3_DOC_CACHE_PATH}/{doc_name}>\n")
+        except Exception as e:
+            if isinstance(e, concurrent.futures.process.BrokenProcessPool):
+                pool_broken = True
+            # Get the original function arguments from the Future object
+            error = {'file': file_url, 'error': str(e)}
+            errors.append(error)
+    if pool_broken:
+        get_document_executor(reset=True)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        for file_url, timing in timings.items():
+            if 'ready' not in timing:
+                logger.debug(f"{os.path.basename(file_url)}: cache lookup {timing['cache_lookup']:.3f}s, failed")
+                continue
+            source = "cache hit" if timing['cache_hit'] else "extracted"
+            logger.debug(f"{os.path.basename(file_url)}: cache lookup {timing['cache_lookup']:.3f}s, "
+                         f"{source} in {timing['extraction']:.3f}s, ready after {timing['ready']:.3f}s")
+        logger.debug(f"processed {len(files)} documents in {time.perf_counter()-turn_start:.3f}s")
+    return errors, "".join(result_parts)
 
 def invoke_lambda(function_name, payload):
     config = Config(
@@ -984,24 +1285,31 @@ def function_caller_claude_(params,handler=None):
         claude3=True
     full_doc_path=[]
     image_path=[]
-    for ids,docs in enumerate(params['upload_doc']):
+    # Upload attachments and copy selected S3 objects concurrently, keeping their original order
+    upload_start=time.perf_counter()
+    transfer_executor=get_s3_transfer_executor()
+    uploads=[transfer_executor.submit(timed_call, put_obj_in_s3_bucket_, docs) for docs in params['upload_doc']]
+    copies=[transfer_executor.submit(timed_call, put_obj_in_s3_bucket_, f"s3://{INPUT_BUCKET}/{INPUT_S3_PATH}/{docs}")
+            for docs in params['s3_objects'] or []]
+    for docs, upload in zip(params['upload_doc'], uploads):
         file_name=docs.name
         _,extensions=os.path.splitext(file_name)
-        s3_file_name=put_obj_in_s3_bucket_(docs)       
+        s3_file_name, upload_seconds=upload.result()
+        logger.debug(f"{file_name}: uploaded in {upload_seconds:.3f}s")
         if extensions.lower() in [".jpg",".jpeg",".png",".gif",".webp"] and claude3:
             image_path.append(s3_file_name)
             continue
         full_doc_path.append(s3_file_name)
 
-    if params['s3_objects']:          
-        for ids,docs in enumerate(params['s3_objects']):
-            file_name=docs
-            _,extensions=os.path.splitext(file_name)      
-            docs=put_obj_in_s3_bucket_(f"s3://{INPUT_BUCKET}/{INPUT_S3_PATH}/{docs}")
-            full_doc_path.append(docs)
-            if extensions.lower() in [".jpg",".jpeg",".png",".gif",".webp"] and claude3:
-                image_path.append(docs)
-                continue
+    for file_name, copy in zip(params['s3_objects'] or [], copies):
+        _,extensions=os.path.splitext(file_name)      
+        docs, copy_seconds=copy.result()
+        logger.debug(f"{file_name}: copied in {copy_seconds:.3f}s")
+        full_doc_path.append(docs)
+        if extensions.lower() in [".jpg",".jpeg",".png",".gif",".webp"] and claude3:
+            image_path.append(docs)
+            continue
+    logger.debug(f"uploaded and copied {len(uploads)+len(copies)} documents in {time.perf_counter()-upload_start:.3f}s")
   
     errors, result_string=process_files(full_doc_path) 
     if errors:
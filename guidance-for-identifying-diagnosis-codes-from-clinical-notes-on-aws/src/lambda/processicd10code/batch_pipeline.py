@@ -0,0 +1,413 @@
+"""
+Batch ICD-10 coding pipeline for backfills over archives of patient notes.
+
+Reads notes from a JSONL or Parquet file, or a directory of them, and runs the same stages as the Lambda
+function (Comprehend Medical, LLM recommendation, knowledge base retrieval, final LLM response) as a
+pipeline: each stage has its own bounded thread pool and a note moves to the next stage as soon as its
+current stage completes, so all stages work on different notes at the same time.
+
+Identical notes are processed once. Results are written as Parquet files under the output directory:
+
+    results/  one row per distinct note (note_hash, prompts' outputs and stage latency)
+    notes/    one row per note ID (note_id, note_hash)
+
+The output doubles as the checkpoint: on restart, notes whose ID is already in notes/ are skipped and notes
+whose content is already in results/ are only indexed. Notes that fail are logged to errors.jsonl and
+retried by the next run.
+
+Usage:
+    python batch_pipeline.py --input notes/ --output results/ --id-field id
+    python batch_pipeline.py --input notes.jsonl --output /tmp/out --backend stub --stub-llm-latency 0.5
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import processicd10code
+
+logger = logging.getLogger("batch_pipeline")
+
+INPUT_EXTENSIONS = (".jsonl", ".parquet")
+STAGES = ["comprehend_medical", "llm_recommendation", "knowledge_base", "llm_final"]
+
+RESULTS_SCHEMA = pa.schema([
+    ("note_hash", pa.string()),
+    ("note_id", pa.string()),
+    ("cm_output", pa.string()),
+    ("medical_conditions", pa.list_(pa.string())),
+    ("recommendation", pa.string()),
+    ("final_response", pa.string()),
+] + [(f"{stage}_ms", pa.int64()) for stage in STAGES])
+NOTES_SCHEMA = pa.schema([("note_id", pa.string()), ("note_hash", pa.string())])
+
+
+class AwsBackend:
+    """
+    Runs the stages with the AWS services used by the Lambda function.
+    """
+
+    def __init__(self, region_name, knowledge_base_id=None, number_of_results=None):
+        if knowledge_base_id:
+            os.environ['KnowledgeBaseId'] = knowledge_base_id
+        if number_of_results:
+            os.environ['NumberOfResults'] = str(number_of_results)
+        if not os.getenv('KnowledgeBaseId') or not os.getenv('NumberOfResults'):
+            raise ValueError("The AWS backend needs --knowledge-base-id and --number-of-results")
+        self.bedrock_client = processicd10code.get_bedrock_client(region_name)
+
+    def comprehend_medical(self, patient_notes):
+        return processicd10code.process_patient_notes_with_comprehendMedical(patient_notes)
+
+    def invoke_llm(self, prompt):
+        return processicd10code.llm_processing(self.bedrock_client, prompt)
+
+    def knowledge_base(self, medical_conditions):
+        return processicd10code.fetch_results_from_knowledge_base(self.bedrock_client, medical_conditions)
+
+
+class StubBackend:
+    """
+    Deterministic local stand-in for the AWS services, with a fixed latency per call, for offline throughput tests.
+
+    Comprehend Medical finds the conditions of a small vocabulary in the note, the first LLM call recommends the
+    conditions found by Comprehend Medical and the knowledge base returns one guideline per condition.
+    """
+
+    CONDITIONS = {
+        "hypertension": "I10",
+        "type 2 diabetes": "E11.9",
+        "hyperlipidemia": "E78.5",
+        "obesity": "E66.9",
+        "depression": "F32.A",
+        "asthma": "J45.909",
+        "atrial fibrillation": "I48.91",
+        "chronic kidney disease": "N18.9",
+        "aortic valve sclerosis": "I35.8",
+        "rash": "R21",
+    }
+
+    def __init__(self, comprehend_latency=0.05, llm_latency=1.0, kb_latency=0.1):
+        self.comprehend_latency = comprehend_latency
+        self.llm_latency = llm_latency
+        self.kb_latency = kb_latency
+
+    def comprehend_medical(self, patient_notes):
+        time.sleep(self.comprehend_latency)
+        text = patient_notes.lower()
+        return [{
+            'cm_text': condition,
+            'cm_category': 'MEDICAL_CONDITION',
+            'cm_icd10concepts_above_threshold_score': [
+                {'cm_icd10concept': {'Code': code, 'Description': condition, 'Score': 0.9}}
+            ]
+        } for condition, code in self.CONDITIONS.items() if condition in text]
+
+    def invoke_llm(self, prompt):
+        time.sleep(self.llm_latency)
+        # The prompt instructions mention the tag too, the Comprehend Medical output is the last one
+        matches = re.findall(r'<comprehend_medical>(.*?)</comprehend_medical>', prompt, re.DOTALL)
+        if matches and matches[-1]:
+            conditions = [{"Review": {"Description": entity['cm_text']}} for entity in json.loads(matches[-1])]
+            return "<recommendation>" + json.dumps({"Active_Condition": conditions}) + "</recommendation>"
+        return "Final recommendation based on the guidelines."
+
+    def knowledge_base(self, medical_conditions):
+        time.sleep(self.kb_latency)
+        return [{
+            'mdeical_condition': medical_condition,
+            'kb_context': [{'content': {'text': f"Guidelines for {medical_condition}"}, 'score': 1.0}]
+        } for medical_condition in medical_conditions]
+
+
+def note_hash(patient_notes):
+    """
+    Return the hash identifying the content of a note.
+    """
+    return hashlib.blake2b(patient_notes.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def list_input_files(input_path):
+    """
+    Return the JSONL and Parquet files of a path, sorted so runs read notes in the same order.
+    """
+    if os.path.isfile(input_path):
+        return [input_path]
+    files = []
+    for root, _, names in os.walk(input_path):
+        files += [os.path.join(root, name) for name in names if name.endswith(INPUT_EXTENSIONS)]
+    return sorted(files)
+
+
+def _read_jsonl(path):
+    with open(path, encoding='utf-8') as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_notes(input_path, id_field=None, text_field=None):
+    """
+    Yield (note_id, patient_notes) tuples from the input files.
+
+    Without a text field, the whole record is the note, serialized as JSON like the Lambda request body.
+    Records without an ID are identified by their file and row number.
+    """
+    for path in list_input_files(input_path):
+        if path.endswith(".parquet"):
+            parquet_file = pq.ParquetFile(path)
+            columns = [field for field in (id_field, text_field) if field] if text_field else None
+            records = (record for batch in parquet_file.iter_batches(columns=columns) for record in batch.to_pylist())
+        else:
+            records = _read_jsonl(path)
+        for row, record in enumerate(records):
+            note_id = record.get(id_field) if id_field else None
+            note_id = str(note_id) if note_id is not None else f"{path}:{row}"
+            text = record.get(text_field) if text_field else record
+            yield note_id, text if isinstance(text, str) else json.dumps(text, default=str)
+
+
+class ResultWriter:
+    """
+    Buffers results and note index rows, and writes them as Parquet files under the output directory.
+
+    Results are written before the note index rows that reference them, and each file is renamed into place
+    once complete, so a crashed run leaves a consistent checkpoint.
+    """
+
+    def __init__(self, output_path, flush_rows=1000):
+        self.results_path = os.path.join(output_path, "results")
+        self.notes_path = os.path.join(output_path, "notes")
+        self.errors_path = os.path.join(output_path, "errors.jsonl")
+        os.makedirs(self.results_path, exist_ok=True)
+        os.makedirs(self.notes_path, exist_ok=True)
+        self.flush_rows = flush_rows
+        # Runs started in the same second must not overwrite each other's files
+        self.run_id = f"{datetime.datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.part = 0
+        self.results = []
+        self.notes = []
+
+    def load_checkpoint(self):
+        """
+        Return the note IDs and note hashes already written by previous runs.
+        """
+        def read_column(path, column):
+            files = [os.path.join(path, name) for name in os.listdir(path) if name.endswith(".parquet")]
+            return {value for file in files for value in pq.read_table(file, columns=[column]).column(column).to_pylist()}
+
+        return read_column(self.notes_path, "note_id"), read_column(self.results_path, "note_hash")
+
+    def add(self, result, note_ids):
+        if result is not None:
+            self.results.append(result)
+        self.notes += [{"note_id": note_id, "note_hash": hash_} for note_id, hash_ in note_ids]
+        if len(self.notes) >= self.flush_rows:
+            self.flush()
+
+    def add_error(self, note_hash_, note_ids, stage, error):
+        with open(self.errors_path, "a", encoding='utf-8') as errors:
+            errors.write(json.dumps({"note_hash": note_hash_, "note_ids": note_ids, "stage": stage, "error": error}) + "\n")
+
+    def _write(self, rows, schema, path):
+        file_name = f"part-{self.run_id}-{self.part:05d}.parquet"
+        temp_path = os.path.join(path, f".{file_name}.tmp")
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), temp_path)
+        os.replace(temp_path, os.path.join(path, file_name))
+
+    def flush(self):
+        if self.results:
+            self._write(self.results, RESULTS_SCHEMA, self.results_path)
+        if self.notes:
+            self._write(self.notes, NOTES_SCHEMA, self.notes_path)
+        if self.results or self.notes:
+            self.part += 1
+        self.results = []
+        self.notes = []
+
+
+class BatchPipeline:
+    """
+    Runs notes through the coding stages, with one bounded thread pool per kind of call and a limit on the
+    number of distinct notes in flight.
+    """
+
+    def __init__(self, backend, writer, comprehend_concurrency=8, llm_concurrency=8, kb_concurrency=8,
+                 max_in_flight=64):
+        self.backend = backend
+        self.writer = writer
+        self.pools = {
+            "comprehend_medical": ThreadPoolExecutor(comprehend_concurrency, thread_name_prefix="comprehend"),
+            "llm": ThreadPoolExecutor(llm_concurrency, thread_name_prefix="llm"),
+            "knowledge_base": ThreadPoolExecutor(kb_concurrency, thread_name_prefix="kb"),
+        }
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        # Notes leave the stage threads through this queue, everything else runs on the calling thread
+        self.completed = queue.Queue()
+        # Note IDs waiting for the result of each note hash in flight
+        self.pending = {}
+        self.done_hashes = set()
+        self.stats = {"notes": 0, "duplicates": 0, "skipped": 0, "processed": 0, "failed": 0}
+
+    def _submit(self, pool, job, stage, func, *args):
+        """
+        Run one stage of a note on a pool, then pass the job to the next stage.
+        """
+        def run():
+            start = time.perf_counter()
+            try:
+                output = func(*args)
+                job[f"{stage}_ms"] = round((time.perf_counter() - start) * 1000)
+                self._next_stage(job, stage, output)
+            except Exception as e:
+                self.completed.put((job, stage, f"{type(e).__name__}: {e}"))
+        self.pools[pool].submit(run)
+
+    def _next_stage(self, job, stage, output):
+        patient_notes = job["patient_notes"]
+        if stage == "comprehend_medical":
+            job["cm_output"] = output
+            prompt = processicd10code.process_llm_prompt_based_on_comprehend(patient_notes, output)
+            self._submit("llm", job, "llm_recommendation", self.backend.invoke_llm, prompt)
+        elif stage == "llm_recommendation":
+            job["recommendation"] = output
+            job["medical_conditions"] = processicd10code.process_output(output)
+            self._submit("knowledge_base", job, "knowledge_base", self.backend.knowledge_base, job["medical_conditions"])
+        elif stage == "knowledge_base":
+            prompt = processicd10code.process_llm_final_prompt(patient_notes, job["recommendation"], output)
+            self._submit("llm", job, "llm_final", self.backend.invoke_llm, prompt)
+        else:
+            job["final_response"] = output
+            self.completed.put((job, None, None))
+
+    def _drain(self, block=False):
+        """
+        Write the notes completed so far and free their in-flight slots.
+        """
+        while True:
+            try:
+                job, failed_stage, error = self.completed.get(block=block, timeout=1 if block else None)
+            except queue.Empty:
+                return
+            block = False
+            note_ids = self.pending.pop(job["note_hash"])
+            if error is None:
+                self.done_hashes.add(job["note_hash"])
+                result = {field: job.get(field) for field in RESULTS_SCHEMA.names}
+                result["cm_output"] = json.dumps(job["cm_output"])
+                self.writer.add(result, [(note_id, job["note_hash"]) for note_id in note_ids])
+                self.stats["processed"] += 1
+            else:
+                logger.warning(f"Note {note_ids[0]} failed in {failed_stage}: {error}")
+                self.writer.add_error(job["note_hash"], note_ids, failed_stage, error)
+                self.stats["failed"] += 1
+            self.in_flight.release()
+
+    def run(self, notes, done_note_ids=frozenset(), done_hashes=frozenset(), log_every=1000):
+        """
+        Process (note_id, patient_notes) tuples, skipping notes that are in the checkpoint.
+
+        Returns:
+            dict: Counts of notes read, duplicates, skipped, processed and failed notes.
+        """
+        self.done_hashes.update(done_hashes)
+        start = time.time()
+        for note_id, patient_notes in notes:
+            self.stats["notes"] += 1
+            if note_id in done_note_ids:
+                self.stats["skipped"] += 1
+                continue
+            hash_ = note_hash(patient_notes)
+            if hash_ in self.pending:
+                self.pending[hash_].append(note_id)
+                self.stats["duplicates"] += 1
+                continue
+            if hash_ in self.done_hashes:
+                self.writer.add(None, [(note_id, hash_)])
+                self.stats["duplicates"] += 1
+                continue
+
+            while not self.in_flight.acquire(timeout=0.1):
+                self._drain()
+            self.pending[hash_] = [note_id]
+            job = {"note_hash": hash_, "note_id": note_id, "patient_notes": patient_notes}
+            self._submit("comprehend_medical", job, "comprehend_medical", self.backend.comprehend_medical, patient_notes)
+            self._drain()
+
+            if self.stats["notes"] % log_every == 0:
+                self._log_progress(start)
+
+        while self.pending:
+            self._drain(block=True)
+        self.writer.flush()
+        for pool in self.pools.values():
+            pool.shutdown()
+        self._log_progress(start)
+        return self.stats
+
+    def _log_progress(self, start):
+        elapsed = time.time() - start
+        rate = self.stats["processed"] / elapsed if elapsed > 0 else 0
+        logger.info(f"{json.dumps(self.stats)} in {elapsed:.1f} seconds ({rate:.1f} distinct notes/sec)")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Code archives of patient notes with ICD-10 codes in batch')
+    parser.add_argument('--input', required=True, help='JSONL or Parquet file, or directory of them')
+    parser.add_argument('--output', required=True, help='Output directory, also used as the checkpoint')
+    parser.add_argument('--id-field', default=None, help='Field holding the note ID (default: file and row number)')
+    parser.add_argument('--text-field', default=None, help='Field holding the note (default: the whole record)')
+    parser.add_argument('--backend', choices=['aws', 'stub'], default='aws', help='Service backend (default: aws)')
+    parser.add_argument('--region', default=os.getenv('DefaultRegion', os.getenv('AWS_REGION', 'us-east-1')),
+                        help='AWS region of the Bedrock services')
+    parser.add_argument('--knowledge-base-id', default=None, help='Bedrock knowledge base ID (default: KnowledgeBaseId)')
+    parser.add_argument('--number-of-results', type=int, default=None,
+                        help='Knowledge base results per condition (default: NumberOfResults)')
+    parser.add_argument('--comprehend-concurrency', type=int, default=8, help='Concurrent Comprehend Medical calls')
+    parser.add_argument('--llm-concurrency', type=int, default=8, help='Concurrent LLM calls')
+    parser.add_argument('--kb-concurrency', type=int, default=8, help='Notes retrieving from the knowledge base at once')
+    parser.add_argument('--max-in-flight', type=int, default=64, help='Distinct notes in the pipeline at once')
+    parser.add_argument('--flush-rows', type=int, default=1000, help='Note rows per output file')
+    parser.add_argument('--stub-comprehend-latency', type=float, default=0.05, help='Stub Comprehend Medical latency (s)')
+    parser.add_argument('--stub-llm-latency', type=float, default=1.0, help='Stub LLM latency (s)')
+    parser.add_argument('--stub-kb-latency', type=float, default=0.1, help='Stub knowledge base latency (s)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    # The Lambda function logs every prompt at INFO on the root logger, which is too verbose for a backfill
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    if args.backend == 'stub':
+        backend = StubBackend(args.stub_comprehend_latency, args.stub_llm_latency, args.stub_kb_latency)
+    else:
+        backend = AwsBackend(args.region, args.knowledge_base_id, args.number_of_results)
+
+    writer = ResultWriter(args.output, args.flush_rows)
+    done_note_ids, done_hashes = writer.load_checkpoint()
+    if done_note_ids:
+        logger.info(f"Resuming after {len(done_note_ids)} notes ({len(done_hashes)} distinct) of previous runs")
+
+    pipeline = BatchPipeline(backend, writer, args.comprehend_concurrency, args.llm_concurrency,
+                             args.kb_concurrency, args.max_in_flight)
+    stats = pipeline.run(read_notes(args.input, args.id_field, args.text_field), done_note_ids, done_hashes)
+    logger.info(f"Batch completed: {json.dumps(stats)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,15 +10,24 @@ class BedrockClient:
     CLAUDE_3_SONNET = "anthropic.claude-3-sonnet-20240229-v1:0"
     CLAUDE_3_HAIKU = "anthropic.claude-3-haiku-20240307-v1:0"
 
-    def __init__(self, region_name: str):
+    # Connections kept per client, enough for the concurrent knowledge base retrievals of a note
+    MAX_POOL_CONNECTIONS = 32
+
+    def __init__(self, region_name: str, max_pool_connections: int = MAX_POOL_CONNECTIONS):
         """
         Initialize the BedrockClient instance.
 
+        Clients are created once and reused, so their connections are pooled across calls.
+
         Args:
             region_name (str): The AWS region where the Bedrock services are located.
+            max_pool_connections (int): The maximum number of connections kept by each client.
         """
         self.region = region_name
+        self.max_pool_connections = max_pool_connections
         self.session = boto3.Session(region_name=region_name)
+        self._bedrock_client = None
+        self._bedrock_agent_client = None
 
     def get_bedrock_client(self):
         """
@@ -27,9 +36,11 @@ class BedrockClient:
         Returns:
             botocore.client.BaseClient: A Boto3 client for the Bedrock Runtime service.
         """
-        # Create a Boto3 client for the Bedrock Runtime service
-        client = self.session.client('bedrock-runtime')
-        return client
+        # Create a Boto3 client for the Bedrock Runtime service on first use
+        if self._bedrock_client is None:
+            self._bedrock_client = self.session.client(
+                'bedrock-runtime', config=Config(max_pool_connections=self.max_pool_connections))
+        return self._bedrock_client
 
     def get_bedrock_agent_client(self):
         """
@@ -38,9 +49,11 @@ class BedrockClient:
         Returns:
             botocore.client.BaseClient: A Boto3 client for the Bedrock Agent Runtime service.
         """
-        # Configure the client with increased timeouts and no retries
-        bedrock_config = Config(connect_timeout=120, read_timeout=120, retries={'max_attempts': 0})
-
-        # Create a Boto3 client for the Bedrock Agent Runtime service with the custom configuration
-        bedrock_agent_client = self.session.client("bedrock-agent-runtime", config=bedrock_config, region_name=self.region)
-        return bedrock_agent_client
\ No newline at end of file
+        if self._bedrock_agent_client is None:
+            # Configure the client with increased timeouts and no retries
+            bedrock_config = Config(connect_timeout=120, read_timeout=120, retries={'max_attempts': 0},
+                                    max_pool_connections=self.max_pool_connections)
+
+            # Create a Boto3 client for the Bedrock Agent Runtime service with the custom configuration
+            self._bedrock_agent_client = self.session.client("bedrock-agent-runtime", config=bedrock_config, region_name=self.region)
+        return self._bedrock_agent_client
\ No newline at end of file
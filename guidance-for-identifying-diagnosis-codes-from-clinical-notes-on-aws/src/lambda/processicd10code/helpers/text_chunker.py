@@ -0,0 +1,90 @@
+import re
+
+# Sentence ends, or line breaks, followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?;:])\s+|\n\s*')
+
+
+def _byte_length(text):
+    return len(text.encode('utf-8'))
+
+
+def _split_long_sentence(sentence, start, max_bytes):
+    """
+    Split a sentence longer than max_bytes on whitespace, or on character boundaries if a single word is too long.
+
+    Args:
+        sentence (str): The sentence to split.
+        start (int): The character offset of the sentence in the original text.
+        max_bytes (int): The maximum UTF-8 size of a piece.
+
+    Returns:
+        list: A list of (offset, text) tuples.
+    """
+    pieces = []
+    piece_start = 0
+    last_space = -1
+    size = 0
+    for index, char in enumerate(sentence):
+        char_size = _byte_length(char)
+        if size + char_size > max_bytes:
+            cut = last_space + 1 if last_space >= piece_start else index
+            pieces.append((start + piece_start, sentence[piece_start:cut]))
+            piece_start = cut
+            size = _byte_length(sentence[piece_start:index])
+        if char.isspace():
+            last_space = index
+        size += char_size
+    if piece_start < len(sentence):
+        pieces.append((start + piece_start, sentence[piece_start:]))
+    return pieces
+
+
+def split_into_chunks(text, max_bytes):
+    """
+    Split text into chunks of at most max_bytes UTF-8 bytes, ending chunks at sentence boundaries where possible.
+
+    Chunks are contiguous slices of the original text, so an entity offset within a chunk maps back to the
+    original text by adding the chunk offset.
+
+    Args:
+        text (str): The text to split.
+        max_bytes (int): The maximum UTF-8 size of a chunk.
+
+    Returns:
+        list: A list of (offset, chunk) tuples, where offset is the character offset of the chunk in the text.
+    """
+    if _byte_length(text) <= max_bytes:
+        return [(0, text)]
+
+    # Sentences keep their trailing whitespace so that chunks cover the whole text
+    sentences = []
+    sentence_start = 0
+    for match in SENTENCE_BOUNDARY.finditer(text):
+        if match.end() > sentence_start:
+            sentences.append((sentence_start, text[sentence_start:match.end()]))
+            sentence_start = match.end()
+    if sentence_start < len(text):
+        sentences.append((sentence_start, text[sentence_start:]))
+
+    chunks = []
+    chunk_start = None
+    chunk_size = 0
+    chunk_end = 0
+    for start, sentence in sentences:
+        size = _byte_length(sentence)
+        if chunk_start is not None and chunk_size + size > max_bytes:
+            chunks.append((chunk_start, text[chunk_start:chunk_end]))
+            chunk_start = None
+            chunk_size = 0
+        if size > max_bytes:
+            chunks.extend(_split_long_sentence(sentence, start, max_bytes))
+            continue
+        if chunk_start is None:
+            chunk_start = start
+        chunk_size += size
+        chunk_end = start + len(sentence)
+    if chunk_start is not None:
+        chunks.append((chunk_start, text[chunk_start:chunk_end]))
+
+    # Chunks of only whitespace have nothing to extract
+    return [(offset, chunk) for offset, chunk in chunks if chunk.strip()]
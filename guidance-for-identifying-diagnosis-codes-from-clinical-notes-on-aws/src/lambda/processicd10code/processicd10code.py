@@ -2,15 +2,102 @@ import boto3
 import json
 import re
 import os
+import time
 import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from botocore.client import Config
 from helpers.bedrock_client import BedrockClient
 from helpers.prompt import Prompt
+from helpers.text_chunker import split_into_chunks
 
 # Set up the logger
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# InferICD10CM accepts at most 10,000 UTF-8 bytes of text per request
+COMPREHEND_MEDICAL_MAX_BYTES = 10000
+# Concurrent Comprehend Medical and knowledge base requests per note
+MAX_CONCURRENT_REQUESTS = int(os.getenv('MaxConcurrentRequests', '16'))
+# Knowledge base results kept per medical condition, shared by the invocations of a warm Lambda container
+KB_CACHE_SIZE = int(os.getenv('KnowledgeBaseCacheSize', '1024'))
+
+# Clients are created once per Lambda container and reused by all invocations
+_comprehend_med_client = None
+_bedrock_clients = {}
+_kb_cache = OrderedDict()
+_kb_cache_lock = threading.Lock()
+
+
+def get_comprehend_medical_client():
+    """
+    Get the shared AWS Comprehend Medical client.
+
+    Returns:
+        botocore.client.BaseClient: A Boto3 client for the Comprehend Medical service.
+    """
+    global _comprehend_med_client
+    if _comprehend_med_client is None:
+        _comprehend_med_client = boto3.client('comprehendmedical', config=Config(max_pool_connections=MAX_CONCURRENT_REQUESTS))
+    return _comprehend_med_client
+
+
+def get_bedrock_client(region_name):
+    """
+    Get the shared BedrockClient for a region.
+
+    Args:
+        region_name (str): The AWS region where the Bedrock services are located.
+
+    Returns:
+        BedrockClient: The Bedrock client instance.
+    """
+    if region_name not in _bedrock_clients:
+        _bedrock_clients[region_name] = BedrockClient(region_name=region_name, max_pool_connections=MAX_CONCURRENT_REQUESTS)
+    return _bedrock_clients[region_name]
+
+
+def _shift_offsets(item, offset):
+    """
+    Shift the BeginOffset and EndOffset of a Comprehend Medical entity and its attributes by offset.
+    """
+    for key in ('BeginOffset', 'EndOffset'):
+        if key in item:
+            item[key] += offset
+    for attribute in item.get('Attributes', []):
+        _shift_offsets(attribute, offset)
+
+
+def infer_icd10_cm_entities(patient_notes):
+    """
+    Call InferICD10CM on the patient's notes, splitting notes over the service text limit at sentence boundaries.
+
+    Chunks are sent concurrently and entity offsets are mapped back to offsets in the whole note.
+
+    Args:
+        patient_notes (str): The patient's notes to be processed.
+
+    Returns:
+        list: The Comprehend Medical entities of the whole note, in order of appearance.
+    """
+    comprehend_med = get_comprehend_medical_client()
+    chunks = split_into_chunks(patient_notes, COMPREHEND_MEDICAL_MAX_BYTES)
+
+    def infer_chunk(chunk):
+        offset, text = chunk
+        entities = comprehend_med.infer_icd10_cm(Text=text)["Entities"]
+        for entity in entities:
+            _shift_offsets(entity, offset)
+        return entities
+
+    if len(chunks) == 1:
+        return infer_chunk(chunks[0])
+
+    logger.info(f'Sending the note to Comprehend Medical in {len(chunks)} chunks')
+    with ThreadPoolExecutor(max_workers=min(len(chunks), MAX_CONCURRENT_REQUESTS)) as executor:
+        return [entity for entities in executor.map(infer_chunk, chunks) for entity in entities]
+
 # Function to process patient notes with AWS Comprehend Medical
 def process_patient_notes_with_comprehendMedical(patient_notes):
     """
@@ -22,16 +109,12 @@ def process_patient_notes_with_comprehendMedical(patient_notes):
     Returns:
         list: A list of dictionaries containing the extracted text, category, and ICD-10-CM concepts.
     """
-    # Initialize AWS Comprehend Medical client
-    comprehend_med = boto3.client('comprehendmedical')
-
     # Call the infer_icd10_cm method to extract ICD-10-CM codes
-    cm_response = comprehend_med.infer_icd10_cm(Text=patient_notes)
+    response_entities = infer_icd10_cm_entities(patient_notes)
     cm_output = []
     cm_threshold = 0.70
 
     # Process the response entities
-    response_entities = cm_response["Entities"]
     for entity in response_entities:
         cm_text = entity["Text"]
         cm_category = entity["Category"]
@@ -201,13 +284,20 @@ def fetch_results_from_knowledge_base(bedrockClient, medical_conditions):
     """
     numberOfResults = int(os.getenv('NumberOfResults'))
     knowledgeBaseId = os.getenv('KnowledgeBaseId')
-    kb_output = []
+    # Create the client before starting threads, it is then shared by all retrievals
+    bedrock_agent_client = bedrockClient.get_bedrock_agent_client()
+
+    def retrieve(medical_condition):
+        cache_key = (knowledgeBaseId, numberOfResults, medical_condition.strip().lower())
+        with _kb_cache_lock:
+            if cache_key in _kb_cache:
+                _kb_cache.move_to_end(cache_key)
+                return _kb_cache[cache_key]
 
-    for medical_condition in medical_conditions:
         query = "Find all the information about " + medical_condition
 
         # Call the knowledge base API
-        kb_response = bedrockClient.get_bedrock_agent_client().retrieve(
+        kb_response = bedrock_agent_client.retrieve(
             retrievalQuery={
                 'text': query
             },
@@ -219,9 +309,24 @@ def fetch_results_from_knowledge_base(bedrockClient, medical_conditions):
             }
         )
 
+        with _kb_cache_lock:
+            _kb_cache[cache_key] = kb_response['retrievalResults']
+            if len(_kb_cache) > KB_CACHE_SIZE:
+                _kb_cache.popitem(last=False)
+        return kb_response['retrievalResults']
+
+    # Retrieve each distinct condition once, concurrently
+    unique_conditions = list(dict.fromkeys(medical_conditions))
+    if not unique_conditions:
+        return []
+    with ThreadPoolExecutor(max_workers=min(len(unique_conditions), MAX_CONCURRENT_REQUESTS)) as executor:
+        kb_results = dict(zip(unique_conditions, executor.map(retrieve, unique_conditions)))
+
+    kb_output = []
+    for medical_condition in medical_conditions:
         kb_output.append({
             'mdeical_condition': medical_condition,
-            'kb_context': kb_response['retrievalResults']
+            'kb_context': kb_results[medical_condition]
         })
 
     return kb_output
@@ -244,11 +349,14 @@ def lambda_handler(event, context):
 
     patient_notes = event['body']
 
-    # Initialize the Bedrock client
-    bedrockClient = BedrockClient(region_name=defaultRegion)
+    # Get the shared Bedrock client
+    bedrockClient = get_bedrock_client(defaultRegion)
+    stage_latency_ms = {}
 
     # Call Comprehend Medical to get ICD-10-CM codes from patient notes
+    stage_start = time.perf_counter()
     cm_response = process_patient_notes_with_comprehendMedical(patient_notes)
+    stage_latency_ms['comprehend_medical'] = round((time.perf_counter() - stage_start) * 1000)
     logger.info(f'Comprehend Medical response: {cm_response}')
 
     # Generate the LLM prompt based on Comprehend Medical output
@@ -257,7 +365,9 @@ def lambda_handler(event, context):
 
     # Call the LLM model
     logger.info('-----Calling LLM with Comprehend Medical results-----')
+    stage_start = time.perf_counter()
     response = llm_processing(bedrockClient, prompt)
+    stage_latency_ms['llm_recommendation'] = round((time.perf_counter() - stage_start) * 1000)
     logger.info(f'LLM response with Comprehend Medical input: {response}')
     
     # Extract medical conditions from the LLM response
@@ -265,7 +375,9 @@ def lambda_handler(event, context):
     logger.info(f'Medical conditions: {medical_conditions}')
 
     # Fetch results from the knowledge base
+    stage_start = time.perf_counter()
     kb_output = fetch_results_from_knowledge_base(bedrockClient, medical_conditions)
+    stage_latency_ms['knowledge_base'] = round((time.perf_counter() - stage_start) * 1000)
     logger.info(f'KB output: {kb_output}')
 
     # Generate the final LLM prompt
@@ -274,8 +386,11 @@ def lambda_handler(event, context):
 
     # Call the LLM model with the final prompt
     logger.info('-----Calling LLM with final prompt-----')
+    stage_start = time.perf_counter()
     final_response = llm_processing(bedrockClient, final_prompt)
+    stage_latency_ms['llm_final'] = round((time.perf_counter() - stage_start) * 1000)
     logger.info(f'Final LLM response: {final_response}')
+    logger.info(f'Stage latency (ms) for {len(medical_conditions)} medical conditions: {json.dumps(stage_latency_ms)}')
     
     return {
         'statusCode': 200,
@@ -0,0 +1,94 @@
+import json
+
+import pyarrow.parquet as pq
+
+from batch_pipeline import BatchPipeline, ResultWriter, StubBackend, read_notes
+
+NOTES = [
+    {"id": "1", "text": "Patient with hypertension and obesity."},
+    {"id": "2", "text": "Follow up for asthma."},
+    {"id": "3", "text": "Patient with hypertension and obesity."},
+    {"id": "4", "text": "Rash on the left forearm."},
+]
+
+
+class FailingBackend(StubBackend):
+    """A stub backend whose knowledge base fails for notes about a rash."""
+
+    def knowledge_base(self, medical_conditions):
+        if "rash" in medical_conditions:
+            raise RuntimeError("ThrottlingException")
+        return super().knowledge_base(medical_conditions)
+
+
+def write_notes(path, notes):
+    with open(path, "w", encoding='utf-8') as lines:
+        for note in notes:
+            lines.write(json.dumps(note) + "\n")
+
+
+def run_pipeline(input_path, output_path, backend=None):
+    writer = ResultWriter(str(output_path), flush_rows=2)
+    done_note_ids, done_hashes = writer.load_checkpoint()
+    pipeline = BatchPipeline(backend or StubBackend(0, 0, 0), writer, max_in_flight=2)
+    return pipeline.run(read_notes(str(input_path), "id", "text"), done_note_ids, done_hashes)
+
+
+def read_rows(path):
+    return pq.read_table(str(path)).to_pylist()
+
+
+def test_read_notes_from_jsonl(tmp_path):
+    write_notes(tmp_path / "notes.jsonl", [{"id": 7, "text": "Asthma."}, {"text": "Rash."}])
+    notes = list(read_notes(str(tmp_path), "id", "text"))
+    assert notes == [("7", "Asthma."), (f"{tmp_path / 'notes.jsonl'}:1", "Rash.")]
+
+
+def test_read_notes_without_text_field_serializes_the_record(tmp_path):
+    write_notes(tmp_path / "notes.jsonl", [{"id": "1", "note": "Asthma."}])
+    assert list(read_notes(str(tmp_path / "notes.jsonl"), "id")) == [("1", json.dumps({"id": "1", "note": "Asthma."}))]
+
+
+def test_duplicate_notes_are_processed_once(tmp_path):
+    write_notes(tmp_path / "notes.jsonl", NOTES)
+    stats = run_pipeline(tmp_path / "notes.jsonl", tmp_path / "output")
+
+    assert stats == {"notes": 4, "duplicates": 1, "skipped": 0, "processed": 3, "failed": 0}
+    results = read_rows(tmp_path / "output" / "results")
+    notes = read_rows(tmp_path / "output" / "notes")
+    assert len(results) == 3
+    assert sorted(note["note_id"] for note in notes) == ["1", "2", "3", "4"]
+    hashes = {note["note_id"]: note["note_hash"] for note in notes}
+    assert hashes["1"] == hashes["3"]
+    assert {result["note_hash"] for result in results} == set(hashes.values())
+    result = next(result for result in results if result["note_hash"] == hashes["1"])
+    assert sorted(result["medical_conditions"]) == ["hypertension", "obesity"]
+    assert result["final_response"]
+
+
+def test_rerun_resumes_from_the_checkpoint(tmp_path):
+    write_notes(tmp_path / "notes.jsonl", NOTES[:2])
+    run_pipeline(tmp_path / "notes.jsonl", tmp_path / "output")
+    write_notes(tmp_path / "notes.jsonl", NOTES)
+
+    stats = run_pipeline(tmp_path / "notes.jsonl", tmp_path / "output")
+
+    # Note 3 has the content of note 1, so only note 4 is sent to the services
+    assert stats == {"notes": 4, "duplicates": 1, "skipped": 2, "processed": 1, "failed": 0}
+    assert len(read_rows(tmp_path / "output" / "results")) == 3
+    assert len(read_rows(tmp_path / "output" / "notes")) == 4
+
+
+def test_failed_notes_are_logged_and_retried(tmp_path):
+    write_notes(tmp_path / "notes.jsonl", NOTES)
+    stats = run_pipeline(tmp_path / "notes.jsonl", tmp_path / "output", FailingBackend(0, 0, 0))
+
+    assert stats["processed"] == 2
+    assert stats["failed"] == 1
+    with open(tmp_path / "output" / "errors.jsonl", encoding='utf-8') as errors:
+        error = json.loads(errors.readline())
+    assert error["note_ids"] == ["4"]
+    assert error["stage"] == "knowledge_base"
+
+    stats = run_pipeline(tmp_path / "notes.jsonl", tmp_path / "output")
+    assert stats == {"notes": 4, "duplicates": 0, "skipped": 3, "processed": 1, "failed": 0}
@@ -0,0 +1,92 @@
+import processicd10code
+from helpers.text_chunker import split_into_chunks
+
+NOTE = (
+    "Patient presents with hypertension. History of type 2 diabetes; well controlled.\n"
+    "Plan: continue metformin. Follow up in three months!"
+)
+
+
+def assert_chunks_cover(text, chunks, max_bytes):
+    for offset, chunk in chunks:
+        assert text[offset:offset + len(chunk)] == chunk
+        assert len(chunk.encode('utf-8')) <= max_bytes
+    # Only whitespace is left out between chunks
+    end = 0
+    for offset, chunk in chunks:
+        assert not text[end:offset].strip()
+        end = offset + len(chunk)
+    assert not text[end:].strip()
+
+
+def test_short_text_is_a_single_chunk():
+    assert split_into_chunks(NOTE, 10000) == [(0, NOTE)]
+
+
+def test_chunks_end_at_sentence_boundaries():
+    chunks = split_into_chunks(NOTE, 90)
+    assert_chunks_cover(NOTE, chunks, 90)
+    assert len(chunks) > 1
+    for _, chunk in chunks[:-1]:
+        assert chunk.rstrip()[-1] in ".!?;:"
+
+
+def test_chunk_size_is_measured_in_utf8_bytes():
+    text = "Patiënt klaagt over hoofdpijn en duizeligheid. " * 40 + "Geen koorts. " * 40
+    chunks = split_into_chunks(text, 200)
+    assert_chunks_cover(text, chunks, 200)
+    assert any(len(chunk) < len(chunk.encode('utf-8')) for _, chunk in chunks)
+
+
+def test_long_sentence_is_split_on_whitespace():
+    text = " ".join(["hypertension"] * 50)
+    chunks = split_into_chunks(text, 100)
+    assert_chunks_cover(text, chunks, 100)
+    assert all(word == "hypertension" for _, chunk in chunks for word in chunk.split())
+
+
+def test_long_word_is_split_on_characters():
+    text = "é" * 100
+    chunks = split_into_chunks(text, 25)
+    assert_chunks_cover(text, chunks, 25)
+    assert "".join(chunk for _, chunk in chunks) == text
+
+
+class FakeComprehendMedical:
+    """Finds every occurrence of a term in the text it is sent, like InferICD10CM with one entity per match."""
+
+    def __init__(self, term):
+        self.term = term
+        self.texts = []
+
+    def infer_icd10_cm(self, Text):
+        self.texts.append(Text)
+        entities = []
+        begin = Text.find(self.term)
+        while begin >= 0:
+            end = begin + len(self.term)
+            entities.append({
+                'Text': self.term,
+                'BeginOffset': begin,
+                'EndOffset': end,
+                'Attributes': [{'Text': self.term, 'BeginOffset': begin, 'EndOffset': end}],
+            })
+            begin = Text.find(self.term, end)
+        return {"Entities": entities}
+
+
+def test_entity_offsets_are_mapped_back_to_the_whole_note(monkeypatch):
+    client = FakeComprehendMedical("hypertension")
+    monkeypatch.setattr(processicd10code, "_comprehend_med_client", client)
+    monkeypatch.setattr(processicd10code, "COMPREHEND_MEDICAL_MAX_BYTES", 100)
+    note = "Patient has a history of hypertension and asthma. " * 10
+
+    entities = processicd10code.infer_icd10_cm_entities(note)
+
+    assert len(client.texts) > 1
+    assert len(entities) == 10
+    for entity in entities:
+        assert note[entity['BeginOffset']:entity['EndOffset']] == "hypertension"
+        attribute = entity['Attributes'][0]
+        assert note[attribute['BeginOffset']:attribute['EndOffset']] == "hypertension"
+    assert [entity['BeginOffset'] for entity in entities] == sorted(entity['BeginOffset'] for entity in entities)
@@ -46,31 +46,22 @@ class DocumentAnalyzer:
         # Process and save results
         return await self._process_and_save_results(content_text, file_key)
 
-    async def get_verifications(self):
-        """Retrieve all verifications"""
+    async def get_verifications(self, limit=None, cursor=None):
+        """Retrieve one page of verifications with a cursor for the next page"""
         try:
-            self.logger.info("Calling db_service.get_verifications()")
-            raw_verifications = await self.db_service.get_verifications()
-
-            self.logger.info(f"Raw verifications type: {type(raw_verifications)}")
-            self.logger.info(f"Raw verifications value: {raw_verifications}")
-
-            # Handle case where get_verifications returns None
-            if raw_verifications is None:
-                self.logger.warning("No verifications found, returning empty list")
-                return []
-
-            result = []
-            for verification in raw_verifications:
-                self.logger.info(f"Processing verification: {verification}")
-                processed = self._process_verification(verification)
-                result.append(processed)
-
-            return result
+            page_kwargs = {'cursor': cursor}
+            if limit is not None:
+                page_kwargs['limit'] = limit
+            # Items already carry a float confidence and a preview URL
+            page = await self.db_service.get_verifications(**page_kwargs)
+            self.logger.info(f"Retrieved {len(page['items'])} verifications")
+            return page
+        except ValueError:
+            raise
         except Exception as e:
             self.logger.error(f"Error in get_verifications: {str(e)}", exc_info=True)
-            # Return empty list on error to avoid breaking the API
-            return []
+            # Return empty page on error to avoid breaking the API
+            return {'items': [], 'next_cursor': None}
 
     async def get_verification(self, verification_id: str):
         """Retrieve specific verification"""
@@ -81,7 +72,7 @@ class DocumentAnalyzer:
 
     async def _get_inference_configs(self):
         """Get and process inference configurations"""
-        configs = await self.db_service.get_configurations('INFERENCE_PARAMS')
+        configs = await self.db_service.get_cached_configurations('INFERENCE_PARAMS')
         if not configs:
             # Return default values if no configurations found
             return {
@@ -12,7 +12,9 @@ import logging
 from .s3 import S3Service
 from botocore.exceptions import ClientError
 import uuid
+import time
 from .models import Configuration
+from .utils import encode_cursor, decode_cursor, backfill_attribute
 from functools import lru_cache
 
 # Configure logging
@@ -22,6 +24,21 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Verifications are listed newest first through a sparse index keyed on a constant entity type
+VERIFICATION_ENTITY_TYPE = 'VERIFICATION'
+VERIFICATIONS_INDEX_NAME = 'entity_type-timestamp-index'
+VERIFICATION_LIST_ATTRIBUTES = ['pk', 'timestamp', 'document_type', 'confidence', 'file_key']
+# Must match the index of the agent table in iac/api/dynamodb_tables/locals.tf
+VERIFICATIONS_INDEX_NON_KEY_ATTRIBUTES = ['document_type', 'confidence', 'file_key']
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# The active prompt and model are read through a pointer item in the configs table. Every
+# prompt or configuration write bumps its version, which invalidates cached configuration
+# in all containers within FDP_CONFIG_CACHE_TTL seconds.
+CONFIG_POINTER_KEY = {'pk': 'ACTIVE_CONFIG', 'sk': 'POINTER'}
+CONFIG_CACHE_TTL = float(os.getenv('FDP_CONFIG_CACHE_TTL', '5'))
+
 class DynamoDBService:
     def __init__(self):
         self.dynamodb = boto3.resource('dynamodb')
@@ -29,6 +46,7 @@ class DynamoDBService:
         self.agent_table_name = os.getenv('FDP_DDB_AGENT')
         self.prompts_table_name = os.getenv('FDP_DDB_PROMPT')
         self.configs_table_name = os.getenv('FDP_DDB_CONFIG')
+        self.verifications_index_active = False
 
         if not self.s3_bucket_name:
             raise ValueError("FDP_S3_BUCKET environment variable is not set")
@@ -47,6 +65,12 @@ class DynamoDBService:
             table = self.dynamodb.Table(self.agent_table_name)
             table.load()
             logger.info(f"Table exists: {self.agent_table_name}")
+            self.verifications_index_active = any(
+                index['IndexName'] == VERIFICATIONS_INDEX_NAME and index.get('IndexStatus') == 'ACTIVE'
+                for index in table.global_secondary_indexes or []
+            )
+            if not self.verifications_index_active:
+                logger.warning(f"Index {VERIFICATIONS_INDEX_NAME} is not active, verifications will be scanned")
             return table
         except ClientError as e:
             if e.response['Error']['Code'] == 'ResourceNotFoundException':
@@ -63,6 +87,33 @@ class DynamoDBService:
                         {
                             'AttributeName': 'pk',
                             'AttributeType': 'S'
+                        },
+                        {
+                            'AttributeName': 'entity_type',
+                            'AttributeType': 'S'
+                        },
+                        {
+                            'AttributeName': 'timestamp',
+                            'AttributeType': 'S'
+                        }
+                    ],
+                    GlobalSecondaryIndexes=[
+                        {
+                            'IndexName': VERIFICATIONS_INDEX_NAME,
+                            'KeySchema': [
+                                {
+                                    'AttributeName': 'entity_type',
+                                    'KeyType': 'HASH'
+                                },
+                                {
+                                    'AttributeName': 'timestamp',
+                                    'KeyType': 'RANGE'
+                                }
+                            ],
+                            'Projection': {
+                                'ProjectionType': 'INCLUDE',
+                                'NonKeyAttributes': VERIFICATIONS_INDEX_NON_KEY_ATTRIBUTES
+                            }
                         }
                     ],
                     BillingMode='PAY_PER_REQUEST'
@@ -70,6 +121,7 @@ class DynamoDBService:
 
                 table.meta.client.get_waiter('table_exists').wait(TableName=self.agent_table_name)
                 logger.info(f"Table created successfully: {self.agent_table_name}")
+                self.verifications_index_active = True
                 return table
             else:
                 logger.error(f"Error checking/creating table: {repr(e)}")
@@ -235,6 +287,7 @@ class DynamoDBService:
                     config['created_at'] = current_time
                     config['updated_at'] = current_time
                     batch.put_item(Item=config)
+            self._set_config_pointer(active_model_sk='LITE')
 
             logger.info("Default configurations initialized successfully")
         except Exception as e:
@@ -253,6 +306,7 @@ class DynamoDBService:
             # Create item for DynamoDB
             item = {
                 'pk': verification_data.get('pk'),
+                'entity_type': VERIFICATION_ENTITY_TYPE,
                 'timestamp': timestamp,
                 'document_type': verification_data.get('document_type'),
                 'confidence': confidence,
@@ -283,33 +337,50 @@ class DynamoDBService:
             logger.error(f"Error saving verification: {repr(e)}")
             raise
 
-    async def get_verifications(self) -> List[Dict]:
-        """Get all verifications with pagination support"""
-        try:
-            logger.info(f"Scanning table: {self.agent_table_name}")
-            items = []
-            last_evaluated_key = None
-
-            while True:
-                scan_kwargs = {}
-                if last_evaluated_key:
-                    scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+    def backfill_verification_entity_type(self) -> int:
+        """Add entity_type to verifications saved before the index existed, so it lists them"""
+        logger.info(f"Backfilling entity_type in table: {self.agent_table_name}")
+        updated = backfill_attribute(self.verifications_table, 'entity_type', VERIFICATION_ENTITY_TYPE)
+        logger.info(f"Backfilled entity_type of {updated} verifications")
+        return updated
 
-                response = self.verifications_table.scan(**scan_kwargs)
-                items.extend(response.get('Items', []))
+    async def get_verifications(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict:
+        """Get one page of verifications, newest first, without the analysis text
 
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
+        Returns a dict with the page 'items' and a 'next_cursor' to pass back for the
+        following page, or None when there are no more verifications.
+        """
+        try:
+            page_kwargs = {
+                'Limit': max(1, min(int(limit), MAX_PAGE_SIZE)),
+                'ProjectionExpression': ', '.join(f"#{name}" for name in VERIFICATION_LIST_ATTRIBUTES),
+                'ExpressionAttributeNames': {f"#{name}": name for name in VERIFICATION_LIST_ATTRIBUTES}
+            }
+            exclusive_start_key = decode_cursor(cursor)
+            if exclusive_start_key:
+                page_kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+            if self.verifications_index_active:
+                logger.info(f"Querying index {VERIFICATIONS_INDEX_NAME} of table: {self.agent_table_name}")
+                response = self.verifications_table.query(
+                    IndexName=VERIFICATIONS_INDEX_NAME,
+                    KeyConditionExpression='entity_type = :entity_type',
+                    ExpressionAttributeValues={':entity_type': VERIFICATION_ENTITY_TYPE},
+                    ScanIndexForward=False,
+                    **page_kwargs
+                )
+            else:
+                # Tables without the index are paged in storage order instead
+                logger.info(f"Scanning table: {self.agent_table_name}")
+                response = self.verifications_table.scan(**page_kwargs)
 
             processed_items = []
-            for item in items:
+            for item in response.get('Items', []):
                 processed_item = {
                     'pk': item.get('pk'),
                     'timestamp': item.get('timestamp'),
                     'document_type': item.get('document_type'),
                     'confidence': float(item.get('confidence', 0)),
-                    'content_text': item.get('content_text', ''),
                     'file_key': item.get('file_key'),
                     'preview_url': None
                 }
@@ -317,15 +388,18 @@ class DynamoDBService:
                 if processed_item['file_key']:
                     try:
                         processed_item['preview_url'] = self.s3_service.get_presigned_url(
-                            processed_item['file_key']
+                            processed_item['file_key'], check_exists=False
                         )
                     except Exception as e:
                         logger.error(f"Error generating preview URL: {repr(e)}")
 
                 processed_items.append(processed_item)
-            
+
             logger.info(f"Processed {len(processed_items)} verifications")
-            return processed_items
+            return {
+                'items': processed_items,
+                'next_cursor': encode_cursor(response.get('LastEvaluatedKey'))
+            }
 
         except Exception as e:
             logger.error(f"Error in get_verifications: {repr(e)}", exc_info=True)
@@ -358,6 +432,7 @@ class DynamoDBService:
                 prompt['updated_at'] = datetime.now(timezone.utc).isoformat()
                 # Direct put_item without conditional expression
                 self.prompts_table.put_item(Item=prompt)
+                self._clear_config_pointer('active_prompt_id', prompt_id)
                 logger.info(f"Successfully deactivated prompt {prompt_id}")
         except Exception as e:
             logger.error(f"Error deactivating prompt: {repr(e)}")
@@ -445,6 +520,8 @@ class DynamoDBService:
                 Item=item,
                 ConditionExpression='attribute_not_exists(pk)'
             )
+            if item['is_active']:
+                self._set_config_pointer(active_prompt_id=item['pk'])
             return item
         except ClientError as e:
             if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
@@ -470,6 +547,10 @@ class DynamoDBService:
 
             logger.info(f"Updating prompt without locking, id: {item['pk']}")
             self.prompts_table.put_item(Item=item)
+            if item['is_active']:
+                self._set_config_pointer(active_prompt_id=item['pk'])
+            else:
+                self._clear_config_pointer('active_prompt_id', item['pk'])
             return item
         except Exception as e:
             logger.error(f"Error updating prompt without locking: {repr(e)}")
@@ -483,6 +564,7 @@ class DynamoDBService:
                 Key={'pk': prompt_id},
                 ConditionExpression='attribute_exists(pk)'
             )
+            self._clear_config_pointer('active_prompt_id', prompt_id)
         except ClientError as e:
             if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
                 raise ValueError("Prompt does not exist")
@@ -492,44 +574,47 @@ class DynamoDBService:
             logger.error(f"Error deleting prompt: {repr(e)}")
             raise
 
-    # Cache for active prompt (store the result, not the coroutine)
-    _active_prompt_cache = None
-    _active_prompt_timestamp = None
-    
     async def get_active_prompt(self):
-        """Get the currently active prompt with caching"""
-        # Simple time-based cache (30 seconds)
-        current_time = datetime.now(timezone.utc)
-        if (self._active_prompt_cache is not None and 
-            self._active_prompt_timestamp is not None and
-            (current_time - self._active_prompt_timestamp).total_seconds() < 30):
-            return self._active_prompt_cache
-            
+        """Get the currently active prompt through the configuration pointer"""
         try:
-            response = self.prompts_table.scan(
-                FilterExpression='is_active = :true',
-                ExpressionAttributeValues={':true': True}
-            )
+            pointer = self._get_config_pointer()
+            cache_key = ('active_prompt', pointer.get('version'))
+            if cache_key in DynamoDBService._config_cache:
+                return DynamoDBService._config_cache[cache_key]
+
+            if 'active_prompt_id' in pointer:
+                prompt_id = pointer['active_prompt_id']
+                prompt = await self.get_prompt(prompt_id) if prompt_id else None
+            else:
+                prompt = self._find_active_prompt()
+                self._set_config_pointer(bootstrap=True, active_prompt_id=prompt['pk'] if prompt else '')
 
-            items = response.get('Items', [])
-            if not items:
+            if not prompt:
                 logger.warning("No active prompt found")
-                self._active_prompt_cache = None
-                self._active_prompt_timestamp = current_time
-                return None
-            
-            if len(items) > 1:
-                logger.warning("Multiple active prompts found, using the first one")
-
-            # Update cache
-            self._active_prompt_cache = items[0]
-            self._active_prompt_timestamp = current_time
-            
-            return items[0]
+            DynamoDBService._config_cache[cache_key] = prompt
+            return prompt
         except Exception as e:
             logger.error(f"Error getting active prompt: {repr(e)}")
             raise
 
+    def _find_active_prompt(self) -> Optional[Dict]:
+        """Scan for the active prompt, used once to initialize the configuration pointer"""
+        items = []
+        scan_kwargs = {
+            'FilterExpression': 'is_active = :true',
+            'ExpressionAttributeValues': {':true': True}
+        }
+        while True:
+            response = self.prompts_table.scan(**scan_kwargs)
+            items.extend(response.get('Items', []))
+            if not response.get('LastEvaluatedKey'):
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        if len(items) > 1:
+            logger.warning("Multiple active prompts found, using the first one")
+        return items[0] if items else None
+
     async def get_configurations(self, config_id: str):
         """Get all configurations for a specific ID with error handling"""
         try:
@@ -567,6 +652,7 @@ class DynamoDBService:
                     ':old_timestamp': config_dict.get('updated_at', current_time)
                 }
             )
+            self._update_config_pointer_for(config_dict)
             return config_dict
         except ClientError as e:
             if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
@@ -590,6 +676,7 @@ class DynamoDBService:
             config_dict['updated_at'] = current_time
 
             self.configs_table.put_item(Item=config_dict)
+            self._update_config_pointer_for(config_dict)
             return config_dict
         except Exception as e:
             logger.error(f"Error updating configuration without locking: {repr(e)}")
@@ -610,63 +697,164 @@ class DynamoDBService:
             config_dict['updated_at'] = current_time
 
             self.configs_table.put_item(Item=config_dict)
+            self._update_config_pointer_for(config_dict)
             return config_dict
         except Exception as e:
             logger.error(f"Error saving configuration: {repr(e)}")
             raise
 
-    # Cache for active model config (store the result, not the coroutine)
-    _active_model_config_cache = None
-    _active_model_config_timestamp = None
-    
     async def get_active_model_config(self):
-        """Get the currently active model configuration with caching"""
-        # Simple time-based cache (30 seconds)
-        current_time = datetime.now(timezone.utc)
-        if (self._active_model_config_cache is not None and 
-            self._active_model_config_timestamp is not None and
-            (current_time - self._active_model_config_timestamp).total_seconds() < 30):
-            return self._active_model_config_cache
-            
+        """Get the currently active model configuration through the configuration pointer"""
         try:
-            response = self.configs_table.query(
-                KeyConditionExpression='pk = :pk',
-                FilterExpression='is_active = :true',
-                ExpressionAttributeValues={
-                    ':pk': 'MODEL_IDS',
-                    ':true': True
-                }
-            )
+            pointer = self._get_config_pointer()
+            cache_key = ('active_model_config', pointer.get('version'))
+            if cache_key in DynamoDBService._config_cache:
+                return DynamoDBService._config_cache[cache_key]
+
+            model_sk = pointer.get('active_model_sk')
+            if model_sk:
+                response = self.configs_table.get_item(Key={'pk': 'MODEL_IDS', 'sk': model_sk})
+                result = response.get('Item')
+            else:
+                result = self._find_active_model_config()
+                if result:
+                    self._set_config_pointer(bootstrap=True, active_model_sk=result['sk'])
 
-            items = response.get('Items', [])
-            if not items:
-                # If no active model, return the LITE model as default
-                response = self.configs_table.query(
-                    KeyConditionExpression='pk = :pk AND #sk = :sk',
-                    ExpressionAttributeNames={'#sk': 'sk'},
-                    ExpressionAttributeValues={
-                        ':pk': 'MODEL_IDS',
-                        ':sk': 'LITE'
-                    }
-                )
-                result = response['Items'][0] if response['Items'] else None
-                
-                # Update cache
-                self._active_model_config_cache = result
-                self._active_model_config_timestamp = current_time
-                return result
-
-            # Update cache
-            self._active_model_config_cache = items[0]
-            self._active_model_config_timestamp = current_time
-            return items[0]
+            DynamoDBService._config_cache[cache_key] = result
+            return result
         except Exception as e:
             logger.error(f"Error getting active model config: {repr(e)}")
             raise
 
+    def _find_active_model_config(self) -> Optional[Dict]:
+        """Query for the active model, used once to initialize the configuration pointer"""
+        response = self.configs_table.query(
+            KeyConditionExpression='pk = :pk',
+            FilterExpression='is_active = :true',
+            ExpressionAttributeValues={
+                ':pk': 'MODEL_IDS',
+                ':true': True
+            }
+        )
+
+        items = response.get('Items', [])
+        if items:
+            return items[0]
+
+        # If no active model, return the LITE model as default
+        response = self.configs_table.get_item(Key={'pk': 'MODEL_IDS', 'sk': 'LITE'})
+        return response.get('Item')
+
+    async def get_cached_configurations(self, config_id: str):
+        """Get all configurations for a specific ID, cached until the next configuration write"""
+        try:
+            pointer = self._get_config_pointer()
+            cache_key = ('configurations', config_id, pointer.get('version'))
+            if cache_key not in DynamoDBService._config_cache:
+                DynamoDBService._config_cache[cache_key] = await self.get_configurations(config_id)
+            return DynamoDBService._config_cache[cache_key]
+        except Exception as e:
+            logger.error(f"Error getting cached configurations: {repr(e)}")
+            raise
+
+    # Configuration cache shared by all instances, so it survives across warm invocations.
+    # Entries are keyed by the pointer version and dropped when the version changes.
+    _config_cache = {}
+    _config_pointer = None
+    _config_pointer_checked_at = None
+
+    def _get_config_pointer(self) -> Dict:
+        """Get the configuration pointer item, re-reading it at most every CONFIG_CACHE_TTL seconds"""
+        now = time.monotonic()
+        if (DynamoDBService._config_pointer is not None and
+            now - DynamoDBService._config_pointer_checked_at < CONFIG_CACHE_TTL):
+            return DynamoDBService._config_pointer
+
+        response = self.configs_table.get_item(Key=CONFIG_POINTER_KEY, ConsistentRead=True)
+        pointer = response.get('Item') or {}
+        if DynamoDBService._config_pointer is None or \
+                pointer.get('version') != DynamoDBService._config_pointer.get('version'):
+            DynamoDBService._config_cache = {}
+
+        DynamoDBService._config_pointer = pointer
+        DynamoDBService._config_pointer_checked_at = now
+        return pointer
+
+    def _set_config_pointer(self, bootstrap: bool = False, **attributes):
+        """Set pointer attributes and bump the pointer version
+
+        With bootstrap, attributes are only set where they are missing or cleared to '', so values
+        found by scanning never overwrite a pointer written concurrently by a prompt or config
+        update. A bootstrap that would change nothing leaves the version, and all caches, alone.
+        """
+        try:
+            names = {'#version': 'version'}
+            values = {':one': 1}
+            assignments = []
+            conditions = []
+            for i, (name, value) in enumerate(attributes.items()):
+                names[f"#a{i}"] = name
+                values[f":v{i}"] = value
+                assignments.append(f"#a{i} = :v{i}")
+                if bootstrap:
+                    if value == '':
+                        conditions.append(f"attribute_not_exists(#a{i})")
+                    else:
+                        conditions.append(f"(attribute_not_exists(#a{i}) OR #a{i} = :empty)")
+                        values[':empty'] = ''
+            update_expression = 'ADD #version :one'
+            if assignments:
+                update_expression = f"SET {', '.join(assignments)} {update_expression}"
+
+            update_kwargs = {}
+            if conditions:
+                update_kwargs['ConditionExpression'] = ' AND '.join(conditions)
+            self.configs_table.update_item(
+                Key=CONFIG_POINTER_KEY,
+                UpdateExpression=update_expression,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+                **update_kwargs
+            )
+            self.clear_caches()
+        except ClientError as e:
+            if bootstrap and e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                logger.info("Configuration pointer was already set, skipping bootstrap")
+                return
+            logger.error(f"Error updating configuration pointer: {repr(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Error updating configuration pointer: {repr(e)}")
+            raise
+
+    def _clear_config_pointer(self, name: str, expected_value: str):
+        """Clear a pointer attribute if it still points at expected_value, bumping the version either way"""
+        try:
+            self.configs_table.update_item(
+                Key=CONFIG_POINTER_KEY,
+                UpdateExpression='SET #name = :empty ADD #version :one',
+                ConditionExpression='#name = :expected',
+                ExpressionAttributeNames={'#name': name, '#version': 'version'},
+                ExpressionAttributeValues={':empty': '', ':expected': expected_value, ':one': 1}
+            )
+            self.clear_caches()
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.error(f"Error clearing configuration pointer: {repr(e)}")
+                raise
+            self._set_config_pointer()
+
+    def _update_config_pointer_for(self, config_dict: Dict):
+        """Point at a newly activated model, or just bump the version for other configuration writes"""
+        if config_dict.get('pk') != 'MODEL_IDS':
+            self._set_config_pointer()
+        elif config_dict.get('is_active'):
+            self._set_config_pointer(active_model_sk=config_dict['sk'])
+        else:
+            self._clear_config_pointer('active_model_sk', config_dict.get('sk'))
+
     def clear_caches(self):
         """Clear all cached data"""
-        self._active_prompt_cache = None
-        self._active_prompt_timestamp = None
-        self._active_model_config_cache = None
-        self._active_model_config_timestamp = None
+        DynamoDBService._config_cache = {}
+        DynamoDBService._config_pointer = None
+        DynamoDBService._config_pointer_checked_at = None
@@ -8,17 +8,30 @@ import logging
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 from botocore.exceptions import ClientError
+from .utils import encode_cursor, decode_cursor, backfill_attribute
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Agent verifications are listed newest first through a sparse index keyed on a constant entity type
+AGENT_VERIFICATION_ENTITY_TYPE = 'AGENT_VERIFICATION'
+AGENT_VERIFICATIONS_INDEX_NAME = 'entity_type-created_at-index'
+AGENT_VERIFICATION_LIST_ATTRIBUTES = [
+    'pk', 'verification_id', 'status', 'document_type', 'file_key', 'created_at', 'updated_at'
+]
+# Must match the index of the strands table in iac/api/dynamodb_tables/locals.tf
+AGENT_VERIFICATIONS_INDEX_NON_KEY_ATTRIBUTES = ['verification_id', 'status', 'document_type', 'file_key', 'updated_at']
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
 class AgentDynamoDBService:
     """DynamoDB service extensions for Strands Agent"""
 
     def __init__(self):
         self.dynamodb = boto3.resource('dynamodb')
         self.agent_verifications_table_name = os.getenv('FDP_DDB_STRANDS')
+        self.agent_verifications_index_active = False
 
         # Initialize table reference
         self.agent_verifications_table = self.ensure_agent_verifications_table_exists()
@@ -27,8 +40,14 @@ class AgentDynamoDBService:
         """Create the agent verifications DynamoDB table if it doesn't exist"""
         try:
             table = self.dynamodb.Table(self.agent_verifications_table_name)
-            table.meta.client.describe_table(TableName=self.agent_verifications_table_name)
+            description = table.meta.client.describe_table(TableName=self.agent_verifications_table_name)
             logger.info(f"Agent verifications table exists: {self.agent_verifications_table_name}")
+            self.agent_verifications_index_active = any(
+                index['IndexName'] == AGENT_VERIFICATIONS_INDEX_NAME and index.get('IndexStatus') == 'ACTIVE'
+                for index in description['Table'].get('GlobalSecondaryIndexes', [])
+            )
+            if not self.agent_verifications_index_active:
+                logger.warning(f"Index {AGENT_VERIFICATIONS_INDEX_NAME} is not active, agent verifications will be scanned")
             return table
         except ClientError as e:
             if e.response['Error']['Code'] == 'ResourceNotFoundException':
@@ -45,6 +64,33 @@ class AgentDynamoDBService:
                         {
                             'AttributeName': 'pk',
                             'AttributeType': 'S'
+                        },
+                        {
+                            'AttributeName': 'entity_type',
+                            'AttributeType': 'S'
+                        },
+                        {
+                            'AttributeName': 'created_at',
+                            'AttributeType': 'S'
+                        }
+                    ],
+                    GlobalSecondaryIndexes=[
+                        {
+                            'IndexName': AGENT_VERIFICATIONS_INDEX_NAME,
+                            'KeySchema': [
+                                {
+                                    'AttributeName': 'entity_type',
+                                    'KeyType': 'HASH'
+                                },
+                                {
+                                    'AttributeName': 'created_at',
+                                    'KeyType': 'RANGE'
+                                }
+                            ],
+                            'Projection': {
+                                'ProjectionType': 'INCLUDE',
+                                'NonKeyAttributes': AGENT_VERIFICATIONS_INDEX_NON_KEY_ATTRIBUTES
+                            }
                         }
                     ],
                     BillingMode='PAY_PER_REQUEST'
@@ -52,6 +98,7 @@ class AgentDynamoDBService:
 
                 table.meta.client.get_waiter('table_exists').wait(TableName=self.agent_verifications_table_name)
                 logger.info(f"Agent verifications table created successfully: {self.agent_verifications_table_name}")
+                self.agent_verifications_index_active = True
                 return table
             else:
                 logger.error(f"Error checking/creating agent verifications table: {repr(e)}")
@@ -64,6 +111,7 @@ class AgentDynamoDBService:
             if 'created_at' not in verification:
                 verification['created_at'] = current_time
             verification['updated_at'] = current_time
+            verification['entity_type'] = AGENT_VERIFICATION_ENTITY_TYPE
 
             self.agent_verifications_table.put_item(Item=verification)
             return verification
@@ -75,6 +123,7 @@ class AgentDynamoDBService:
         """Update an existing agent verification"""
         try:
             verification['updated_at'] = datetime.now(timezone.utc).isoformat()
+            verification['entity_type'] = AGENT_VERIFICATION_ENTITY_TYPE
             self.agent_verifications_table.put_item(Item=verification)
             return verification
         except Exception as e:
@@ -99,27 +148,51 @@ class AgentDynamoDBService:
             logger.error(f"Error getting agent verification: {repr(e)}")
             raise
 
-    async def get_agent_verifications(self) -> List[Dict]:
-        """Get all agent verifications"""
+    def backfill_agent_verification_entity_type(self) -> int:
+        """Add entity_type to agent verifications saved before the index existed, so it lists them"""
+        logger.info(f"Backfilling entity_type in agent verifications table: {self.agent_verifications_table_name}")
+        updated = backfill_attribute(
+            self.agent_verifications_table, 'entity_type', AGENT_VERIFICATION_ENTITY_TYPE
+        )
+        logger.info(f"Backfilled entity_type of {updated} agent verifications")
+        return updated
+
+    async def get_agent_verifications(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict:
+        """Get one page of agent verification summaries, newest first
+
+        Returns a dict with the page 'items' and a 'next_cursor' to pass back for the
+        following page, or None when there are no more agent verifications.
+        """
         try:
-            logger.info(f"Scanning agent verifications table: {self.agent_verifications_table_name}")
-            items = []
-            last_evaluated_key = None
-
-            while True:
-                scan_kwargs = {}
-                if last_evaluated_key:
-                    scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
-
-                response = self.agent_verifications_table.scan(**scan_kwargs)
-                items.extend(response.get('Items', []))
-
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
+            page_kwargs = {
+                'Limit': max(1, min(int(limit), MAX_PAGE_SIZE)),
+                'ProjectionExpression': ', '.join(f"#{name}" for name in AGENT_VERIFICATION_LIST_ATTRIBUTES),
+                'ExpressionAttributeNames': {f"#{name}": name for name in AGENT_VERIFICATION_LIST_ATTRIBUTES}
+            }
+            exclusive_start_key = decode_cursor(cursor)
+            if exclusive_start_key:
+                page_kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+            if self.agent_verifications_index_active:
+                logger.info(f"Querying index {AGENT_VERIFICATIONS_INDEX_NAME} of table: {self.agent_verifications_table_name}")
+                response = self.agent_verifications_table.query(
+                    IndexName=AGENT_VERIFICATIONS_INDEX_NAME,
+                    KeyConditionExpression='entity_type = :entity_type',
+                    ExpressionAttributeValues={':entity_type': AGENT_VERIFICATION_ENTITY_TYPE},
+                    ScanIndexForward=False,
+                    **page_kwargs
+                )
+            else:
+                # Tables without the index are paged in storage order instead
+                logger.info(f"Scanning agent verifications table: {self.agent_verifications_table_name}")
+                response = self.agent_verifications_table.scan(**page_kwargs)
 
+            items = response.get('Items', [])
             logger.info(f"Retrieved {len(items)} agent verifications")
-            return items
+            return {
+                'items': items,
+                'next_cursor': encode_cursor(response.get('LastEvaluatedKey'))
+            }
         except Exception as e:
             logger.error(f"Error getting agent verifications: {repr(e)}")
             raise
@@ -134,5 +207,6 @@ def extend_dynamodb_service(db_service):
     db_service.update_agent_verification = agent_db_service.update_agent_verification
     db_service.get_agent_verification = agent_db_service.get_agent_verification
     db_service.get_agent_verifications = agent_db_service.get_agent_verifications
+    db_service.backfill_agent_verification_entity_type = agent_db_service.backfill_agent_verification_entity_type
 
     return db_service
@@ -156,13 +156,14 @@ class S3Service:
             logger.error(f"Error in upload_base64_image: {repr(e)}")
             raise
 
-    def get_presigned_url(self, file_key: str, expiry: int = 3600) -> str:
+    def get_presigned_url(self, file_key: str, expiry: int = 3600, check_exists: bool = True) -> str:
         """
         Generate a presigned URL for an existing S3 object
 
         Args:
             file_key: The S3 object key
             expiry: URL expiration time in seconds (default: 1 hour)
+            check_exists: Confirm the object exists with a HEAD request first (default: True)
 
         Returns:
             str: Presigned URL for the S3 object
@@ -180,7 +181,8 @@ class S3Service:
 
             try:
                 # Check if object exists before generating URL
-                self.s3.head_object(Bucket=self.bucket_name, Key=file_key)
+                if check_exists:
+                    self.s3.head_object(Bucket=self.bucket_name, Key=file_key)
 
                 presigned_url = self.s3.generate_presigned_url(
                     ClientMethod='get_object',
@@ -0,0 +1,29 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Shared fixtures for the _lib tests, run with `python -m pytest _lib/tests` from app/api"""
+
+import os
+import sys
+
+import boto3
+import pytest
+from moto import mock_aws
+
+# The services are imported as the _lib package, like the Lambda functions do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    """Mocked AWS services with the environment of the Lambda functions"""
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('FDP_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('FDP_S3_BUCKET', 'fdp-test-bucket')
+    monkeypatch.setenv('FDP_DDB_AGENT', 'fdp-test-agent')
+    monkeypatch.setenv('FDP_DDB_PROMPT', 'fdp-test-prompt')
+    monkeypatch.setenv('FDP_DDB_CONFIG', 'fdp-test-config')
+    with mock_aws():
+        boto3.client('s3').create_bucket(Bucket='fdp-test-bucket')
+        yield
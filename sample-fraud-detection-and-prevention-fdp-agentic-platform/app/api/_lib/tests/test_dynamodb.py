@@ -0,0 +1,70 @@
+# Copyright (C) Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+"""Tests of the configuration pointer of DynamoDBService"""
+
+import asyncio
+
+import pytest
+
+from _lib.dynamodb import CONFIG_POINTER_KEY, DynamoDBService
+
+
+@pytest.fixture
+def service(aws):
+    DynamoDBService._config_cache = {}
+    DynamoDBService._config_pointer = None
+    DynamoDBService._config_pointer_checked_at = None
+    return DynamoDBService()
+
+
+def pointer(service):
+    return service.configs_table.get_item(Key=CONFIG_POINTER_KEY, ConsistentRead=True)['Item']
+
+
+def deactivate(service, sk):
+    config = service.configs_table.get_item(Key={'pk': 'MODEL_IDS', 'sk': sk})['Item']
+    config['is_active'] = False
+    asyncio.run(service.update_configuration_without_locking(config))
+
+
+def test_default_configs_point_at_lite(service):
+    assert pointer(service)['active_model_sk'] == 'LITE'
+    assert asyncio.run(service.get_active_model_config())['sk'] == 'LITE'
+
+
+def test_cleared_model_pointer_is_repaired_once(service):
+    deactivate(service, 'LITE')
+    assert pointer(service)['active_model_sk'] == ''
+
+    # The LITE default is found again and written back to the pointer
+    assert asyncio.run(service.get_active_model_config())['sk'] == 'LITE'
+    repaired = pointer(service)
+    assert repaired['active_model_sk'] == 'LITE'
+
+    # Later reads go through the repaired pointer and leave its version alone
+    service.clear_caches()
+    assert asyncio.run(service.get_active_model_config())['sk'] == 'LITE'
+    assert pointer(service)['version'] == repaired['version']
+
+
+def test_bootstrap_does_not_overwrite_a_set_pointer(service):
+    version = pointer(service)['version']
+    service._set_config_pointer(bootstrap=True, active_model_sk='PRO')
+    assert pointer(service)['active_model_sk'] == 'LITE'
+    assert pointer(service)['version'] == version
+
+
+def test_bootstrap_of_an_empty_value_only_sets_a_missing_attribute(service):
+    service._set_config_pointer(bootstrap=True, active_prompt_id='')
+    version = pointer(service)['version']
+    assert pointer(service)['active_prompt_id'] == ''
+
+    service._set_config_pointer(bootstrap=True, active_prompt_id='')
+    assert pointer(service)['version'] == version
+
+
+def test_explicit_set_bumps_the_version(service):
+    version = pointer(service)['version']
+    service._set_config_pointer(active_model_sk='PRO')
+    assert pointer(service)['active_model_sk'] == 'PRO'
+    assert pointer(service)['version'] == version + 1
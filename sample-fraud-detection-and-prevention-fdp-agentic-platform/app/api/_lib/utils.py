@@ -5,6 +5,8 @@
 import re
 import logging
 import json
+import base64
+from botocore.exceptions import ClientError
 
 logger = logging.getLogger(__name__)
 
@@ -75,3 +77,58 @@ def create_api_response(status_code: int, body: dict) -> dict:
         },
         'body': json.dumps(body)
     }
+
+def encode_cursor(last_evaluated_key: dict) -> str:
+    """Encode a DynamoDB LastEvaluatedKey as an opaque, URL-safe pagination cursor"""
+    if not last_evaluated_key:
+        return None
+    payload = json.dumps(last_evaluated_key, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a pagination cursor created by encode_cursor into an ExclusiveStartKey"""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid pagination cursor")
+    if not isinstance(key, dict):
+        raise ValueError("Invalid pagination cursor")
+    return key
+
+def backfill_attribute(table, attribute_name: str, value: str) -> int:
+    """Set an attribute on every item of a table that does not have it yet
+
+    Items written before a sparse index existed lack its key attribute and are
+    missing from the index until it is set. Pages through the whole table, so
+    run it once after the index is added; it is safe to run again.
+    Returns the number of updated items.
+    """
+    key_names = [key['AttributeName'] for key in table.key_schema]
+    key_placeholders = {f"#key{i}": name for i, name in enumerate(key_names)}
+    scan_kwargs = {
+        'FilterExpression': 'attribute_not_exists(#attr)',
+        'ProjectionExpression': ', '.join(key_placeholders),
+        'ExpressionAttributeNames': {**key_placeholders, '#attr': attribute_name}
+    }
+    updated = 0
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            try:
+                table.update_item(
+                    Key={name: item[name] for name in key_names},
+                    UpdateExpression='SET #attr = :value',
+                    # Skip items deleted or written with the attribute since the scan
+                    ConditionExpression='attribute_exists(#key0) AND attribute_not_exists(#attr)',
+                    ExpressionAttributeNames={'#key0': key_names[0], '#attr': attribute_name},
+                    ExpressionAttributeValues={':value': value}
+                )
+                updated += 1
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+        if not response.get('LastEvaluatedKey'):
+            return updated
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
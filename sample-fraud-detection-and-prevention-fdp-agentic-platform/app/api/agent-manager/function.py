@@ -87,10 +87,16 @@ async def get_verifications(event, context):
                 return create_api_response(404, {'detail': 'Verification not found'})
             return create_api_response(200, result)
         else:
-            # Get all verifications
-            result = await MANAGER.get_verifications()
-            if result is None:
-                result = []
+            # Get one page of verifications, newest first
+            limit = query_params.get('limit')
+            if limit is not None:
+                if not limit.isdigit() or int(limit) < 1:
+                    return create_api_response(400, {'detail': 'limit must be a positive integer'})
+                limit = int(limit)
+            try:
+                result = await MANAGER.get_verifications(limit=limit, cursor=query_params.get('cursor'))
+            except ValueError as ve:
+                return create_api_response(400, {'detail': str(ve)})
             return create_api_response(200, result)
 
     except ValueError as ve:
@@ -103,6 +109,10 @@ def handler(event, context):
     """Main handler function for Lambda"""
     LOGGER.info("Received event: %s", json.dumps(event))
 
+    # Direct invocation: aws lambda invoke --payload '{"action": "backfill_entity_type"}'
+    if event.get('action') == 'backfill_entity_type':
+        return {'updated': SERVICES['db_service'].backfill_verification_entity_type()}
+
     # Get HTTP method and path
     http_method = event['httpMethod']
     path = event['path']
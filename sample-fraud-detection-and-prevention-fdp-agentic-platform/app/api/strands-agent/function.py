@@ -138,6 +138,10 @@ def handler(event, context):
     """Main handler function for Lambda"""
     LOGGER.info("Received event: %s", json.dumps(event))
 
+    # Direct invocation: aws lambda invoke --payload '{"action": "backfill_entity_type"}'
+    if event.get('action') == 'backfill_entity_type':
+        return {'updated': SERVICES['db_service'].backfill_agent_verification_entity_type()}
+
     # Get HTTP method and path
     http_method = event['httpMethod']
     path = event['path']
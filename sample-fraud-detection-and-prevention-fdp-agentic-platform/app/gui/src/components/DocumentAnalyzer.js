@@ -36,6 +36,7 @@ function DocumentAnalyzer({ accessToken }) {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [analyzedDocuments, setAnalyzedDocuments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [openDialog, setOpenDialog] = useState(false);
   const [selectedResult, setSelectedResult] = useState(null);
   const [openImageDialog, setOpenImageDialog] = useState(false);
@@ -63,17 +64,20 @@ function DocumentAnalyzer({ accessToken }) {
     setError(errorMessage);
   };
 
-  const fetchVerifications = async () => {
+  const fetchVerifications = async (cursor = null) => {
     try {
       console.log('Fetching verifications...', accessToken);
 
-      const data = await apiGet('/verifications', accessToken);
+      const path = cursor
+        ? `/verifications?cursor=${encodeURIComponent(cursor)}`
+        : '/verifications';
+      const data = await apiGet(path, accessToken);
       console.log('Verifications data:', data);
 
       // Ensure the response data is in the expected format
-      if (Array.isArray(data)) {
+      if (data && Array.isArray(data.items)) {
         // Add data validation
-        const validatedData = data.map(doc => ({
+        const validatedData = data.items.map(doc => ({
           ...doc,
           id: doc.pk || `temp-${Date.now()}`,
           confidence: Number(doc.confidence),
@@ -82,10 +86,12 @@ function DocumentAnalyzer({ accessToken }) {
           timestamp: doc.timestamp || new Date().toISOString()
         }));
 
-        setAnalyzedDocuments(validatedData);
+        setAnalyzedDocuments(prev => (cursor ? [...prev, ...validatedData] : validatedData));
+        setNextCursor(data.next_cursor || null);
       } else {
-        console.warn('Response is not an array:', data);
+        console.warn('Response is not a page of verifications:', data);
         setAnalyzedDocuments([]);
+        setNextCursor(null);
       }
     } catch (error) {
       console.error('Error details:', {
@@ -112,9 +118,20 @@ function DocumentAnalyzer({ accessToken }) {
     }
   };
 
-  const handleOpenDialog = (doc) => {
+  const handleOpenDialog = async (doc) => {
     setSelectedResult(doc);
     setOpenDialog(true);
+
+    // Listings omit the analysis text, so load it when the details are opened
+    if (doc.content_text === undefined) {
+      try {
+        const details = await apiGet(`/verifications?verification_id=${encodeURIComponent(doc.pk)}`, accessToken);
+        setSelectedResult(current => (current && current.pk === doc.pk ? { ...current, ...details } : current));
+      } catch (error) {
+        console.error('Error fetching verification details:', error);
+        handleAPIError(error);
+      }
+    }
   };
 
   const handleCloseDialog = () => {
@@ -144,7 +161,7 @@ function DocumentAnalyzer({ accessToken }) {
 
       console.log('Processed response:', processedResponse);
 
-      setAnalyzedDocuments(prev => [...prev, processedResponse]);
+      setAnalyzedDocuments(prev => [processedResponse, ...prev]);
       setFile(null);
       setPreview(null);
     } catch (error) {
@@ -428,6 +445,16 @@ function DocumentAnalyzer({ accessToken }) {
               </TableContainer>
             </Paper>
 
+            {nextCursor && (
+              <Button
+                variant="outlined"
+                onClick={() => fetchVerifications(nextCursor)}
+                sx={{ textTransform: 'none' }}
+              >
+                Load more
+              </Button>
+            )}
+
             {/* Dialog for showing details */}
             <Dialog
               open={openDialog}
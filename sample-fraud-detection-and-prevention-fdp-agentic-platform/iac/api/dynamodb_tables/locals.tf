@@ -18,4 +18,21 @@ locals {
     name = var.q.range_key
     type = var.q.range_type
   }]
+  # Sparse indexes that list verifications newest first, projections must match
+  # app/api/_lib/dynamodb.py and app/api/_lib/dynamodb_extensions.py
+  indexes = {
+    agent = {
+      gsi_name               = "entity_type-timestamp-index"
+      gsi_hash_key           = "entity_type"
+      gsi_range_key          = "timestamp"
+      gsi_non_key_attributes = "document_type,confidence,file_key"
+    }
+    strands = {
+      gsi_name               = "entity_type-created_at-index"
+      gsi_hash_key           = "entity_type"
+      gsi_range_key          = "created_at"
+      gsi_non_key_attributes = "verification_id,status,document_type,file_key,updated_at"
+    }
+  }
+  tables = [for table in var.r : merge(lookup(local.indexes, table["key"], {}), table)]
 }
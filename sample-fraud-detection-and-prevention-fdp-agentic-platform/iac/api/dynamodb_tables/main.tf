@@ -22,6 +22,30 @@ resource "aws_dynamodb_table" "this" {
     }
   }
 
+  dynamic "attribute" {
+    for_each = [
+      for name in compact([
+        lookup(local.tables[count.index], "gsi_hash_key", ""),
+        lookup(local.tables[count.index], "gsi_range_key", ""),
+      ]) : name if !(strcontains(var.r[count.index]["attr"], name) && contains([var.q.hash_key, var.q.range_key], name))
+    ]
+    content {
+      name = attribute.value
+      type = "S"
+    }
+  }
+
+  dynamic "global_secondary_index" {
+    for_each = lookup(local.tables[count.index], "gsi_name", "") == "" ? [] : [local.tables[count.index]]
+    content {
+      name               = global_secondary_index.value["gsi_name"]
+      hash_key           = global_secondary_index.value["gsi_hash_key"]
+      range_key          = global_secondary_index.value["gsi_range_key"]
+      projection_type    = lookup(global_secondary_index.value, "gsi_non_key_attributes", "") == "" ? "ALL" : "INCLUDE"
+      non_key_attributes = lookup(global_secondary_index.value, "gsi_non_key_attributes", "") == "" ? null : split(",", global_secondary_index.value["gsi_non_key_attributes"])
+    }
+  }
+
   dynamic "replica" {
     for_each = local.replicas
     content {
@@ -76,6 +76,8 @@ data "aws_iam_policy_document" "this" {
       lookup(data.terraform_remote_state.dynamodb.outputs.arn, "prompt", null),
       lookup(data.terraform_remote_state.dynamodb.outputs.arn, "strands", null),
       lookup(data.terraform_remote_state.dynamodb.outputs.arn, "agent2", null),
+      "${data.terraform_remote_state.dynamodb.outputs.arn["agent"]}/index/*",
+      "${data.terraform_remote_state.dynamodb.outputs.arn["strands"]}/index/*",
     ]
   }
 